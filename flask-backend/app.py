@@ -5,7 +5,9 @@ from decorators import login_required_api
 from flask_login import LoginManager
 from config import Config
 from models import db, User
+from utils.ingest import IngestRequest
 import os
+import atexit
 import logging
 from datetime import datetime
 from flask import send_from_directory
@@ -14,9 +16,10 @@ from flask import send_from_directory
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_app():
+def create_app(start_workers=False):
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.request_class = IngestRequest  # lets upload routes stream file parts to disk
     
     # Initialize extensions
     db.init_app(app)
@@ -38,7 +41,8 @@ def create_app():
          "http://127.0.0.1:5173"
      ],
      supports_credentials=True,
-     allow_headers=["Content-Type", "Authorization"],
+     allow_headers=["Content-Type", "Authorization", "Content-Range"],
+     expose_headers=["Upload-Offset"],
      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
     
     # Create necessary directories
@@ -71,12 +75,14 @@ def create_app():
     from routes.history import history_bp
     from routes.settings import settings_bp
     from routes.exercises import exercises_bp
+    from routes.jobs import jobs_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api')
     app.register_blueprint(upload_bp, url_prefix='/api')
     app.register_blueprint(history_bp, url_prefix='/api')
     app.register_blueprint(settings_bp, url_prefix='/api')
     app.register_blueprint(exercises_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
     
     app.config.update(
     SESSION_COOKIE_HTTPONLY=True,
@@ -141,10 +147,53 @@ def create_app():
             
             db.session.commit()
             logger.info("Default users created")
+
+    from utils import preclassify
+    preclassify.warn_if_inert(app.config['EXERCISE_PRECLASSIFY'])
+
+    # Preflight, pre-classification and photos share one static-image Pose
+    # pool; size it here rather than by whichever of them runs first
+    from ml import static_pose
+    static_pose.configure_pool(app.config['PHOTO_POSE_POOL_SIZE'])
+
+    if start_workers:
+        start_analysis_workers(app)
     
     return app
-    
+
+
+def start_analysis_workers(app):
+    """Start the in-app analysis worker pool in the process that serves requests.
+
+    Only one process may own the pool: progress events are relayed to the
+    event streams of the process that started it. Under gunicorn the
+    post_worker_init hook of gunicorn.conf.py calls this in its single web
+    worker; with ANALYSIS_WORKERS=0 a separate `python -m worker` process
+    is required, or uploads stay pending. The exercise reference sequences
+    that /uploads/<id>/comparison reads are loaded here as well.
+    """
+    from utils import comparison
+    from routes.exercises import EXERCISES_DATA
+    comparison.precompute_in_background(app, EXERCISES_DATA)
+
+    if app.config['ANALYSIS_MODE'] != 'async' or app.config['ANALYSIS_WORKERS'] <= 0:
+        if app.config['ANALYSIS_MODE'] == 'async':
+            logger.warning("ANALYSIS_WORKERS=0: queued analyses wait for a `python -m worker` process")
+        return None
+    from utils.job_queue import start_worker_pool
+    pool = start_worker_pool(app)
+    atexit.register(pool.stop)
+    return pool
+
+
+# WSGI entry point (gunicorn app:app)
+app = create_app()
+
 
 if __name__ == '__main__':
-    app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    debug = True
+    # The debug reloader runs the app in a child process (WERKZEUG_RUN_MAIN);
+    # its parent only watches files and must not start workers of its own
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_analysis_workers(app)
+    app.run(debug=debug, host='0.0.0.0', port=5000)
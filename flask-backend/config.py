@@ -8,11 +8,19 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///skill_analysis.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Web requests and analysis workers share the SQLite file, so wait on
+    # the writer lock instead of failing immediately
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
     
     # File upload settings
-    UPLOAD_FOLDER = 'uploads'
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'  # must be shared by all analysis workers
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
     ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'mp4', 'avi', 'mov', 'wmv'}
+
+    # Resumable (chunked) uploads
+    RESUMABLE_MAX_SIZE = int(os.environ.get('RESUMABLE_MAX_SIZE') or 500 * 1024 * 1024)
+    RESUMABLE_CHUNK_SIZE = 5 * 1024 * 1024  # suggested chunk size returned to clients
+    RESUMABLE_SESSION_TTL = int(os.environ.get('RESUMABLE_SESSION_TTL') or 24 * 3600)  # seconds since last chunk
     
     # Email settings
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
@@ -26,4 +34,66 @@ class Config:
     SESSION_COOKIE_SAMESITE = 'Lax'  # Basic CSRF protection
     
     # ML Model settings
-    ML_MODEL_PATH = 'ml_models/posture_model.pkl'
\ No newline at end of file
+    ML_MODEL_PATH = 'ml_models/posture_model.pkl'
+
+    # Analysis job queue
+    ANALYSIS_MODE = os.environ.get('ANALYSIS_MODE', 'async')  # 'async' or 'sync'
+    ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 2))  # 0 = only standalone `python -m worker` nodes
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS') or 60)
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL') or 1.0)  # seconds
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS') or 3)
+    CANCEL_POLL_SECONDS = 1.0  # how often a running analysis checks whether it was cancelled
+
+    # Analysis job scheduling
+    SCHED_AGING_SECONDS = int(os.environ.get('SCHED_AGING_SECONDS') or 300)  # serve any job waiting this long first
+    SCHED_FAIR_WINDOW_SECONDS = int(os.environ.get('SCHED_FAIR_WINDOW_SECONDS') or 600)  # per-user usage window
+    SCHED_CANDIDATES = 200  # oldest claimable jobs considered per claim
+
+    # Batch uploads (/api/uploads/batch)
+    BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES') or 20)
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS') or min(4, os.cpu_count() or 1))  # sync mode process pool
+
+    # Exercise check on upload (utils/preclassify.py)
+    EXERCISE_PRECLASSIFY = os.environ.get('EXERCISE_PRECLASSIFY', 'reject')  # 'reject', 'correct' or 'off'
+    PRECLASSIFY_MIN_CONFIDENCE = float(os.environ.get('PRECLASSIFY_MIN_CONFIDENCE') or 0.6)  # act only on confident predictions
+
+    # Photo analysis (image uploads and /api/photos/analyze)
+    PHOTO_POSE_POOL_SIZE = int(os.environ.get('PHOTO_POSE_POOL_SIZE') or min(4, os.cpu_count() or 1))  # static-image Pose graphs per process
+    PHOTO_BATCH_MAX_FILES = int(os.environ.get('PHOTO_BATCH_MAX_FILES') or 20)
+
+    # Pose analysis pipeline
+    PROGRESSIVE_PREVIEW = os.environ.get('PROGRESSIVE_PREVIEW', 'true').lower() in ['true', 'on', '1']  # provisional push-up scores per rep
+    ACTIVITY_WINDOWS = os.environ.get('ACTIVITY_WINDOWS', 'true').lower() in ['true', 'on', '1']  # skip idle lead-in/out
+    ACTIVITY_PADDING_SECONDS = float(os.environ.get('ACTIVITY_PADDING_SECONDS') or 1.0)
+    ADAPTIVE_SAMPLING = os.environ.get('ADAPTIVE_SAMPLING', 'true').lower() in ['true', 'on', '1']  # pose rate from rep tempo
+    SAMPLING_ERROR_BUDGET_DEG = float(os.environ.get('SAMPLING_ERROR_BUDGET_DEG') or 5.0)  # max elbow angle missed at top/bottom
+    KEYFRAME_POSE = os.environ.get('KEYFRAME_POSE', 'false').lower() in ['true', 'on', '1']  # optical flow between pose keyframes
+    KEYFRAME_INTERVAL = int(os.environ.get('KEYFRAME_INTERVAL') or 3)
+    POSE_ROI = os.environ.get('POSE_ROI', 'true').lower() in ['true', 'on', '1']  # pose on a crop around the person
+    DUPLICATE_FRAME_SKIP = os.environ.get('DUPLICATE_FRAME_SKIP', 'true').lower() in ['true', 'on', '1']  # reuse landmarks of frozen frames
+    DUPLICATE_FRAME_MAX_BITS = int(os.environ.get('DUPLICATE_FRAME_MAX_BITS') or 24)  # of the 1024-bit difference hash
+    PER_REP_SCORING = os.environ.get('PER_REP_SCORING', 'true').lower() in ['true', 'on', '1']  # score each repetition, report the average
+    SIDE_AWARE_FEATURES = os.environ.get('SIDE_AWARE_FEATURES', 'true').lower() in ['true', 'on', '1']  # one-side features for side-view clips
+    STREAMING_ANALYSIS = os.environ.get('STREAMING_ANALYSIS', 'true').lower() in ['true', 'on', '1']  # constant-memory scoring of long push-up videos
+    STREAMING_MIN_SECONDS = float(os.environ.get('STREAMING_MIN_SECONDS') or 120)  # stream videos at least this long
+
+    # Reference comparison (/api/uploads/<id>/comparison)
+    REFERENCE_VIDEO_DIR = os.environ.get('REFERENCE_VIDEO_DIR') or \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'public')  # serves reference_video_url
+    REFERENCE_CACHE_DIR = os.environ.get('REFERENCE_CACHE_DIR') or 'reference_cache'  # extracted reference angle sequences
+    DTW_BAND_RATIO = float(os.environ.get('DTW_BAND_RATIO') or 0.1)  # Sakoe-Chiba band half-width, fraction of the clip
+
+    # Similar-attempt search (/api/history/<id>/similar-reps, /api/history/<id>/similar-sets)
+    REP_EMBEDDINGS = os.environ.get('REP_EMBEDDINGS', 'true').lower() in ['true', 'on', '1']  # store an embedding per analysed rep
+    SIMILARITY_INDEX_USERS = int(os.environ.get('SIMILARITY_INDEX_USERS') or 64)  # per-user indexes kept in memory
+
+    # Progress event streams (/api/uploads/<id>/events)
+    SSE_POLL_SECONDS = 5  # quiet period after which the stream re-checks the upload's status
+    SSE_MAX_STREAM_SECONDS = 900  # clients reconnect after this
+
+    # Admission control (429 + Retry-After when exceeded)
+    ADMISSION_MAX_PENDING = int(os.environ.get('ADMISSION_MAX_PENDING') or 50)  # queued + running analyses
+    ADMISSION_MAX_QUEUED_CPU_SECONDS = float(os.environ.get('ADMISSION_MAX_QUEUED_CPU_SECONDS') or 1800)
+    ADMISSION_CAPACITY = int(os.environ.get('ADMISSION_CAPACITY') or ANALYSIS_WORKERS or 1)  # workers across all nodes
+    UPLOAD_RATE_PER_MINUTE = float(os.environ.get('UPLOAD_RATE_PER_MINUTE') or 6)  # per user
+    UPLOAD_BURST = int(os.environ.get('UPLOAD_BURST') or 10)
@@ -1,4 +1,4 @@
-from app import create_app
+from app import app
 from models import db, User, Settings
 import logging
 
@@ -7,8 +7,6 @@ logger = logging.getLogger(__name__)
 
 def init_database():
     """Initialize the database with sample users and settings."""
-    app = create_app()
-
     with app.app_context():
         # Create all tables if they don't exist
         db.create_all()
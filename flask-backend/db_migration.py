@@ -1,12 +1,26 @@
 #!/usr/bin/env python3
 """
-Database migration script to add XP and level fields to existing users
+Database migration script to add new columns (XP, level, ...) to existing tables
 """
 
 import sqlite3
 import os
 from datetime import datetime
 
+def add_missing_columns(cursor, table, columns):
+    """Add each column in {name: sql_type} that the table does not have yet"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = [column[1] for column in cursor.fetchall()]
+    if not existing:
+        # Table does not exist yet; db.create_all() will create it in full
+        return
+
+    for name, sql_type in columns.items():
+        if name not in existing:
+            print(f"Adding {name} column to {table} table...")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+            print(f"✓ {name} column added")
+
 def migrate_database():
     """Add XP and level columns to users table if they don't exist"""
     
@@ -45,6 +59,21 @@ def migrate_database():
         # Update existing users with default XP and level
         cursor.execute("UPDATE users SET xp = 0 WHERE xp IS NULL")
         cursor.execute("UPDATE users SET level = 1 WHERE level IS NULL")
+
+        # Columns added to tables after they were first created
+        add_missing_columns(cursor, 'uploads', {
+            'content_hash': 'VARCHAR(64)',
+            'model_version': 'VARCHAR(100)',
+            'duplicate_of_id': 'INTEGER REFERENCES uploads(id)',
+        })
+        add_missing_columns(cursor, 'analysis_jobs', {
+            'lease_expires_at': 'DATETIME',
+            'heartbeat_at': 'DATETIME',
+            'lane': "VARCHAR(20) NOT NULL DEFAULT 'batch'",
+            'expected_cost': 'FLOAT',
+            'video_duration': 'FLOAT',
+            'frame_count': 'INTEGER',
+        })
         
         # Commit changes
         conn.commit()
@@ -1,6 +1,6 @@
 # decorators.py
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, current_app
 from flask_login import current_user
 
 def login_required_api(f):
@@ -9,4 +9,21 @@ def login_required_api(f):
         if not current_user.is_authenticated:
             return jsonify({'error': 'Unauthorized - Please login'}), 401
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+def admission_controlled(f):
+    """Reject new analyses with 429 + Retry-After when the analysis path is saturated"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        from utils.admission import controller
+        admitted, reason, retry_after = controller.check(current_user.id, current_app.config)
+        if not admitted:
+            response = jsonify({
+                'error': 'Server busy - please retry later',
+                'reason': reason,
+                'retry_after': retry_after
+            })
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+        return f(*args, **kwargs)
+    return decorated_function
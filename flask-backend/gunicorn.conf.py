@@ -0,0 +1,22 @@
+"""
+Gunicorn settings for the web tier (Procfile, Dockerfile).
+
+Progress events reach only the event streams of the process that runs the
+analysis worker pool, so a single web worker serves every request on
+threads and post_worker_init starts the pool in it. Add analysis capacity
+with `python -m worker` nodes rather than more web workers.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = 1
+worker_class = 'gthread'
+# Each open progress stream holds a thread
+threads = int(os.environ.get('WEB_THREADS', 16))
+timeout = 120
+
+
+def post_worker_init(worker):
+    from app import start_analysis_workers
+    start_analysis_workers(worker.wsgi)
@@ -0,0 +1,79 @@
+"""
+Benchmark keyframe pose + optical-flow tracking against full pose inference.
+
+Usage (from flask-backend/):
+    python -m ml.benchmark_keyframes VIDEO [VIDEO ...] [--interval 3] [--fps 10]
+
+For each video, extracts landmarks with pose on every sampled frame and
+with pose on keyframes only, then reports the extraction time of each,
+the speed-up and the error of the push-up angles on the frames both
+passes kept.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ml.hybrid_pushup_evaluator import get_evaluator
+
+
+def _timed_extract(evaluator, video_path: str, target_fps: float, keyframe_interval: int):
+    # Fresh MediaPipe tracking state for each pass
+    if hasattr(evaluator.pose, 'reset'):
+        evaluator.pose.reset()
+    started = time.perf_counter()
+    landmarks, metadata = evaluator.extract_pose_from_video(
+        video_path, target_fps=target_fps, keyframe_interval=keyframe_interval
+    )
+    return landmarks, metadata, time.perf_counter() - started
+
+
+def benchmark(evaluator, video_path: str, interval: int, target_fps: float) -> dict:
+    full_lm, full_md, full_s = _timed_extract(evaluator, video_path, target_fps, 1)
+    key_lm, key_md, key_s = _timed_extract(evaluator, video_path, target_fps, interval)
+
+    full_angles = dict(zip(full_md['frame_indices'], evaluator.compute_angles(full_lm)))
+    key_angles = dict(zip(key_md['frame_indices'], evaluator.compute_angles(key_lm)))
+    common = sorted(set(full_angles) & set(key_angles))
+    errors = np.array([np.abs(key_angles[i] - full_angles[i]) for i in common]) if common else np.zeros((0, 10))
+
+    return {
+        'video': Path(video_path).name,
+        'frames': len(common),
+        'full_s': full_s,
+        'keyframe_s': key_s,
+        'speedup': full_s / key_s if key_s > 0 else float('inf'),
+        'elbow_mae': float(errors[:, :2].mean()) if len(errors) else float('nan'),
+        'elbow_max': float(errors[:, :2].max()) if len(errors) else float('nan'),
+        'all_mae': float(errors.mean()) if len(errors) else float('nan'),
+        **key_md['keyframes'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keyframe pose tracking benchmark')
+    parser.add_argument('videos', nargs='+', help='video files to analyse')
+    parser.add_argument('--interval', type=int, default=3, help='pose every Nth sampled frame')
+    parser.add_argument('--fps', type=float, default=10, help='sampled frames per second')
+    args = parser.parse_args()
+
+    evaluator = get_evaluator()
+    rows = [benchmark(evaluator, video, args.interval, args.fps) for video in args.videos]
+
+    print(f"{'video':<30} {'frames':>6} {'full s':>7} {'key s':>7} {'speedup':>7} "
+          f"{'elbow MAE':>9} {'elbow max':>9} {'all MAE':>7} {'fallbacks':>9}")
+    for r in rows:
+        print(f"{r['video'][:30]:<30} {r['frames']:>6} {r['full_s']:>7.2f} {r['keyframe_s']:>7.2f} "
+              f"{r['speedup']:>6.2f}x {r['elbow_mae']:>9.2f} {r['elbow_max']:>9.2f} "
+              f"{r['all_mae']:>7.2f} {r['fallbacks']:>9}")
+    if len(rows) > 1:
+        total_full = sum(r['full_s'] for r in rows)
+        total_key = sum(r['keyframe_s'] for r in rows)
+        print(f"Overall speed-up {total_full / total_key:.2f}x, "
+              f"mean elbow error {np.nanmean([r['elbow_mae'] for r in rows]):.2f} deg")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark streaming push-up analysis against the batch pipeline.
+
+Usage (from flask-backend/):
+    python -m ml.benchmark_streaming VIDEO [VIDEO ...] [--per-rep] [--max-growth-mb 64]
+
+Each video is analysed by evaluate (whole landmark sequence in memory) and
+by evaluate_stream, each in a fresh child process so that its peak RSS
+(ru_maxrss) is its own. Reports both peaks, their growth over the peak of
+an idle child that only loaded the models, and the score difference.
+Exits non-zero if the streaming growth exceeds --max-growth-mb on any
+video, so it can gate a long-video regression check.
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run(mode: str, video_path: str, per_rep: bool, queue):
+    from ml.hybrid_pushup_evaluator import get_evaluator
+
+    evaluator = get_evaluator()
+    started = time.perf_counter()
+    if mode == 'batch':
+        result = evaluator.evaluate(video_path, per_rep=per_rep)
+    elif mode == 'stream':
+        result, _ = evaluator.evaluate_stream(video_path, per_rep=per_rep)
+    else:
+        result = {}
+    queue.put({
+        'seconds': time.perf_counter() - started,
+        'peak_mb': _peak_rss_mb(),
+        'score': float(result.get('score', 0.0)),
+        'reps': result.get('rep_count'),
+        'streaming': result.get('streaming'),
+    })
+
+
+def _measure(mode: str, video_path: str, per_rep: bool) -> dict:
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run, args=(mode, video_path, per_rep, queue))
+    process.start()
+    row = queue.get()
+    process.join()
+    return row
+
+
+def benchmark(video_path: str, per_rep: bool) -> dict:
+    idle = _measure('idle', video_path, per_rep)
+    batch = _measure('batch', video_path, per_rep)
+    stream = _measure('stream', video_path, per_rep)
+    return {
+        'video': Path(video_path).name,
+        'batch_mb': batch['peak_mb'] - idle['peak_mb'],
+        'stream_mb': stream['peak_mb'] - idle['peak_mb'],
+        'batch_s': batch['seconds'],
+        'stream_s': stream['seconds'],
+        'score_diff': abs(batch['score'] - stream['score']),
+        'reps': f"{batch['reps']}/{stream['reps']}",
+        'dropped': (stream['streaming'] or {}).get('dropped_reps', 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming analysis memory benchmark')
+    parser.add_argument('videos', nargs='+', help='video files to analyse')
+    parser.add_argument('--per-rep', action='store_true', help='score each repetition')
+    parser.add_argument('--max-growth-mb', type=float, default=None,
+                        help='fail if streaming grows peak RSS by more than this')
+    args = parser.parse_args()
+
+    rows = [benchmark(video, args.per_rep) for video in args.videos]
+
+    print(f"{'video':<30} {'batch MB':>8} {'stream MB':>9} {'batch s':>7} {'stream s':>8} "
+          f"{'score diff':>10} {'reps':>9} {'dropped':>7}")
+    for r in rows:
+        print(f"{r['video'][:30]:<30} {r['batch_mb']:>8.1f} {r['stream_mb']:>9.1f} {r['batch_s']:>7.2f} "
+              f"{r['stream_s']:>8.2f} {r['score_diff']:>10.2f} {r['reps']:>9} {r['dropped']:>7}")
+
+    if args.max_growth_mb is not None:
+        over = [r['video'] for r in rows if r['stream_mb'] > args.max_growth_mb]
+        if over:
+            print(f"Streaming peak RSS growth above {args.max_growth_mb:.0f} MB: {', '.join(over)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
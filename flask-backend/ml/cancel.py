@@ -0,0 +1,59 @@
+"""
+Cooperative cancellation for long-running analyses.
+
+Frame loops call `token.check()` between frames; once the token is
+cancelled this raises AnalysisCancelled, which evaluators let propagate
+(after releasing their VideoCapture) instead of turning it into a result.
+"""
+
+import time
+import threading
+from typing import Callable, Optional
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside an analysis when its cancel token has been tripped."""
+
+    def __init__(self, reason: str = 'cancelled'):
+        super().__init__(f"Analysis cancelled ({reason})")
+        self.reason = reason
+
+
+class CancelToken:
+    """
+    Thread-safe cancellation flag.
+
+    An optional probe (e.g. a client-disconnect check) is polled from
+    check() at most every probe_interval seconds.
+    """
+
+    def __init__(self, probe: Optional[Callable[[], bool]] = None, probe_interval: float = 0.5):
+        self._event = threading.Event()
+        self.reason = None
+        self._probe = probe
+        self._probe_interval = probe_interval
+        self._last_probe = 0.0
+
+    def cancel(self, reason: str = 'cancelled'):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def is_cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self._probe is not None:
+            now = time.monotonic()
+            if now - self._last_probe >= self._probe_interval:
+                self._last_probe = now
+                try:
+                    if self._probe():
+                        self.cancel('client_disconnected')
+                except Exception:
+                    pass
+        return self._event.is_set()
+
+    def check(self):
+        """Raise AnalysisCancelled if the analysis should stop."""
+        if self.is_cancelled():
+            raise AnalysisCancelled(self.reason)
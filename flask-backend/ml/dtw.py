@@ -0,0 +1,180 @@
+"""
+Alignment of a user's movement to a reference performance.
+
+joint_angles turns landmark tracks into per-frame joint angles, banded_dtw
+aligns two angle sequences with dynamic time warping restricted to a
+Sakoe-Chiba band, and compare_sequences reports per-joint deviation curves
+and an alignment score. Each DTW row is computed in one NumPy step, so
+even a several-minute clip aligns in milliseconds.
+"""
+
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Same joints (and vertex order) as the frontend's live comparison
+JOINTS = {
+    'left_elbow': (11, 13, 15),
+    'right_elbow': (12, 14, 16),
+    'left_shoulder': (13, 11, 23),
+    'right_shoulder': (14, 12, 24),
+    'left_hip': (11, 23, 25),
+    'right_hip': (12, 24, 26),
+    'left_knee': (23, 25, 27),
+    'right_knee': (24, 26, 28),
+}
+JOINT_NAMES = list(JOINTS)
+
+DTW_BAND_RATIO = 0.1  # band half-width as a fraction of the longer sequence
+ZERO_SCORE_DEVIATION = 45.0  # mean aligned deviation (degrees) that scores 0
+MIN_VISIBILITY = 0.5
+
+
+def joint_angles(landmarks: np.ndarray, min_visibility: float = MIN_VISIBILITY) -> np.ndarray:
+    """(frames, 33, 4) landmarks -> (frames, len(JOINTS)) 2D angles in degrees, NaN where a joint is hidden."""
+    idx = np.array(list(JOINTS.values()))
+    a = landmarks[:, idx[:, 0], :2]
+    b = landmarks[:, idx[:, 1], :2]
+    c = landmarks[:, idx[:, 2], :2]
+    ba, bc = a - b, c - b
+    cosine = (ba * bc).sum(axis=2) / (np.linalg.norm(ba, axis=2) * np.linalg.norm(bc, axis=2) + 1e-8)
+    angles = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+    visible = landmarks[:, idx, 3].min(axis=2) >= min_visibility
+    return np.where(visible, angles, np.nan)
+
+
+def _fill_gaps(angles: np.ndarray) -> np.ndarray:
+    """Interpolate hidden joints over time; joints never seen become 0 and are masked later."""
+    filled = angles.copy()
+    frames = np.arange(len(angles))
+    for j in range(angles.shape[1]):
+        seen = ~np.isnan(angles[:, j])
+        if seen.any():
+            filled[:, j] = np.interp(frames, frames[seen], angles[seen, j])
+        else:
+            filled[:, j] = 0.0
+    return filled
+
+
+def _band(n: int, m: int, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Column range [lo, hi] of each row, around the diagonal scaled to an n x m grid."""
+    centre = np.arange(n) * ((m - 1) / max(1, n - 1))
+    lo = np.clip(np.ceil(centre - radius), 0, m - 1).astype(int)
+    hi = np.clip(np.floor(centre + radius), 0, m - 1).astype(int)
+    # Rows must overlap so that a monotone path exists
+    hi = np.maximum(hi, np.r_[lo[1:], m - 1])
+    return lo, hi
+
+
+def _take(row: np.ndarray, row_lo: int, lo: int, length: int) -> np.ndarray:
+    """Values of a banded row at columns lo..lo+length-1 (inf outside its band)."""
+    out = np.full(length, np.inf)
+    start, end = max(lo, row_lo), min(lo + length, row_lo + len(row))
+    if end > start:
+        out[start - lo:end - lo] = row[start - row_lo:end - row_lo]
+    return out
+
+
+def banded_dtw(x: np.ndarray, y: np.ndarray, band_ratio: float = DTW_BAND_RATIO,
+               weights: np.ndarray = None) -> Tuple[float, List[Tuple[int, int]]]:
+    """
+    DTW between (n, d) and (m, d) sequences within a Sakoe-Chiba band.
+
+    The local cost is the weighted mean absolute difference over the d
+    features. Within a row, D[j] = min(t[j], c[j] + D[j - 1]) with t the
+    best of the two cells above, which unrolls to
+    D = C + minimum.accumulate(t - C) with C the running sum of c, so each
+    row is one vectorised step.
+
+    Returns:
+        (total cost along the path, path as (i, j) pairs from (0, 0) to (n-1, m-1))
+    """
+    n, m = len(x), len(y)
+    weights = np.ones(x.shape[1]) if weights is None else weights
+    weights = weights / max(weights.sum(), 1e-8)
+    radius = max(1, int(np.ceil(band_ratio * max(n, m))))
+    lo, hi = _band(n, m, radius)
+
+    rows = []
+    for i in range(n):
+        cols = slice(lo[i], hi[i] + 1)
+        cost = np.abs(y[cols] - x[i]) @ weights
+        if i == 0:
+            step = np.full(len(cost), np.inf)
+            step[0] = cost[0] if lo[0] == 0 else np.inf
+        else:
+            prev = rows[-1]
+            up = _take(prev, lo[i - 1], lo[i], len(cost))
+            diag = _take(prev, lo[i - 1], lo[i] - 1, len(cost))
+            step = cost + np.minimum(up, diag)
+        running = np.cumsum(cost)
+        rows.append(running + np.minimum.accumulate(step - running))
+
+    # Backtrack from the end
+    path = [(n - 1, m - 1)]
+    i, j = n - 1, m - 1
+    while i > 0 or j > 0:
+        candidates = []
+        if i > 0 and j > 0:
+            candidates.append((_at(rows, lo, i - 1, j - 1), i - 1, j - 1))
+        if i > 0:
+            candidates.append((_at(rows, lo, i - 1, j), i - 1, j))
+        if j > 0:
+            candidates.append((_at(rows, lo, i, j - 1), i, j - 1))
+        _, i, j = min(candidates)
+        path.append((i, j))
+    path.reverse()
+    return float(_at(rows, lo, n - 1, m - 1)), path
+
+
+def _at(rows: List[np.ndarray], lo: np.ndarray, i: int, j: int) -> float:
+    k = j - lo[i]
+    return rows[i][k] if 0 <= k < len(rows[i]) else np.inf
+
+
+def compare_sequences(user: np.ndarray, reference: np.ndarray, band_ratio: float = DTW_BAND_RATIO,
+                      max_points: int = 300) -> Dict:
+    """
+    Align user joint angles to reference joint angles (both from joint_angles).
+
+    A user clip much longer than the reference (more repetitions) is
+    compared with the reference repeated to about the same length.
+
+    Returns:
+        Dict with 'score' (0-100), 'mean_deviation_deg', 'joint_deviation_deg'
+        (mean absolute per joint), 'deviation_curves' (signed user - reference
+        per joint over the user clip, at most max_points samples), 'path_length'
+        and 'elapsed_ms'
+    """
+    started = time.perf_counter()
+    seen = ~np.isnan(user).all(axis=0) & ~np.isnan(reference).all(axis=0)
+    x, y = _fill_gaps(user), _fill_gaps(reference)
+    if len(x) > 1.5 * len(y):
+        y = np.tile(y, (int(round(len(x) / len(y))), 1))
+
+    total, path = banded_dtw(x, y, band_ratio=band_ratio, weights=seen.astype(float))
+    ii, jj = np.array(path).T
+
+    # Signed deviation of each user frame from the reference frames aligned to it
+    diff = x[ii] - y[jj]
+    counts = np.bincount(ii, minlength=len(x)).astype(float)
+    curves = np.stack([np.bincount(ii, weights=diff[:, k], minlength=len(x)) for k in range(x.shape[1])], axis=1)
+    curves /= counts[:, np.newaxis]
+
+    joint_dev = np.abs(diff).mean(axis=0)
+    mean_dev = float(joint_dev[seen].mean()) if seen.any() else float('nan')
+    score = max(0.0, 100.0 * (1.0 - mean_dev / ZERO_SCORE_DEVIATION)) if seen.any() else 0.0
+
+    if len(curves) > max_points:
+        sample = np.linspace(0, len(curves) - 1, max_points).round().astype(int)
+        curves = curves[sample]
+    return {
+        'score': round(score, 1),
+        'mean_deviation_deg': round(mean_dev, 2),
+        'joint_deviation_deg': {name: round(float(joint_dev[k]), 2) for k, name in enumerate(JOINT_NAMES) if seen[k]},
+        'deviation_curves': {name: np.round(curves[:, k], 1).tolist() for k, name in enumerate(JOINT_NAMES) if seen[k]},
+        'path_length': len(path),
+        'dtw_cost': round(total, 2),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000.0, 2),
+    }
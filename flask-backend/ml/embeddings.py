@@ -0,0 +1,108 @@
+"""
+Fixed-length repetition embeddings and a brute-force nearest-neighbour index.
+
+A repetition's joint-angle curves (ml.dtw.joint_angles) are resampled to
+EMBED_FRAMES frames and scaled to 0-1, giving one vector per repetition
+whatever its duration. Distances are Euclidean and reported as the RMS
+angle difference in degrees. The index is a plain matrix: one matrix
+product answers a query, which stays in the milliseconds for tens of
+thousands of repetitions.
+"""
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from ml.dtw import JOINT_NAMES, _fill_gaps
+from ml.reps import resample_sequence
+
+EMBED_FRAMES = 32
+EMBED_DIM = EMBED_FRAMES * len(JOINT_NAMES)
+
+
+def rep_embedding(angles: np.ndarray) -> np.ndarray:
+    """(frames, joints) angles of one repetition -> (EMBED_DIM,) float32 vector."""
+    curves = resample_sequence(_fill_gaps(angles), EMBED_FRAMES)
+    return (curves / 180.0).astype(np.float32).ravel()
+
+
+def distance_deg(squared_distance: np.ndarray) -> np.ndarray:
+    """Squared embedding distance -> RMS angle difference in degrees."""
+    return np.sqrt(np.maximum(squared_distance, 0.0) / EMBED_DIM) * 180.0
+
+
+class RepIndex:
+    """Embeddings of one user's repetitions for one exercise, appended as they are stored."""
+
+    def __init__(self):
+        self.vectors = np.zeros((0, EMBED_DIM), dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.upload_ids = np.zeros(0, dtype=np.int64)
+        self.rep_indices = np.zeros(0, dtype=np.int32)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.last_id = 0  # highest stored row id included
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def add(self, vectors: np.ndarray, upload_ids, rep_indices, scores, last_id: int):
+        if len(vectors):
+            vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, EMBED_DIM)
+            self.vectors = np.vstack([self.vectors, vectors])
+            self.norms = np.r_[self.norms, (vectors ** 2).sum(axis=1)]
+            self.upload_ids = np.r_[self.upload_ids, np.asarray(upload_ids, dtype=np.int64)]
+            self.rep_indices = np.r_[self.rep_indices, np.asarray(rep_indices, dtype=np.int32)]
+            self.scores = np.r_[self.scores, np.asarray(scores, dtype=np.float32)]
+        self.last_id = max(self.last_id, last_id)
+
+    def _squared_distances(self, queries: np.ndarray) -> np.ndarray:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, EMBED_DIM)
+        q_norms = (queries ** 2).sum(axis=1)
+        return q_norms[:, np.newaxis] + self.norms[np.newaxis, :] - 2.0 * queries @ self.vectors.T
+
+    def nearest_reps(self, query: np.ndarray, k: int = 5, exclude_uploads: Iterable[int] = ()) -> List[Dict]:
+        """The k stored repetitions closest to one embedding, ignoring those of exclude_uploads."""
+        if not len(self):
+            return []
+        dist = self._squared_distances(query)[0]
+        dist[np.isin(self.upload_ids, list(exclude_uploads))] = np.inf
+        k = min(k, int(np.isfinite(dist).sum()))
+        if k <= 0:
+            return []
+        best = np.argpartition(dist, k - 1)[:k]
+        best = best[np.argsort(dist[best])]
+        deg = distance_deg(dist[best])
+        return [{
+            'upload_id': int(self.upload_ids[i]),
+            'rep_index': int(self.rep_indices[i]),
+            'score': float(self.scores[i]),
+            'distance_deg': round(float(d), 2),
+        } for i, d in zip(best, deg)]
+
+    def nearest_sets(self, queries: np.ndarray, k: int = 5, exclude_uploads: Iterable[int] = ()) -> List[Dict]:
+        """
+        The k stored uploads whose repetitions best match a set of embeddings.
+
+        A set's distance is the mean, over the query repetitions, of the
+        distance to that set's closest repetition.
+        """
+        if not len(self):
+            return []
+        dist = self._squared_distances(queries)
+        uploads, group = np.unique(self.upload_ids, return_inverse=True)
+        order = np.argsort(group, kind='stable')
+        starts = np.r_[0, np.flatnonzero(np.diff(group[order])) + 1]
+        # Closest repetition of each upload, per query repetition
+        closest = np.minimum.reduceat(dist[:, order], starts, axis=1)
+        set_dist = distance_deg(closest).mean(axis=0)
+        set_dist[np.isin(uploads, list(exclude_uploads))] = np.inf
+        k = min(k, int(np.isfinite(set_dist).sum()))
+        if k <= 0:
+            return []
+        best = np.argsort(set_dist)[:k]
+        rep_counts = np.bincount(group, minlength=len(uploads))
+        return [{
+            'upload_id': int(uploads[i]),
+            'distance_deg': round(float(set_dist[i]), 2),
+            'reps': int(rep_counts[i]),
+        } for i in best]
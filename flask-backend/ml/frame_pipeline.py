@@ -0,0 +1,528 @@
+"""
+Cheap frame-level passes that decide which frames are worth posing.
+
+find_active_segments scans a video at a few frames per second on
+downscaled grayscale frames (like MLProcessor._select_motion_window_indices)
+and returns the segments with motion, so pose estimation can skip the idle
+lead-in and lead-out of a clip. estimate_rep_tempo and choose_sample_rate
+pick the pose frame rate from the tempo of the user's repetitions, and
+LandmarkTracker stands in for pose inference between keyframes and
+PoseROI runs pose on a crop around the person. DuplicateFrameFilter spots
+frozen frames whose previous landmarks can be reused.
+"""
+
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ml.static_pose import get_pool
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_SAMPLE_FPS = 4.0
+ACTIVITY_FRAME_SIZE = (160, 90)
+# A sample is active when its motion energy (mean absolute gray-level
+# difference to the previous sample) reaches this floor and this fraction
+# of the clip's 90th-percentile energy
+ACTIVITY_MIN_ENERGY = 1.5
+ACTIVITY_RELATIVE_ENERGY = 0.3
+ACTIVITY_MERGE_GAP_SECONDS = 1.5
+ACTIVITY_MIN_SEGMENT_SECONDS = 1.0
+
+
+def _merge(segments: List[Tuple[int, int]], max_gap: int) -> List[Tuple[int, int]]:
+    merged = []
+    for start, end in sorted(segments):
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def video_duration_seconds(video_path: str) -> float:
+    """Duration from the container's frame count and rate (0 if unreadable)."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return 0.0
+        fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0) or 30.0
+        return max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT))) / fps
+    finally:
+        cap.release()
+
+
+def find_active_segments(video_path: str, padding_seconds: float = 1.0,
+                         sample_fps: float = ACTIVITY_SAMPLE_FPS) -> Dict:
+    """
+    Find the parts of a video with motion.
+
+    Returns:
+        Dict with 'segments' (list of inclusive [start_frame, end_frame],
+        padded by padding_seconds; None means use the whole video),
+        'skipped_ratio', 'total_frames', 'fps' and 'elapsed_ms'
+    """
+    started = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {video_path}")
+
+    fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0) or 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, int(round(fps / sample_fps)))
+
+    energies = []
+    sample_indices = []
+    prev = None
+    idx = 0
+    try:
+        while True:
+            if idx % step:
+                # grab() skips the colour conversion of frames we don't sample
+                if not cap.grab():
+                    break
+                idx += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            gray = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), ACTIVITY_FRAME_SIZE,
+                              interpolation=cv2.INTER_AREA)
+            if prev is not None:
+                energies.append(float(cv2.absdiff(gray, prev).mean()))
+                sample_indices.append(idx)
+            prev = gray
+            idx += 1
+    finally:
+        cap.release()
+
+    total_frames = max(total_frames, idx)
+    whole = {
+        'segments': None,
+        'skipped_ratio': 0.0,
+        'total_frames': total_frames,
+        'fps': fps,
+    }
+    if len(energies) < 3 or total_frames <= 0:
+        whole['elapsed_ms'] = (time.perf_counter() - started) * 1000.0
+        return whole
+
+    # Smooth over neighbouring samples so one still frame mid-rep doesn't split it
+    energy = np.convolve(np.array(energies), np.ones(3) / 3.0, mode='same')
+    threshold = max(ACTIVITY_MIN_ENERGY, ACTIVITY_RELATIVE_ENERGY * float(np.percentile(energy, 90)))
+    active = energy >= threshold
+
+    runs = []
+    run_start = None
+    for i, is_active in enumerate(active):
+        if is_active and run_start is None:
+            run_start = i
+        elif not is_active and run_start is not None:
+            runs.append((sample_indices[run_start] - step, sample_indices[i - 1]))
+            run_start = None
+    if run_start is not None:
+        runs.append((sample_indices[run_start] - step, sample_indices[-1]))
+
+    runs = _merge(runs, int(ACTIVITY_MERGE_GAP_SECONDS * fps))
+    long_runs = [r for r in runs if r[1] - r[0] >= ACTIVITY_MIN_SEGMENT_SECONDS * fps]
+    runs = long_runs or runs
+    if not runs:
+        # No clear activity: don't risk skipping the exercise
+        whole['elapsed_ms'] = (time.perf_counter() - started) * 1000.0
+        return whole
+
+    pad = int(round(padding_seconds * fps))
+    segments = _merge(
+        [(max(0, start - pad), min(total_frames - 1, end + pad)) for start, end in runs],
+        max_gap=1,
+    )
+    covered = sum(end - start + 1 for start, end in segments)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+    logger.info(f"Activity pre-pass: {len(segments)} segment(s), {covered}/{total_frames} frames, {elapsed_ms:.0f} ms")
+    return {
+        'segments': [[int(start), int(end)] for start, end in segments],
+        'skipped_ratio': 1.0 - covered / float(total_frames),
+        'total_frames': total_frames,
+        'fps': fps,
+        'elapsed_ms': elapsed_ms,
+    }
+
+
+# -----------------------
+# Adaptive sampling
+# -----------------------
+
+ADAPTIVE_PROBE_SECONDS = 8.0
+ADAPTIVE_PROBE_FPS = 4.0
+ADAPTIVE_MIN_FPS = 5.0
+ADAPTIVE_MAX_FPS = 15.0
+MIN_REP_SECONDS = 0.6
+MAX_REP_SECONDS = 6.0
+MIN_REP_AMPLITUDE = 20.0  # degrees of elbow travel that count as repetitions
+
+
+def estimate_rep_tempo(video_path: str, angle_fn: Callable[[np.ndarray], float], start_frame: int = 0,
+                       probe_seconds: float = ADAPTIVE_PROBE_SECONDS,
+                       probe_fps: float = ADAPTIVE_PROBE_FPS) -> Dict:
+    """
+    Estimate repetition period and elbow range from a sparse pose pass.
+
+    Poses probe_fps frames per second (static-image Pose, so the caller's
+    tracking state is untouched) for probe_seconds from start_frame, maps
+    each detection to an elbow angle with angle_fn((33, 4) landmarks) and
+    takes the period from the autocorrelation of the resampled series.
+
+    Returns:
+        Dict with 'period_seconds' (None if no clear periodicity),
+        'amplitude_deg', 'probe_frames' and 'probe_ms'
+    """
+    started = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {video_path}")
+
+    fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0) or 30.0
+    step = max(1, int(round(fps / probe_fps)))
+    end_frame = start_frame + int(probe_seconds * fps)
+    pool = get_pool()
+
+    times, angles = [], []
+    probed = 0
+    try:
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        idx = start_frame
+        while idx < end_frame:
+            if (idx - start_frame) % step:
+                if not cap.grab():
+                    break
+                idx += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            probed += 1
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            with pool.acquire() as pose:
+                results = pose.process(rgb)
+            if results.pose_landmarks:
+                landmarks = np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in results.pose_landmarks.landmark])
+                if landmarks[:, 3].mean() >= 0.3:
+                    times.append(idx / fps)
+                    angles.append(float(angle_fn(landmarks)))
+            idx += 1
+    finally:
+        cap.release()
+
+    estimate = {
+        'period_seconds': None,
+        'amplitude_deg': None,
+        'probe_frames': probed,
+    }
+    if len(angles) >= 6:
+        values = np.array(angles)
+        estimate['amplitude_deg'] = float(np.percentile(values, 95) - np.percentile(values, 5))
+
+        # Resample onto a uniform grid (missed detections leave gaps)
+        dt = step / fps
+        grid = np.arange(times[0], times[-1] + 1e-9, dt)
+        series = np.interp(grid, times, values)
+        series = series - series.mean()
+        ac = np.correlate(series, series, mode='full')[len(series) - 1:]
+        lo = max(1, int(MIN_REP_SECONDS / dt))
+        hi = min(len(ac) - 1, int(MAX_REP_SECONDS / dt))
+        if ac[0] > 0 and hi > lo and estimate['amplitude_deg'] >= MIN_REP_AMPLITUDE:
+            ac = ac / ac[0]
+            lag = lo + int(np.argmax(ac[lo:hi + 1]))
+            if ac[lag] >= 0.3:
+                estimate['period_seconds'] = float(lag * dt)
+
+    estimate['probe_ms'] = (time.perf_counter() - started) * 1000.0
+    return estimate
+
+
+def choose_sample_rate(period_seconds: float, amplitude_deg: float, error_budget_deg: float,
+                       min_fps: float = ADAPTIVE_MIN_FPS, max_fps: float = ADAPTIVE_MAX_FPS) -> float:
+    """
+    Lowest frame rate that resolves the top and bottom of each repetition
+    within error_budget_deg.
+
+    Treats the elbow angle as a sinusoid of the given period and
+    peak-to-peak amplitude: a sample up to half an interval from an extreme
+    under-reads it by A * (1 - cos(pi * interval / period)), with A half the
+    amplitude. Solving for the interval gives the rate.
+    """
+    half_amplitude = amplitude_deg / 2.0
+    if error_budget_deg >= half_amplitude:
+        return min_fps
+    interval = (period_seconds / np.pi) * np.arccos(1.0 - error_budget_deg / half_amplitude)
+    return float(np.clip(1.0 / interval, min_fps, max_fps))
+
+
+# -----------------------
+# Keyframe tracking
+# -----------------------
+
+# Shoulders, elbows, wrists and hips: the joints the push-up angles depend on
+TRACKED_JOINTS = [11, 12, 13, 14, 15, 16, 23, 24]
+LK_PARAMS = dict(
+    winSize=(21, 21),
+    maxLevel=3,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01),
+)
+KEYFRAME_MAX_FB_ERROR_PX = 2.0  # median forward-backward error of the tracked joints
+KEYFRAME_MAX_MOTION = 0.05  # largest joint displacement per step, fraction of the frame diagonal
+
+
+class LandmarkTracker:
+    """
+    Carries pose landmarks from a keyframe to the following sampled frames
+    with pyramidal Lucas-Kanade optical flow.
+
+    The caller runs pose on a keyframe every keyframe_interval sampled frames
+    and calls track() in between. track() returns None, and the caller
+    falls back to pose inference, when the tracked joints are lost, the
+    forward-backward flow error is too high or they moved too far in one step.
+    Depth and visibility are carried over from the keyframe.
+    """
+
+    def __init__(self, keyframe_interval: int = 3, max_fb_error_px: float = KEYFRAME_MAX_FB_ERROR_PX,
+                 max_motion: float = KEYFRAME_MAX_MOTION):
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.max_fb_error_px = max_fb_error_px
+        self.max_motion = max_motion
+        self.keyframes = 0
+        self.tracked = 0
+        self.fallbacks = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the last frame, e.g. after seeking past skipped frames."""
+        self._gray = None
+        self._landmarks = None
+        self._since_keyframe = 0
+
+    def needs_keyframe(self) -> bool:
+        return self._landmarks is None or self._since_keyframe + 1 >= self.keyframe_interval
+
+    def set_keyframe(self, gray: np.ndarray, landmarks: Optional[np.ndarray]):
+        """Record the result of real pose inference (None if nobody was detected)."""
+        self.keyframes += 1
+        self._gray = gray
+        self._landmarks = landmarks
+        self._since_keyframe = 0
+
+    def track(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        """Landmarks for the next sampled frame, or None if pose should run instead."""
+        h, w = gray.shape[:2]
+        scale = np.array([w, h], dtype=np.float32)
+        points = (self._landmarks[:, :2] * scale).astype(np.float32).reshape(-1, 1, 2)
+
+        forward, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, points, None, **LK_PARAMS)
+        backward, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._gray, forward, None, **LK_PARAMS)
+        found = (status.ravel() == 1) & (back_status.ravel() == 1)
+        fb_error = np.linalg.norm((points - backward).reshape(-1, 2), axis=1)
+        motion = np.linalg.norm((forward - points).reshape(-1, 2), axis=1)
+
+        joints = TRACKED_JOINTS
+        if (not found[joints].all()
+                or float(np.median(fb_error[joints])) > self.max_fb_error_px
+                or float(motion[joints].max()) > self.max_motion * float(np.hypot(w, h))):
+            self.fallbacks += 1
+            return None
+
+        landmarks = self._landmarks.copy()
+        moved = forward.reshape(-1, 2) / scale
+        landmarks[found, :2] = moved[found]
+        self._gray = gray
+        self._landmarks = landmarks
+        self._since_keyframe += 1
+        self.tracked += 1
+        return landmarks
+
+    def stats(self) -> Dict:
+        return {
+            'keyframe_interval': self.keyframe_interval,
+            'keyframes': self.keyframes,
+            'tracked_frames': self.tracked,
+            'fallbacks': self.fallbacks,
+        }
+
+
+# -----------------------
+# Region of interest
+# -----------------------
+
+ROI_PADDING = 0.25  # of the landmark box's size, on each side
+ROI_MIN_SIZE = 0.2  # smallest ROI side, fraction of the frame side
+ROI_MAX_AREA = 0.8  # larger ROIs aren't worth cropping: use the full frame
+ROI_MIN_VISIBILITY = 0.5  # mean visibility below which the person is re-detected on the full frame
+ROI_INNER_MARGIN = 0.1  # landmarks closer than this to the ROI edge move the ROI
+FULL_FRAME = (0.0, 0.0, 1.0, 1.0)
+
+
+class PoseROI:
+    """
+    Runs pose on a crop around the person instead of the full frame.
+
+    The crop is a padded box around the previous frame's landmarks, and
+    landmarks found in it are mapped back to full-frame normalised
+    coordinates, so callers see the same values either way. The box is
+    sticky: it only moves when the landmarks approach its edge or shrink
+    well inside it, which keeps MediaPipe's own frame-to-frame tracking
+    stable. When nobody is found in the crop, or visibility drops, the
+    frame is re-detected on the full frame by a static-image graph from
+    the shared pool, never by the caller's tracking graph: its tracked
+    region and landmark smoothing are in crop coordinates. A person too
+    large to be worth cropping is tracked with the full frame as the box.
+    """
+
+    def __init__(self, padding: float = ROI_PADDING, min_visibility: float = ROI_MIN_VISIBILITY):
+        self.padding = padding
+        self.min_visibility = min_visibility
+        self.box = None  # (x0, y0, x1, y1), normalised
+        self.cropped = 0
+        self.full_frame = 0
+        self.redetects = 0
+
+    def reset(self):
+        self.box = None
+
+    def process(self, pose, frame_rgb: np.ndarray) -> Optional[np.ndarray]:
+        """(33, 4) full-frame landmarks for an RGB frame, or None if nobody was found."""
+        landmarks = None
+        if self.box is not None:
+            landmarks = self._run(pose, frame_rgb, self.box)
+            self.cropped += 1
+            if landmarks is None or landmarks[:, 3].mean() < self.min_visibility:
+                self.redetects += 1
+                landmarks = None
+        if landmarks is None:
+            with get_pool().acquire() as detector:
+                landmarks = self._run(detector, frame_rgb, None)
+            self.full_frame += 1
+        self._update(landmarks)
+        return landmarks
+
+    def _run(self, pose, frame_rgb: np.ndarray, box) -> Optional[np.ndarray]:
+        if box is None or box == FULL_FRAME:
+            image = frame_rgb
+        else:
+            h, w = frame_rgb.shape[:2]
+            x0, y0, x1, y1 = box
+            image = np.ascontiguousarray(frame_rgb[int(y0 * h):int(np.ceil(y1 * h)), int(x0 * w):int(np.ceil(x1 * w))])
+        results = pose.process(image)
+        if not results.pose_landmarks:
+            return None
+        landmarks = np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in results.pose_landmarks.landmark])
+        if box is not None:
+            x0, y0, x1, y1 = box
+            landmarks[:, 0] = x0 + landmarks[:, 0] * (x1 - x0)
+            landmarks[:, 1] = y0 + landmarks[:, 1] * (y1 - y0)
+            landmarks[:, 2] = landmarks[:, 2] * (x1 - x0)  # z shares the x scale
+        return landmarks
+
+    def _update(self, landmarks: Optional[np.ndarray]):
+        if landmarks is None or landmarks[:, 3].mean() < self.min_visibility:
+            self.box = None
+            return
+
+        visible = landmarks[landmarks[:, 3] >= self.min_visibility]
+        if len(visible) < 4:
+            visible = landmarks
+        lx0, ly0 = np.clip(visible[:, :2].min(axis=0), 0.0, 1.0)
+        lx1, ly1 = np.clip(visible[:, :2].max(axis=0), 0.0, 1.0)
+
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            mx, my = ROI_INNER_MARGIN * (x1 - x0), ROI_INNER_MARGIN * (y1 - y0)
+            inside = lx0 >= x0 + mx and ly0 >= y0 + my and lx1 <= x1 - mx and ly1 <= y1 - my
+            fills = (lx1 - lx0) * (ly1 - ly0) >= 0.25 * (x1 - x0) * (y1 - y0)
+            if inside and fills:
+                return
+
+        def span(lo, hi):
+            size = max(hi - lo, 1e-3)
+            lo, hi = lo - self.padding * size, hi + self.padding * size
+            if hi - lo < ROI_MIN_SIZE:
+                mid = (lo + hi) / 2.0
+                lo, hi = mid - ROI_MIN_SIZE / 2.0, mid + ROI_MIN_SIZE / 2.0
+            return max(0.0, lo), min(1.0, hi)
+
+        x0, x1 = span(lx0, lx1)
+        y0, y1 = span(ly0, ly1)
+        self.box = FULL_FRAME if (x1 - x0) * (y1 - y0) > ROI_MAX_AREA else (x0, y0, x1, y1)
+
+    def stats(self) -> Dict:
+        return {
+            'cropped_frames': self.cropped,
+            'full_frames': self.full_frame,
+            'redetects': self.redetects,
+        }
+
+
+# -----------------------
+# Duplicate frames
+# -----------------------
+
+DHASH_SIZE = 32
+DHASH_MAX_DISTANCE = 24  # differing bits (of 1024) for two frames to count as the same
+
+
+def dhash(frame_bgr: np.ndarray, size: int = DHASH_SIZE) -> np.ndarray:
+    """Difference hash: sign of horizontal gradients on a size x size grayscale thumbnail, packed."""
+    gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+
+def hamming_distance(a: np.ndarray, b: np.ndarray) -> int:
+    return int(np.unpackbits(np.bitwise_xor(a, b)).sum())
+
+
+class DuplicateFrameFilter:
+    """
+    Spots frozen and near-identical frames before pose inference.
+
+    Each frame's hash is compared with the last frame that was actually
+    posed (not the previous duplicate), so a slow drift can't chain a long
+    run of frames onto one stale result.
+    """
+
+    def __init__(self, max_distance: int = DHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.checked = 0
+        self.duplicates = 0
+        self.reset()
+
+    def reset(self):
+        self._reference = None
+        self._last = None
+
+    def is_duplicate(self, frame_bgr: np.ndarray) -> bool:
+        """True if the frame matches the reference, the last frame posed."""
+        self.checked += 1
+        self._last = dhash(frame_bgr)
+        if self._reference is not None and hamming_distance(self._last, self._reference) <= self.max_distance:
+            self.duplicates += 1
+            return True
+        return False
+
+    def mark_posed(self):
+        """Make the frame last checked the reference; call once Pose has run on it.
+
+        Frames whose landmarks came from the keyframe tracker don't count:
+        a duplicate of one would reuse landmarks Pose never produced.
+        """
+        self._reference = self._last
+
+    def stats(self) -> Dict:
+        return {
+            'checked_frames': self.checked,
+            'duplicate_frames': self.duplicates,
+            'skip_ratio': self.duplicates / float(self.checked) if self.checked else 0.0,
+        }
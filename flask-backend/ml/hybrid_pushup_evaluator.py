@@ -11,7 +11,18 @@ from pathlib import Path
 import json
 import joblib
 import logging
-from typing import Dict, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from ml.cancel import AnalysisCancelled, CancelToken
+from ml.reps import IncrementalRepDetector, Rep, load_phase_thresholds, resample_batch, resample_sequence, segment_reps
+from ml.dtw import JOINT_NAMES, joint_angles
+from ml.embeddings import rep_embedding
+from ml.preflight import estimated_savings_ms, run_preflight
+from ml.landmarks import LandmarkTrack
+from ml.frame_pipeline import (
+    ADAPTIVE_PROBE_SECONDS, DuplicateFrameFilter, LandmarkTracker, PoseROI, choose_sample_rate,
+    estimate_rep_tempo, find_active_segments
+)
 import sys
 import time
 
@@ -61,6 +72,72 @@ def _visibility_to_confidence_level(avg_visibility: float) -> str:
         return "Medium"
     return "Low"
 
+def _low_visibility_result(confidence_level: str) -> Dict:
+    """Conservative baseline result when the body could not be seen well enough."""
+    return {
+        'exercise': 'pushup',
+        'status': 'INVALID',
+        'score': 30.0,
+        'confidence': 0.0,
+        'confidenceLevel': confidence_level,
+        'feedback': 'Pose detection confidence is low. We could not fully see your movement, but here is a conservative baseline score.',
+        'rule_breakdown': {},
+        'failures': ['Low visibility']
+    }
+
+
+def _invalid_result(feedback: str, failure: str) -> Dict:
+    """INVALID result for a video that could not be evaluated."""
+    return {
+        'exercise': 'pushup',
+        'status': 'INVALID',
+        'score': 0.0,
+        'confidence': 0.0,
+        'confidenceLevel': 'Low',
+        'feedback': feedback,
+        'rule_breakdown': {},
+        'failures': [failure]
+    }
+
+
+def _penalty_score(total_penalty: float, lstm_valid: bool, lstm_confidence: float) -> float:
+    """Penalty-based score: start from 100 and deduct rule and temporal penalties."""
+    base_score = 100.0
+    
+    # Subtract rule violations
+    base_score -= total_penalty
+    
+    # LSTM temporal penalty (fixed amount if invalid)
+    # NOTE: lstm_confidence is classifier certainty, NOT form quality
+    if not lstm_valid or lstm_confidence < 0.4:
+        base_score -= 30.0  # Fixed penalty for invalid temporal pattern
+    
+    # Clamp to 0-100 range
+    return max(0.0, min(100.0, base_score))
+
+
+def _score_status(score: float) -> str:
+    if score >= 80:
+        return 'GOOD'
+    if score >= 60:
+        return 'NEEDS_IMPROVEMENT'
+    return 'BAD'
+
+
+def _form_feedback(failures: List[str], component_scores: Dict) -> str:
+    if not failures:
+        return "Great form! Your push-up shows good depth, body alignment, and symmetry. Keep up the excellent work!"
+    feedback_parts = ["Areas for improvement:"]
+    for failure in failures[:3]:  # Limit to top 3
+        feedback_parts.append(f"• {failure}")
+    
+    if component_scores.get('elbow_depth', 1.0) < 0.7:
+        feedback_parts.append("\nTip: Lower your chest closer to the ground.")
+    if component_scores.get('body_alignment', 1.0) < 0.7:
+        feedback_parts.append("Tip: Engage your core to keep your body straight.")
+    
+    return "\n".join(feedback_parts)
+
 # Import from model-training (hybrid evaluator components)
 MODEL_TRAINING_PATH = Path(__file__).parent.parent.parent / 'model-training' / 'pushup'
 sys.path.insert(0, str(MODEL_TRAINING_PATH))
@@ -81,6 +158,30 @@ except ImportError as e:
     # Fallback to local implementation if needed
 
 
+# Pose sampling rate when adaptive sampling is off or has no estimate
+DEFAULT_TARGET_FPS = 10
+# Frames each sequence (whole clip or one repetition) is resampled to for scoring
+SEQUENCE_FRAMES = 40
+# Accepted frames per chunk yielded by iter_pose_chunks
+POSE_CHUNK_FRAMES = 64
+# Streaming mode (evaluate_stream): longest repetition kept for scoring (60 s
+# at 10 fps), whole-clip summary size and repetitions scored per batch
+STREAM_RING_FRAMES = 600
+STREAM_SUMMARY_FRAMES = 256
+STREAM_SCORE_BATCH = 16
+
+
+def _activity_record(activity: Dict, decoded_frames: Optional[int]) -> Dict:
+    """Motion pre-pass figures stored with the result."""
+    fps = activity['fps']
+    return {
+        'segments_seconds': [[round(a / fps, 2), round(b / fps, 2)] for a, b in activity['segments'] or []],
+        'skipped_ratio': float(activity['skipped_ratio']),
+        'decoded_frames': decoded_frames,
+        'prepass_ms': activity['elapsed_ms'],
+    }
+
+
 class HybridPushupEvaluator:
     """
     Production wrapper for hybrid push-up evaluation
@@ -102,6 +203,7 @@ class HybridPushupEvaluator:
         self.pose = None
         self.rule_engine = None
         self.lstm = None
+        self.phase_thresholds = load_phase_thresholds(self.models_dir / 'pushup_rules.json')
         
         if not self._models_loaded:
             self._load_models()
@@ -152,14 +254,34 @@ class HybridPushupEvaluator:
             logger.error(f"Error loading models: {e}")
             raise
     
-    def extract_pose_from_video(self, video_path: str, target_fps: int = 10) -> Tuple[np.ndarray, Dict]:
+    def iter_pose_chunks(self, video_path: str, target_fps: float = 10,
+                         progress_callback: Optional[Callable] = None,
+                         cancel_token: Optional[CancelToken] = None,
+                         on_frame: Optional[Callable] = None,
+                         segments: Optional[List] = None,
+                         keyframe_interval: int = 1,
+                         roi: bool = False,
+                         duplicate_max_distance: Optional[int] = None,
+                         chunk_frames: int = POSE_CHUNK_FRAMES,
+                         stats: Optional[Dict] = None) -> Iterator[Tuple[List[int], np.ndarray, List[bool]]]:
         """
-        Extract pose landmarks from video
+        Pose landmarks of a video as it decodes, chunk by chunk.
         
-        Returns:
-            landmarks_array: (num_frames, 33, 4) array
-            metadata: Dict with extraction info
+        Nothing is kept once a chunk has been yielded, so memory does not
+        grow with the length of the video. Arguments are as in
+        extract_pose_from_video.
+        
+        Yields:
+            (frame_indices, (k, 33, 4) landmarks, duplicate_flags) for up to
+            chunk_frames accepted frames at a time
+        
+        stats, if given, is filled with the extraction figures (counts,
+        average visibility, keyframe/ROI/duplicate stats) once the video
+        has been read.
         """
+        if progress_callback:
+            progress_callback('decoding', 0.0)
+        
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
             raise ValueError(f"Cannot open video: {video_path}")
@@ -168,53 +290,181 @@ class HybridPushupEvaluator:
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         frame_interval = max(1, int(original_fps / target_fps))
         
-        landmarks_list = []
+        chunk_landmarks = []
+        chunk_indices = []
+        chunk_flags = []
         frame_count = 0
         extracted_count = 0
+        visibility_sum = 0.0
+        tracker = LandmarkTracker(keyframe_interval) if keyframe_interval > 1 else None
+        pose_roi = PoseROI() if roi else None
+        dup_filter = DuplicateFrameFilter(duplicate_max_distance) if duplicate_max_distance is not None else None
+        posed = None  # landmarks of the last frame Pose ran on
         
         logger.info(f"Processing video: {Path(video_path).name}")
         logger.info(f"  FPS: {original_fps:.1f}, Target: {target_fps}, Interval: {frame_interval}")
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % frame_interval == 0:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = self.pose.process(frame_rgb)
+        if progress_callback:
+            progress_callback('decoding', 1.0)
+        
+        spans = segments or [(0, None)]
+        span_frames = sum(end - start + 1 for start, end in segments) if segments else total_frames
+        decoded_count = 0
+        ended = False
+        
+        try:
+            for span_start, span_end in spans:
+                if ended:
+                    break
+                if span_start > frame_count:
+                    # Jump over the idle part instead of decoding it
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, span_start)
+                    frame_count = span_start
+                    if tracker is not None:
+                        tracker.reset()
+                    if dup_filter is not None:
+                        dup_filter.reset()
+                    if pose_roi is not None:
+                        # The crop box still frames where the person was before the jump
+                        pose_roi.reset()
                 
-                if results.pose_landmarks:
-                    landmarks = np.array([
-                        [lm.x, lm.y, lm.z, lm.visibility]
-                        for lm in results.pose_landmarks.landmark
-                    ])
+                while cap.isOpened() and (span_end is None or frame_count <= span_end):
+                    if cancel_token is not None and cancel_token.is_cancelled():
+                        logger.info(f"Pose extraction cancelled after {frame_count} frames")
+                        raise AnalysisCancelled(cancel_token.reason)
                     
-                    avg_visibility = landmarks[:, 3].mean()
-                    if avg_visibility >= 0.3:
-                        landmarks_list.append(landmarks)
-                        extracted_count += 1
-            
-            frame_count += 1
+                    ret, frame = cap.read()
+                    if not ret:
+                        ended = True
+                        break
+                    decoded_count += 1
+                    
+                    if frame_count % frame_interval == 0:
+                        landmarks = None
+                        gray = None
+                        duplicate = dup_filter is not None and dup_filter.is_duplicate(frame)
+                        if duplicate:
+                            landmarks = posed
+                        elif tracker is not None:
+                            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                            if not tracker.needs_keyframe():
+                                landmarks = tracker.track(gray)
+                        
+                        if landmarks is None and not duplicate:
+                            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                            if pose_roi is not None:
+                                landmarks = pose_roi.process(self.pose, frame_rgb)
+                            else:
+                                results = self.pose.process(frame_rgb)
+                                if results.pose_landmarks:
+                                    landmarks = np.array([
+                                        [lm.x, lm.y, lm.z, lm.visibility]
+                                        for lm in results.pose_landmarks.landmark
+                                    ])
+                            if tracker is not None:
+                                tracker.set_keyframe(gray, landmarks)
+                            if dup_filter is not None:
+                                dup_filter.mark_posed()
+                            posed = landmarks
+                    
+                        if landmarks is not None:
+                            avg_visibility = landmarks[:, 3].mean()
+                            if avg_visibility >= 0.3:
+                                chunk_landmarks.append(landmarks)
+                                chunk_indices.append(frame_count)
+                                chunk_flags.append(duplicate)
+                                extracted_count += 1
+                                visibility_sum += float(avg_visibility)
+                                if on_frame is not None:
+                                    on_frame(landmarks)
+                                if len(chunk_landmarks) >= chunk_frames:
+                                    yield chunk_indices, np.array(chunk_landmarks), chunk_flags
+                                    chunk_landmarks, chunk_indices, chunk_flags = [], [], []
+                    
+                        if progress_callback and span_frames > 0:
+                            progress_callback('pose', decoded_count / span_frames)
+                
+                    frame_count += 1
+        finally:
+            cap.release()
         
-        cap.release()
+        if chunk_landmarks:
+            yield chunk_indices, np.array(chunk_landmarks), chunk_flags
         
-        if not landmarks_list:
-            raise ValueError("No valid pose landmarks detected in video")
+        if stats is not None:
+            stats.update({
+                'extracted_frames': extracted_count,
+                # Every frame has 33 landmarks, so the mean of the frame means is the overall mean
+                'avg_visibility': visibility_sum / extracted_count if extracted_count else 0.0,
+                'original_fps': float(original_fps),
+                'total_frames': int(total_frames),
+                'frame_interval': int(frame_interval),
+                'decoded_frames': int(decoded_count),
+                'target_fps': float(target_fps),
+            })
+            if tracker is not None:
+                stats['keyframes'] = tracker.stats()
+            if pose_roi is not None:
+                stats['roi'] = pose_roi.stats()
+            if dup_filter is not None:
+                stats['duplicates'] = dup_filter.stats()
+    
+    def extract_pose_from_video(self, video_path: str, target_fps: float = 10,
+                                progress_callback: Optional[Callable] = None,
+                                cancel_token: Optional[CancelToken] = None,
+                                on_frame: Optional[Callable] = None,
+                                segments: Optional[List] = None,
+                                keyframe_interval: int = 1,
+                                roi: bool = False,
+                                duplicate_max_distance: Optional[int] = None) -> Tuple[np.ndarray, Dict]:
+        """
+        Extract pose landmarks from video
         
-        landmarks_array = np.array(landmarks_list)
-        avg_visibility = landmarks_array[:, :, 3].mean()
+        Args:
+            progress_callback: Optional callable(stage, fraction) for progress reporting
+            cancel_token: Optional CancelToken checked between frames
+            on_frame: Optional callable((33, 4) landmarks) for each accepted frame
+            segments: Optional inclusive [start_frame, end_frame] ranges to pose;
+                frames outside them are skipped (default: the whole video)
+            keyframe_interval: Run pose on every Nth sampled frame and track the
+                landmarks with optical flow in between (1 poses every sampled frame)
+            roi: Run pose on a crop around the previous frame's landmarks,
+                re-detecting on the full frame when confidence drops
+            duplicate_max_distance: Reuse the last posed frame's landmarks for
+                frames whose 32x32 difference hash is within this many bits of
+                it (None poses every sampled frame)
+            
+        Returns:
+            landmarks_array: (num_frames, 33, 4) array
+            metadata: Dict with extraction info
+        """
+        stats = {}
+        chunks = []
+        frame_indices = []
+        duplicate_flags = []
+        for indices, landmarks, flags in self.iter_pose_chunks(
+                video_path, target_fps=target_fps, progress_callback=progress_callback,
+                cancel_token=cancel_token, on_frame=on_frame, segments=segments,
+                keyframe_interval=keyframe_interval, roi=roi,
+                duplicate_max_distance=duplicate_max_distance, stats=stats):
+            chunks.append(landmarks)
+            frame_indices.extend(indices)
+            duplicate_flags.extend(flags)
         
-        metadata = {
-            'extracted_frames': extracted_count,
-            'avg_visibility': float(avg_visibility),
-            'original_fps': float(original_fps),
-            'total_frames': int(total_frames),
-            'frame_interval': int(frame_interval),
-        }
+        if not chunks:
+            raise ValueError("No valid pose landmarks detected in video")
         
-        logger.info(f"  Extracted {extracted_count} frames, avg visibility: {avg_visibility:.3f}")
-
+        landmarks_array = np.concatenate(chunks)
+        metadata = {key: value for key, value in stats.items() if key != 'target_fps'}
+        metadata['frame_indices'] = frame_indices
+        if duplicate_max_distance is not None:
+            metadata['duplicate_flags'] = duplicate_flags
+        
+        logger.info(f"  Extracted {stats['extracted_frames']} frames, avg visibility: {stats['avg_visibility']:.3f}")
+        self._log_extraction(video_path, stats)
+        return landmarks_array, metadata
+    
+    def _log_extraction(self, video_path: str, stats: Dict):
         # Agent debug: frame extraction & visibility (Hypothesis C)
         _agent_debug_log(
             hypothesis_id="C",
@@ -222,16 +472,14 @@ class HybridPushupEvaluator:
             message="pose_extraction_summary",
             data={
                 "video_name": Path(video_path).name,
-                "extracted_frames": extracted_count,
-                "total_frames": int(total_frames),
-                "original_fps": float(original_fps),
-                "target_fps": int(target_fps),
-                "frame_interval": int(frame_interval),
-                "avg_visibility": float(avg_visibility),
+                "extracted_frames": stats['extracted_frames'],
+                "total_frames": stats['total_frames'],
+                "original_fps": stats['original_fps'],
+                "target_fps": round(stats['target_fps'], 2),
+                "frame_interval": stats['frame_interval'],
+                "avg_visibility": float(stats['avg_visibility']),
             },
         )
-        
-        return landmarks_array, metadata
     
     def compute_angles(self, landmarks_array: np.ndarray) -> np.ndarray:
         """
@@ -335,179 +583,152 @@ class HybridPushupEvaluator:
         Returns:
             normalized: (target_frames, 10) angles
         """
-        from scipy.interpolate import interp1d
+        return resample_sequence(angles_array, target_frames)
+    
+    def _elbow_angle(self, landmarks: np.ndarray) -> float:
+        """Average of the left and right elbow angles for one (33, 4) frame."""
+        row = self.compute_angles(landmarks[np.newaxis])[0]
+        return float((row[0] + row[1]) / 2.0)
+    
+    def _choose_target_fps(self, video_path: str, preflight: Dict, activity: Optional[Dict],
+                           error_budget_deg: float) -> Tuple[float, Dict]:
+        """
+        Pick the pose frame rate from the tempo of the first repetitions.
         
-        original_frames, num_features = angles_array.shape
+        Returns:
+            (target_fps, sampling metadata for the result)
+        """
+        fps = preflight.get('fps') or 30.0
+        segments = (activity or {}).get('segments') or [[0, max(0, preflight.get('total_frames', 0) - 1)]]
+        active_frames = sum(end - start + 1 for start, end in segments)
+        record = {
+            'default_fps': DEFAULT_TARGET_FPS,
+            'target_fps': DEFAULT_TARGET_FPS,
+            'error_budget_deg': float(error_budget_deg),
+        }
         
-        if original_frames == target_frames:
-            return angles_array
+        # The sparse probe costs more than it can save on short clips
+        if active_frames / fps < 2 * ADAPTIVE_PROBE_SECONDS:
+            record['reason'] = 'clip too short'
+            return DEFAULT_TARGET_FPS, record
         
-        original_time = np.linspace(0, 1, original_frames)
-        target_time = np.linspace(0, 1, target_frames)
+        tempo = estimate_rep_tempo(video_path, self._elbow_angle, start_frame=segments[0][0])
+        record.update(tempo)
+        if tempo['period_seconds'] is None:
+            record['reason'] = 'no clear repetition tempo'
+            return DEFAULT_TARGET_FPS, record
         
-        normalized = np.zeros((target_frames, num_features))
+        target_fps = choose_sample_rate(tempo['period_seconds'], tempo['amplitude_deg'], error_budget_deg)
+        default_posed = active_frames / max(1, int(fps / DEFAULT_TARGET_FPS))
+        adaptive_posed = active_frames / max(1, int(fps / target_fps))
+        record.update({
+            'target_fps': round(target_fps, 2),
+            'effective_fps': round(fps / max(1, int(fps / target_fps)), 2),
+            'frames_saved': int(round(default_posed - adaptive_posed - tempo['probe_frames'])),
+        })
+        logger.info(f"Adaptive sampling: rep period {tempo['period_seconds']:.2f}s, "
+                    f"amplitude {tempo['amplitude_deg']:.0f} deg -> {record['effective_fps']} fps")
+        return target_fps, record
+    
+    def _preflight_exit(self, preflight: Dict, target_fps: int) -> Dict:
+        """INVALID result for a video that failed the pre-flight check."""
+        fps = preflight.get('fps') or 30.0
+        total_frames = preflight.get('total_frames', 0)
+        frames_posed = total_frames / max(1, int(fps / target_fps))
+        saved_ms = estimated_savings_ms(preflight, frames_posed, total_frames)
+        logger.info(f"Pre-flight exit ({preflight['verdict']}), saved ~{saved_ms:.0f} ms of CPU")
         
-        for i in range(num_features):
-            interp_func = interp1d(original_time, angles_array[:, i], kind='linear')
-            normalized[:, i] = interp_func(target_time)
+        if preflight['verdict'] == 'no_person':
+            result = {
+                'exercise': 'pushup',
+                'status': 'INVALID',
+                'score': 0.0,
+                'confidence': 0.0,
+                'confidenceLevel': 'Low',
+                'feedback': 'No person was detected in the video. Make sure your whole body is in frame.',
+                'rule_breakdown': {},
+                'failures': ['No person detected']
+            }
+        else:
+            result = _low_visibility_result(_visibility_to_confidence_level(preflight['avg_visibility']))
         
-        return normalized
+        result['preflight'] = {**preflight, 'cpu_saved_ms': saved_ms}
+        return result
     
-    def evaluate(self, video_path: str) -> Dict:
+    def _score_angles(self, angles: np.ndarray, confidence_level: str,
+                      progress_callback: Optional[Callable] = None, debug: bool = True,
+                      per_rep: bool = False) -> Dict:
         """
-        Full evaluation pipeline
+        Score a sequence of per-frame angles (steps 3-9 of evaluate)
         
         Args:
-            video_path: Path to push-up video
+            angles: (num_frames, 10) angles from compute_angles
+            confidence_level: Visibility label reported with the result
+            debug: Write the debug log entries (off for provisional previews)
+            per_rep: Segment the clip into repetitions and score each one;
+                falls back to scoring the whole clip when none is found
             
         Returns:
             Dict with evaluation results matching backend response format
         """
-        try:
-            # 1. Extract pose
-            landmarks, metadata = self.extract_pose_from_video(video_path)
+        log = _agent_debug_log if debug else (lambda *args, **kwargs: None)
 
-            avg_vis = float(metadata.get("avg_visibility", 0.0))
-            confidence_level = _visibility_to_confidence_level(avg_vis)
-
-            _agent_debug_log(
-                hypothesis_id="C",
-                location="hybrid_pushup_evaluator.py:evaluate",
-                message="landmarks_extracted",
-                data={
-                    "video_name": Path(video_path).name,
-                    "num_valid_frames": int(landmarks.shape[0]),
-                    "avg_visibility": avg_vis,
-                    "confidenceLevel": confidence_level,
-                },
-            )
-            
-            # Check visibility - low detection confidence fallback (min score 30 instead of 0)
-            if avg_vis < 0.3:
-                _agent_debug_log(
-                    hypothesis_id="C",
+        # Debug min/max elbow angles before normalization (Hypotheses A/B)
+        left_elbow = angles[:, 0]
+        right_elbow = angles[:, 1]
+        log(
+            hypothesis_id="A",
+            location="hybrid_pushup_evaluator.py:evaluate",
+            message="raw_elbow_angle_stats",
+            data={
+                "min_left_elbow": float(np.min(left_elbow)),
+                "max_left_elbow": float(np.max(left_elbow)),
+                "min_right_elbow": float(np.min(right_elbow)),
+                "max_right_elbow": float(np.max(right_elbow)),
+                "num_frames": int(angles.shape[0]),
+            },
+        )
+        
+        if per_rep:
+            reps = segment_reps((left_elbow + right_elbow) / 2.0, self.phase_thresholds)
+            if reps:
+                return self._score_reps(angles, reps, confidence_level, progress_callback=progress_callback, log=log)
+        
+        # 3. Normalize to 40 frames
+        sequence = self.normalize_sequence(angles, target_frames=SEQUENCE_FRAMES)
+        
+        # 4. LSTM temporal validation
+        lstm_valid = True
+        lstm_confidence = 0.5
+        
+        if self.lstm is not None:
+            try:
+                log(
+                    hypothesis_id="B",
                     location="hybrid_pushup_evaluator.py:evaluate",
-                    message="early_return_low_visibility",
-                    data={"avg_visibility": avg_vis, "forced_score": 30.0},
+                    message="lstm_input_shape",
+                    data={"sequence_shape": list(sequence.shape)},
                 )
-                return {
-                    'exercise': 'pushup',
-                    'status': 'INVALID',
-                    'score': 30.0,
-                    'confidence': 0.0,
-                    'confidenceLevel': confidence_level,
-                    'feedback': 'Pose detection confidence is low. We could not fully see your movement, but here is a conservative baseline score.',
-                    'rule_breakdown': {},
-                    'failures': ['Low visibility']
-                }
-            
-            # 2. Compute angles
-            angles = self.compute_angles(landmarks)
-
-            # Debug min/max elbow angles before normalization (Hypotheses A/B)
-            left_elbow = angles[:, 0]
-            right_elbow = angles[:, 1]
-            _agent_debug_log(
-                hypothesis_id="A",
-                location="hybrid_pushup_evaluator.py:evaluate",
-                message="raw_elbow_angle_stats",
-                data={
-                    "min_left_elbow": float(np.min(left_elbow)),
-                    "max_left_elbow": float(np.max(left_elbow)),
-                    "min_right_elbow": float(np.min(right_elbow)),
-                    "max_right_elbow": float(np.max(right_elbow)),
-                    "num_frames": int(angles.shape[0]),
-                },
-            )
-            
-            # 3. Normalize to 40 frames
-            sequence = self.normalize_sequence(angles, target_frames=40)
-            
-            # 4. LSTM temporal validation
-            lstm_valid = True
-            lstm_confidence = 0.5
-            
-            if self.lstm is not None:
-                try:
-                    _agent_debug_log(
-                        hypothesis_id="B",
-                        location="hybrid_pushup_evaluator.py:evaluate",
-                        message="lstm_input_shape",
-                        data={"sequence_shape": list(sequence.shape)},
-                    )
-                    lstm_valid, lstm_confidence = self.lstm.predict(sequence)
+                lstm_valid, lstm_confidence = self.lstm.predict(sequence)
 
-                    _agent_debug_log(
-                        hypothesis_id="B",
-                        location="hybrid_pushup_evaluator.py:evaluate",
-                        message="lstm_prediction",
-                        data={
-                            "lstm_valid": bool(lstm_valid),
-                            "lstm_confidence": float(lstm_confidence),
-                        },
-                    )
-                    
-                    if not lstm_valid or lstm_confidence < 0.4:
-                        _agent_debug_log(
-                            hypothesis_id="B",
-                            location="hybrid_pushup_evaluator.py:evaluate",
-                            message="early_return_lstm_invalid",
-                            data={
-                                "lstm_valid": bool(lstm_valid),
-                                "lstm_confidence": float(lstm_confidence),
-                            },
-                        )
-                        return {
-                            'exercise': 'pushup',
-                            'status': 'INVALID',
-                            'score': 0.0,
-                            'confidence': float(lstm_confidence),
-                            'confidenceLevel': confidence_level,
-                            'feedback': 'Temporal motion pattern invalid - possible reversed or incomplete push-up. Please perform a complete, controlled repetition.',
-                            'rule_breakdown': {},
-                            'failures': ['Invalid temporal pattern detected']
-                        }
-                except Exception as e:
-                    logger.warning(f"LSTM prediction failed: {e}")
-                    lstm_confidence = 0.5
-            
-            # 5. Rule-based evaluation
-            if self.rule_engine is not None:
-                rule_result = self.rule_engine.evaluate(sequence)
-
-                phases = rule_result.get('phases', {})
-                avg_elbow = phases.get('avg_elbow_angles', [])
-                if avg_elbow:
-                    avg_elbow_arr = np.array(avg_elbow, dtype=float)
-                    min_elbow = float(np.min(avg_elbow_arr))
-                    max_elbow = float(np.max(avg_elbow_arr))
-                else:
-                    min_elbow = max_elbow = None
-
-                _agent_debug_log(
-                    hypothesis_id="A",
+                log(
+                    hypothesis_id="B",
                     location="hybrid_pushup_evaluator.py:evaluate",
-                    message="rule_engine_result_summary",
+                    message="lstm_prediction",
                     data={
-                        "valid_motion": bool(rule_result.get('valid_motion')),
-                        "total_penalty": float(rule_result.get('total_penalty', 0.0)),
-                        "num_failures": len(rule_result.get('failures', [])),
-                        "bottom_angle": float(phases.get('bottom_angle', 0.0)) if phases else None,
-                        "descent_frames": int(phases.get('descent_frames', 0)) if phases else 0,
-                        "ascent_frames": int(phases.get('ascent_frames', 0)) if phases else 0,
-                        "min_avg_elbow": min_elbow,
-                        "max_avg_elbow": max_elbow,
+                        "lstm_valid": bool(lstm_valid),
+                        "lstm_confidence": float(lstm_confidence),
                     },
                 )
                 
-                if not rule_result['valid_motion']:
-                    _agent_debug_log(
-                        hypothesis_id="D",
+                if not lstm_valid or lstm_confidence < 0.4:
+                    log(
+                        hypothesis_id="B",
                         location="hybrid_pushup_evaluator.py:evaluate",
-                        message="early_return_invalid_motion_structure",
+                        message="early_return_lstm_invalid",
                         data={
-                            "total_penalty": float(rule_result.get('total_penalty', 0.0)),
-                            "failures": rule_result.get('failures', []),
+                            "lstm_valid": bool(lstm_valid),
+                            "lstm_confidence": float(lstm_confidence),
                         },
                     )
                     return {
@@ -516,121 +737,708 @@ class HybridPushupEvaluator:
                         'score': 0.0,
                         'confidence': float(lstm_confidence),
                         'confidenceLevel': confidence_level,
-                        'feedback': 'Push-up motion structure invalid. Ensure you perform complete descent and ascent.',
-                        'rule_breakdown': rule_result.get('component_scores', {}),
-                        'failures': rule_result.get('failures', [])
+                        'feedback': 'Temporal motion pattern invalid - possible reversed or incomplete push-up. Please perform a complete, controlled repetition.',
+                        'rule_breakdown': {},
+                        'failures': ['Invalid temporal pattern detected']
                     }
-                
-                total_penalty = rule_result.get('total_penalty', 0)
-                penalties = rule_result.get('penalties', {})
-                component_scores = rule_result['component_scores']
-                failures = rule_result['failures']
+            except Exception as e:
+                logger.warning(f"LSTM prediction failed: {e}")
+                lstm_confidence = 0.5
+        
+        # 5. Rule-based evaluation
+        if self.rule_engine is not None:
+            rule_result = self.rule_engine.evaluate(sequence)
+
+            phases = rule_result.get('phases', {})
+            avg_elbow = phases.get('avg_elbow_angles', [])
+            if avg_elbow:
+                avg_elbow_arr = np.array(avg_elbow, dtype=float)
+                min_elbow = float(np.min(avg_elbow_arr))
+                max_elbow = float(np.max(avg_elbow_arr))
             else:
-                total_penalty = 50.0  # High default penalty if no rules
-                penalties = {}
-                component_scores = {}
-                failures = []
-            
-            # 6. PENALTY-BASED FINAL SCORE (NEW FORMULA)
-            # Start with perfect score, deduct penalties
-            base_score = 100.0
-            
-            # Subtract rule violations
-            base_score -= total_penalty
-            
-            # LSTM temporal penalty (fixed amount if invalid)
-            # NOTE: lstm_confidence is classifier certainty, NOT form quality
-            if not lstm_valid or lstm_confidence < 0.4:
-                base_score -= 30.0  # Fixed penalty for invalid temporal pattern
-            
-            # Clamp to 0-100 range
-            final_score = max(0.0, min(100.0, base_score))
-            
-            # DEBUG: Log scoring calculation
-            logger.info(f"[PENALTY SCORING] base=100, penalties={total_penalty:.1f}, lstm_penalty={30.0 if (not lstm_valid or lstm_confidence < 0.4) else 0.0}, final={final_score:.1f}")
+                min_elbow = max_elbow = None
 
-            _agent_debug_log(
-                hypothesis_id="D",
+            log(
+                hypothesis_id="A",
                 location="hybrid_pushup_evaluator.py:evaluate",
-                message="final_scoring",
+                message="rule_engine_result_summary",
                 data={
-                    "total_penalty": float(total_penalty),
-                    "lstm_valid": bool(lstm_valid),
-                    "lstm_confidence": float(lstm_confidence),
-                    "final_score": float(final_score),
+                    "valid_motion": bool(rule_result.get('valid_motion')),
+                    "total_penalty": float(rule_result.get('total_penalty', 0.0)),
+                    "num_failures": len(rule_result.get('failures', [])),
+                    "bottom_angle": float(phases.get('bottom_angle', 0.0)) if phases else None,
+                    "descent_frames": int(phases.get('descent_frames', 0)) if phases else 0,
+                    "ascent_frames": int(phases.get('ascent_frames', 0)) if phases else 0,
+                    "min_avg_elbow": min_elbow,
+                    "max_avg_elbow": max_elbow,
                 },
             )
             
-            # 7. Determine status based on final score
-            if final_score >= 80:
-                status = 'GOOD'
-            elif final_score >= 60:
-                status = 'NEEDS_IMPROVEMENT'
+            if not rule_result['valid_motion']:
+                log(
+                    hypothesis_id="D",
+                    location="hybrid_pushup_evaluator.py:evaluate",
+                    message="early_return_invalid_motion_structure",
+                    data={
+                        "total_penalty": float(rule_result.get('total_penalty', 0.0)),
+                        "failures": rule_result.get('failures', []),
+                    },
+                )
+                return {
+                    'exercise': 'pushup',
+                    'status': 'INVALID',
+                    'score': 0.0,
+                    'confidence': float(lstm_confidence),
+                    'confidenceLevel': confidence_level,
+                    'feedback': 'Push-up motion structure invalid. Ensure you perform complete descent and ascent.',
+                    'rule_breakdown': rule_result.get('component_scores', {}),
+                    'failures': rule_result.get('failures', [])
+                }
+            
+            total_penalty = rule_result.get('total_penalty', 0)
+            penalties = rule_result.get('penalties', {})
+            component_scores = rule_result['component_scores']
+            failures = rule_result['failures']
+        else:
+            total_penalty = 50.0  # High default penalty if no rules
+            penalties = {}
+            component_scores = {}
+            failures = []
+        
+        # 6. PENALTY-BASED FINAL SCORE (NEW FORMULA)
+        final_score = _penalty_score(total_penalty, lstm_valid, lstm_confidence)
+        
+        # DEBUG: Log scoring calculation
+        logger.info(f"[PENALTY SCORING] base=100, penalties={total_penalty:.1f}, lstm_penalty={30.0 if (not lstm_valid or lstm_confidence < 0.4) else 0.0}, final={final_score:.1f}")
+
+        log(
+            hypothesis_id="D",
+            location="hybrid_pushup_evaluator.py:evaluate",
+            message="final_scoring",
+            data={
+                "total_penalty": float(total_penalty),
+                "lstm_valid": bool(lstm_valid),
+                "lstm_confidence": float(lstm_confidence),
+                "final_score": float(final_score),
+            },
+        )
+        
+        # 7. Determine status based on final score
+        status = _score_status(final_score)
+        
+        # 8. Generate feedback
+        if progress_callback:
+            progress_callback('feedback', 0.0)
+        feedback = _form_feedback(failures, component_scores)
+        
+        # 9. Return formatted result
+        result = {
+            'exercise': 'pushup',
+            'status': status,
+            'score': float(final_score),  # Already 0-100 range
+            'confidence': float(lstm_confidence),
+            'confidenceLevel': confidence_level,
+            'feedback': feedback,
+            'rule_breakdown': {k: float(v) for k, v in component_scores.items()},
+            'penalties': {k: float(v) for k, v in penalties.items()} if penalties else {},
+            'total_penalty': float(total_penalty) if 'total_penalty' in locals() else 0.0,
+            'failures': failures
+        }
+
+        log(
+            hypothesis_id="D",
+            location="hybrid_pushup_evaluator.py:evaluate",
+            message="final_result",
+            data={"status": status, "score": float(final_score)},
+        )
+
+        return result
+    
+    def _predict_lstm_batch(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """LSTM (valid, confidence) for each (SEQUENCE_FRAMES, 10) sequence of a batch."""
+        n = len(batch)
+        valid, confidence = np.ones(n, dtype=bool), np.full(n, 0.5)
+        if self.lstm is None:
+            return valid, confidence
+        try:
+            if hasattr(self.lstm, 'predict_batch'):
+                predictions = self.lstm.predict_batch(batch)
+            else:
+                predictions = [self.lstm.predict(sequence) for sequence in batch]
+            valid = np.array([bool(v) for v, _ in predictions])
+            confidence = np.array([float(c) for _, c in predictions])
+        except Exception as e:
+            logger.warning(f"LSTM prediction failed: {e}")
+        return valid, confidence
+    
+    def _evaluate_rules_batch(self, batch: np.ndarray) -> List[Optional[Dict]]:
+        """Rule engine result for each sequence of a batch (None without a rule engine)."""
+        if self.rule_engine is None:
+            return [None] * len(batch)
+        if hasattr(self.rule_engine, 'evaluate_batch'):
+            return list(self.rule_engine.evaluate_batch(batch))
+        return [self.rule_engine.evaluate(sequence) for sequence in batch]
+    
+    def _score_reps(self, angles: np.ndarray, reps: List, confidence_level: str,
+                    progress_callback: Optional[Callable] = None, log: Callable = _agent_debug_log) -> Dict:
+        """
+        Score each repetition on its own and aggregate.
+        
+        Every repetition is resampled to SEQUENCE_FRAMES and the whole set
+        goes through the LSTM and the rule engine as one batch. A repetition
+        the LSTM or the rules reject scores 0, as a whole clip would.
+        """
+        batch = resample_batch([angles[rep.start:rep.end + 1] for rep in reps], SEQUENCE_FRAMES)
+        scored = self._score_rep_batch(batch, reps)
+        return self._aggregate_reps(scored, confidence_level, progress_callback=progress_callback, log=log)
+    
+    def _score_rep_batch(self, batch: np.ndarray, reps: List, first_number: int = 1) -> List[Tuple[Dict, Dict, Dict]]:
+        """
+        Score (n, SEQUENCE_FRAMES, 10) resampled repetitions.
+        
+        Returns:
+            (rep result, component scores, penalties with 'total') per repetition
+        """
+        lstm_valid, lstm_confidence = self._predict_lstm_batch(batch)
+        rule_results = self._evaluate_rules_batch(batch)
+        
+        scored = []
+        for i, (rep, rule_result) in enumerate(zip(reps, rule_results)):
+            if rule_result is not None:
+                valid_motion = bool(rule_result.get('valid_motion', True))
+                total_penalty = float(rule_result.get('total_penalty', 0.0))
+                penalties = rule_result.get('penalties', {}) or {}
+                component_scores = rule_result.get('component_scores', {}) or {}
+                failures = list(rule_result.get('failures', []))
             else:
-                status = 'BAD'
+                valid_motion, total_penalty, penalties, component_scores, failures = True, 50.0, {}, {}, []
             
-            # 8. Generate feedback
-            if not failures:
-                feedback = "Great form! Your push-up shows good depth, body alignment, and symmetry. Keep up the excellent work!"
+            temporal_ok = bool(lstm_valid[i]) and lstm_confidence[i] >= 0.4
+            if not temporal_ok:
+                failures = failures + ['Invalid temporal pattern detected']
+            if valid_motion and temporal_ok:
+                score = _penalty_score(total_penalty, True, float(lstm_confidence[i]))
+                status = _score_status(score)
             else:
-                feedback_parts = ["Areas for improvement:"]
-                for failure in failures[:3]:  # Limit to top 3
-                    feedback_parts.append(f"• {failure}")
-                
-                if component_scores.get('elbow_depth', 1.0) < 0.7:
-                    feedback_parts.append("\nTip: Lower your chest closer to the ground.")
-                if component_scores.get('body_alignment', 1.0) < 0.7:
-                    feedback_parts.append("Tip: Engage your core to keep your body straight.")
-                
-                feedback = "\n".join(feedback_parts)
+                score, status = 0.0, 'INVALID'
             
-            # 9. Return formatted result
-            result = {
-                'exercise': 'pushup',
+            scored.append(({
+                'rep': first_number + i,
+                'start_frame': int(rep.start),
+                'bottom_frame': int(rep.bottom),
+                'end_frame': int(rep.end),
+                'min_elbow_angle': float(rep.min_angle),
+                'score': float(score),
                 'status': status,
-                'score': float(final_score),  # Already 0-100 range
-                'confidence': float(lstm_confidence),
-                'confidenceLevel': confidence_level,
-                'feedback': feedback,
-                'rule_breakdown': {k: float(v) for k, v in component_scores.items()},
-                'penalties': {k: float(v) for k, v in penalties.items()} if penalties else {},
-                'total_penalty': float(total_penalty) if 'total_penalty' in locals() else 0.0,
-                'failures': failures
-            }
+                'confidence': float(lstm_confidence[i]),
+                'failures': failures,
+            }, component_scores, dict(penalties, total=total_penalty)))
+        return scored
+    
+    def _aggregate_reps(self, scored: List[Tuple[Dict, Dict, Dict]], confidence_level: str,
+                        progress_callback: Optional[Callable] = None, log: Callable = _agent_debug_log) -> Dict:
+        """Overall result from the per-repetition scores of _score_rep_batch."""
+        rep_results = [rep_result for rep_result, _, _ in scored]
+        component_rows = [components for _, components, _ in scored]
+        penalty_rows = [penalties for _, _, penalties in scored]
+        failure_counts: Dict[str, int] = {}
+        for rep_result in rep_results:
+            for failure in rep_result['failures']:
+                failure_counts[failure] = failure_counts.get(failure, 0) + 1
+        
+        def mean_of(rows: List[Dict]) -> Dict:
+            keys = {k for row in rows for k in row}
+            return {k: float(np.mean([row[k] for row in rows if k in row])) for k in sorted(keys)}
+        
+        scores = np.array([r['score'] for r in rep_results])
+        final_score = float(scores.mean())
+        component_scores = mean_of(component_rows)
+        penalties = mean_of(penalty_rows)
+        total_penalty = penalties.pop('total', 0.0)
+        # Most frequent first, so the feedback names the problems of most reps
+        failures = sorted(failure_counts, key=lambda f: -failure_counts[f])
+        
+        if progress_callback:
+            progress_callback('feedback', 0.0)
+        if all(r['status'] == 'INVALID' for r in rep_results):
+            status = 'INVALID'
+            feedback = 'Push-up motion structure invalid. Ensure you perform complete descent and ascent.'
+        else:
+            status = _score_status(final_score)
+            feedback = _form_feedback(failures, component_scores)
+        
+        logger.info(f"[REP SCORING] {len(rep_results)} reps, scores={[round(x, 1) for x in scores]}, final={final_score:.1f}")
+        log(
+            hypothesis_id="D",
+            location="hybrid_pushup_evaluator.py:_score_reps",
+            message="per_rep_scoring",
+            data={"reps": len(rep_results), "scores": scores.tolist(), "final_score": final_score},
+        )
+        
+        return {
+            'exercise': 'pushup',
+            'status': status,
+            'score': final_score,
+            'confidence': float(np.mean([r['confidence'] for r in rep_results])),
+            'confidenceLevel': confidence_level,
+            'feedback': feedback,
+            'rule_breakdown': component_scores,
+            'penalties': penalties,
+            'total_penalty': float(total_penalty),
+            'failures': failures,
+            'rep_count': len(rep_results),
+            'reps': rep_results,
+        }
+    
+    def _plan_extraction(self, video_path: str, progress_callback: Optional[Callable],
+                         activity_padding: Optional[float], sampling_error_deg: Optional[float]
+                         ) -> Tuple[Dict, Optional[Dict], float, Optional[Dict]]:
+        """
+        Steps 0-0c of evaluate: pre-flight, motion pre-pass and sampling rate.
+        
+        Returns:
+            (preflight, activity or None, target_fps, sampling record or None);
+            only preflight is meaningful when its verdict is not 'ok'
+        """
+        # 0. Pre-flight on a few frames: give up before decoding the whole
+        #    video when nobody is in it or visibility is hopeless
+        if progress_callback:
+            progress_callback('decoding', 0.0)
+        preflight = run_preflight(video_path)
+        if preflight['verdict'] != 'ok':
+            return preflight, None, DEFAULT_TARGET_FPS, None
+        
+        # 0b. Motion pre-pass: only pose the active part(s) of the clip
+        activity = None
+        if activity_padding is not None:
+            activity = find_active_segments(video_path, padding_seconds=activity_padding)
+        
+        # 0c. Adaptive sampling: pose rate from the repetition tempo
+        target_fps, sampling = DEFAULT_TARGET_FPS, None
+        if sampling_error_deg is not None:
+            target_fps, sampling = self._choose_target_fps(video_path, preflight, activity, sampling_error_deg)
+        return preflight, activity, target_fps, sampling
+    
+    def extract_track(self, video_path: str, progress_callback: Optional[Callable] = None,
+                      cancel_token: Optional[CancelToken] = None,
+                      on_frame: Optional[Callable] = None,
+                      activity_padding: Optional[float] = 1.0,
+                      sampling_error_deg: Optional[float] = None,
+                      keyframe_interval: int = 1,
+                      roi: bool = False,
+                      duplicate_max_distance: Optional[int] = None) -> LandmarkTrack:
+        """
+        Dense landmark extraction (steps 0-1 of evaluate), shared with the
+        other exercise evaluators.
+        
+        Args:
+            on_frame: Optional callable((33, 4) landmarks) for each accepted frame
+            (other arguments as in evaluate)
+            
+        Returns:
+            LandmarkTrack; empty if the pre-flight failed or no pose was found
+        """
+        preflight, activity, target_fps, sampling = self._plan_extraction(
+            video_path, progress_callback, activity_padding, sampling_error_deg)
+        if preflight['verdict'] != 'ok':
+            return LandmarkTrack.empty(preflight, dense=True)
+        
+        # 1. Extract pose
+        try:
+            landmarks, metadata = self.extract_pose_from_video(
+                video_path, target_fps=target_fps, progress_callback=progress_callback, cancel_token=cancel_token,
+                on_frame=on_frame,
+                segments=activity['segments'] if activity else None,
+                keyframe_interval=keyframe_interval,
+                roi=roi,
+                duplicate_max_distance=duplicate_max_distance
+            )
+        except ValueError as e:
+            # No usable pose; the evaluators report it in their own format
+            return LandmarkTrack.empty(preflight, dense=True, error=str(e))
+        
+        if sampling is not None:
+            metadata['sampling'] = sampling
+        if activity is not None:
+            metadata['activity'] = _activity_record(activity, metadata.get('decoded_frames'))
+        return LandmarkTrack(
+            landmarks=landmarks,
+            frame_indices=metadata.pop('frame_indices'),
+            fps=metadata['original_fps'] or preflight.get('fps') or 30.0,
+            total_frames=metadata['total_frames'],
+            dense=True,
+            preflight=preflight,
+            metadata=metadata,
+        )
+    
+    def score_track(self, track: LandmarkTrack, progress_callback: Optional[Callable] = None,
+                    preview: Optional['ProgressivePreview'] = None, per_rep: bool = False) -> Dict:
+        """
+        Score a landmark track (steps 2-9 of evaluate)
+        
+        Args:
+            preview: ProgressivePreview fed during extraction of this track;
+                its angles are reused and its summary added to the result
+            
+        Returns:
+            Dict with evaluation results matching backend response format
+        """
+        if track.preflight.get('verdict') != 'ok':
+            return self._preflight_exit(track.preflight, target_fps=DEFAULT_TARGET_FPS)
+        if track.error is not None:
+            logger.error(f"Evaluation error: {track.error}")
+            return _invalid_result(track.error, track.error)
+        
+        metadata = track.metadata
+        landmarks = track.landmarks
+        avg_vis = float(metadata.get("avg_visibility", 0.0))
+        confidence_level = _visibility_to_confidence_level(avg_vis)
 
+        _agent_debug_log(
+            hypothesis_id="C",
+            location="hybrid_pushup_evaluator.py:evaluate",
+            message="landmarks_extracted",
+            data={
+                "num_valid_frames": int(landmarks.shape[0]),
+                "avg_visibility": avg_vis,
+                "confidenceLevel": confidence_level,
+            },
+        )
+        
+        # Check visibility - low detection confidence fallback (min score 30 instead of 0)
+        if avg_vis < 0.3:
             _agent_debug_log(
-                hypothesis_id="D",
+                hypothesis_id="C",
                 location="hybrid_pushup_evaluator.py:evaluate",
-                message="final_result",
-                data={"status": status, "score": float(final_score)},
+                message="early_return_low_visibility",
+                data={"avg_visibility": avg_vis, "forced_score": 30.0},
             )
+            return _low_visibility_result(confidence_level)
+        
+        # 2. Compute angles (already done frame by frame in progressive mode)
+        if progress_callback:
+            progress_callback('scoring', 0.0)
+        angles = preview.angles() if preview is not None else self.compute_angles(landmarks)
 
-            return result
+        # 3-9. Score
+        result = self._score_angles(angles, confidence_level, progress_callback=progress_callback,
+                                    per_rep=per_rep)
+        result['preflight'] = {**track.preflight, 'cpu_saved_ms': 0.0}
+        for key in ('sampling', 'keyframes', 'roi', 'duplicates', 'activity'):
+            if key in metadata:
+                result[key] = metadata[key]
+        if preview is not None:
+            result.update(preview.summary())
+        return result
+    
+    def evaluate(self, video_path: str, progress_callback: Optional[Callable] = None,
+                 cancel_token: Optional[CancelToken] = None,
+                 preview_callback: Optional[Callable] = None,
+                 activity_padding: Optional[float] = 1.0,
+                 sampling_error_deg: Optional[float] = None,
+                 keyframe_interval: int = 1,
+                 roi: bool = False,
+                 duplicate_max_distance: Optional[int] = None,
+                 per_rep: bool = False) -> Dict:
+        """
+        Full evaluation pipeline
+        
+        Args:
+            video_path: Path to push-up video
+            progress_callback: Optional callable(stage, fraction) for progress reporting
+            cancel_token: Optional CancelToken; AnalysisCancelled propagates to the caller
+            preview_callback: Optional callable(dict); enables progressive mode, which
+                scores the repetitions completed so far while frames are still decoding
+            activity_padding: Seconds kept around the active segments found by the
+                motion pre-pass; None poses the whole video
+            sampling_error_deg: Angular error budget for adaptive sampling, which
+                picks the pose frame rate from the repetition tempo; None keeps 10 fps
+            keyframe_interval: Pose every Nth sampled frame and track landmarks
+                with optical flow in between; 1 poses every sampled frame
+            roi: Run pose on a crop around the person instead of the full frame
+            duplicate_max_distance: Hash distance (bits) under which a frame is
+                treated as a duplicate of the last posed one; None disables skipping
+            per_rep: Score each repetition separately and report per-rep scores
+                with their average as the overall score
+            
+        Returns:
+            Dict with evaluation results matching backend response format
+        """
+        preview = ProgressivePreview(self, preview_callback) if preview_callback else None
+        try:
+            track = self.extract_track(
+                video_path, progress_callback=progress_callback, cancel_token=cancel_token,
+                on_frame=preview.add_frame if preview is not None else None,
+                activity_padding=activity_padding,
+                sampling_error_deg=sampling_error_deg,
+                keyframe_interval=keyframe_interval,
+                roi=roi,
+                duplicate_max_distance=duplicate_max_distance
+            )
+            return self.score_track(track, progress_callback=progress_callback, preview=preview, per_rep=per_rep)
             
+        except AnalysisCancelled:
+            raise
         except ValueError as e:
             logger.error(f"Evaluation error: {e}")
-            return {
-                'exercise': 'pushup',
-                'status': 'INVALID',
-                'score': 0.0,
-                'confidence': 0.0,
-                'confidenceLevel': 'Low',
-                'feedback': str(e),
-                'rule_breakdown': {},
-                'failures': [str(e)]
-            }
+            return _invalid_result(str(e), str(e))
         except Exception as e:
             logger.error(f"Unexpected error in evaluation: {e}", exc_info=True)
-            return {
-                'exercise': 'pushup',
-                'status': 'INVALID',
-                'score': 0.0,
-                'confidence': 0.0,
-                'confidenceLevel': 'Low',
-                'feedback': 'An error occurred during analysis. Please try again.',
-                'rule_breakdown': {},
-                'failures': ['Processing error']
-            }
+            return _invalid_result('An error occurred during analysis. Please try again.', 'Processing error')
+    
+    def evaluate_stream(self, video_path: str, progress_callback: Optional[Callable] = None,
+                        cancel_token: Optional[CancelToken] = None,
+                        activity_padding: Optional[float] = 1.0,
+                        sampling_error_deg: Optional[float] = None,
+                        keyframe_interval: int = 1,
+                        roi: bool = False,
+                        duplicate_max_distance: Optional[int] = None,
+                        per_rep: bool = False) -> Tuple[Dict, 'StreamingScorer']:
+        """
+        Evaluate without holding the whole landmark sequence in memory.
+        
+        Same steps and arguments as evaluate, but frames go from the decoder
+        to a StreamingScorer chunk by chunk, so peak memory does not depend
+        on the length of the video. There is no progressive preview.
+        
+        Returns:
+            (result, scorer); the scorer still holds the per-repetition
+            embeddings (see StreamingScorer.rep_vectors)
+        """
+        scorer = StreamingScorer(self, per_rep=per_rep)
+        try:
+            preflight, activity, target_fps, sampling = self._plan_extraction(
+                video_path, progress_callback, activity_padding, sampling_error_deg)
+            if preflight['verdict'] != 'ok':
+                return self._preflight_exit(preflight, target_fps=DEFAULT_TARGET_FPS), scorer
+            
+            stats = {}
+            for _, landmarks, _ in self.iter_pose_chunks(
+                    video_path, target_fps=target_fps, progress_callback=progress_callback,
+                    cancel_token=cancel_token, segments=activity['segments'] if activity else None,
+                    keyframe_interval=keyframe_interval, roi=roi,
+                    duplicate_max_distance=duplicate_max_distance, stats=stats):
+                scorer.add_chunk(landmarks)
+            
+            if scorer.frames == 0:
+                error = "No valid pose landmarks detected in video"
+                logger.error(f"Evaluation error: {error}")
+                return _invalid_result(error, error), scorer
+            logger.info(f"  Streamed {stats['extracted_frames']} frames, avg visibility: {stats['avg_visibility']:.3f}")
+            self._log_extraction(video_path, stats)
+            
+            if progress_callback:
+                progress_callback('scoring', 0.0)
+            result = scorer.result(progress_callback=progress_callback)
+            result['preflight'] = {**preflight, 'cpu_saved_ms': 0.0}
+            if sampling is not None:
+                result['sampling'] = sampling
+            if activity is not None:
+                result['activity'] = _activity_record(activity, stats.get('decoded_frames'))
+            for key in ('keyframes', 'roi', 'duplicates'):
+                if key in stats:
+                    result[key] = stats[key]
+            result['streaming'] = scorer.stats()
+            return result, scorer
+            
+        except AnalysisCancelled:
+            raise
+        except ValueError as e:
+            logger.error(f"Evaluation error: {e}")
+            return _invalid_result(str(e), str(e)), scorer
+        except Exception as e:
+            logger.error(f"Unexpected error in evaluation: {e}", exc_info=True)
+            return _invalid_result('An error occurred during analysis. Please try again.', 'Processing error'), scorer
+
+
+class ProgressivePreview:
+    """
+    Progressive mode for HybridPushupEvaluator.evaluate.
+
+    Angles are computed as each frame is extracted; whenever a repetition
+    completes, that repetition alone is scored and the per-repetition
+    scores so far are aggregated into a provisional result, so a preview
+    costs one repetition however long the clip. The final result reuses
+    the computed angles.
+    """
+
+    def __init__(self, evaluator: 'HybridPushupEvaluator', callback: Callable):
+        self.evaluator = evaluator
+        self.callback = callback
+        self.detector = IncrementalRepDetector.from_rules(evaluator.models_dir / 'pushup_rules.json')
+        self.started = time.perf_counter()
+        self.first_score_ms = None
+        self.previews = 0
+        self._angles = []
+        self._visibility = []
+        self._scored = []
+
+    def add_frame(self, landmarks: np.ndarray):
+        row = self.evaluator.compute_angles(landmarks[np.newaxis])[0]
+        self._angles.append(row)
+        self._visibility.append(float(landmarks[:, 3].mean()))
+
+        rep = self.detector.update(len(self._angles) - 1, float((row[0] + row[1]) / 2.0))
+        if rep is not None and rep.end - rep.start + 1 >= 3:
+            self._publish(rep)
+
+    def _publish(self, rep: Rep):
+        confidence_level = _visibility_to_confidence_level(np.mean(self._visibility))
+        try:
+            window = resample_sequence(np.array(self._angles[rep.start:rep.end + 1]), SEQUENCE_FRAMES)
+            self._scored.extend(self.evaluator._score_rep_batch(window[np.newaxis], [rep],
+                                                                first_number=len(self._scored) + 1))
+            result = self.evaluator._aggregate_reps(self._scored, confidence_level,
+                                                    log=lambda *args, **kwargs: None)
+        except Exception as e:
+            logger.warning(f"Provisional scoring failed: {e}")
+            return
+
+        elapsed_ms = (time.perf_counter() - self.started) * 1000.0
+        if self.first_score_ms is None:
+            self.first_score_ms = elapsed_ms
+            logger.info(f"First provisional score after {elapsed_ms:.0f} ms")
+        self.previews += 1
+
+        try:
+            self.callback({
+                'provisional': True,
+                'score': float(result['score']),
+                'status': result['status'],
+                'confidenceLevel': confidence_level,
+                'reps': len(self.detector.reps),
+                'frames': len(self._angles),
+                'time_to_first_score_ms': round(self.first_score_ms),
+                'elapsed_ms': round(elapsed_ms),
+            })
+        except Exception as e:
+            # Previews are best effort; never fail the evaluation over one
+            logger.warning(f"Publishing provisional score failed: {e}")
+
+    def angles(self) -> np.ndarray:
+        return np.array(self._angles)
+
+    def summary(self) -> Dict:
+        """Timing figures stored with the final result."""
+        total_ms = (time.perf_counter() - self.started) * 1000.0
+        return {
+            'reps_detected': len(self.detector.reps),
+            'provisional_scores': self.previews,
+            # Without a complete repetition the first score is the final one
+            'time_to_first_score_ms': round(self.first_score_ms if self.first_score_ms is not None else total_ms),
+        }
+
+
+class StreamingScorer:
+    """
+    Constant-memory scoring for HybridPushupEvaluator.evaluate_stream.
+    
+    Angles of the repetition in progress are kept in a ring buffer of
+    ring_frames frames. Each completed repetition is resampled to
+    SEQUENCE_FRAMES, scored in batches of STREAM_SCORE_BATCH and only its
+    result and embedding are kept. A decimated copy of the whole clip (at
+    most summary_frames frames, halving its rate whenever it fills up)
+    stands in for the full sequence when the clip is scored as a whole.
+    """
+    
+    def __init__(self, evaluator: 'HybridPushupEvaluator', per_rep: bool = False,
+                 ring_frames: int = STREAM_RING_FRAMES, summary_frames: int = STREAM_SUMMARY_FRAMES):
+        self.evaluator = evaluator
+        self.per_rep = per_rep
+        self.detector = IncrementalRepDetector(**evaluator.phase_thresholds)
+        self.ring_frames = ring_frames
+        self.summary_frames = summary_frames
+        # compute_angles columns, then the ml.dtw joint angles used for embeddings
+        self._ring = np.zeros((ring_frames, 10 + len(JOINT_NAMES)))
+        self._summary = []
+        self._summary_step = 1
+        self._pending = []
+        self._scored = []
+        self._embeddings = []
+        self.frames = 0
+        self.dropped_reps = 0
+        self._visibility_sum = 0.0
+    
+    def add_chunk(self, landmarks: np.ndarray):
+        """Feed (k, 33, 4) landmarks of consecutive accepted frames."""
+        rows = np.hstack([self.evaluator.compute_angles(landmarks), joint_angles(landmarks)])
+        self._visibility_sum += float(landmarks[:, :, 3].mean(axis=1).sum())
+        for row in rows:
+            index = self.frames
+            self.frames += 1
+            self._ring[index % self.ring_frames] = row
+            
+            if index % self._summary_step == 0:
+                self._summary.append(row.copy())  # a view would pin its whole chunk
+                if len(self._summary) >= self.summary_frames:
+                    self._summary = self._summary[::2]
+                    self._summary_step *= 2
+            
+            rep = self.detector.update(index, float((row[0] + row[1]) / 2.0))
+            if rep is not None and self.per_rep:
+                self._complete(rep)
+    
+    def _complete(self, rep: Rep):
+        if rep.end - rep.start + 1 < 3:
+            return
+        if self.frames - rep.start > self.ring_frames:
+            # Longer than the ring buffer: its first frames are gone
+            self.dropped_reps += 1
+            return
+        window = self._ring[np.arange(rep.start, rep.end + 1) % self.ring_frames]
+        self._pending.append((rep, resample_sequence(window[:, :10], SEQUENCE_FRAMES),
+                              rep_embedding(window[:, 10:])))
+        if len(self._pending) >= STREAM_SCORE_BATCH:
+            self._flush()
+    
+    def _flush(self):
+        if not self._pending:
+            return
+        reps, sequences, embeddings = zip(*self._pending)
+        scored = self.evaluator._score_rep_batch(np.stack(sequences), list(reps), first_number=len(self._scored) + 1)
+        self._scored.extend(scored)
+        self._embeddings.extend(embeddings)
+        self._pending = []
+    
+    def result(self, progress_callback: Optional[Callable] = None) -> Dict:
+        """Final result, in the same format as HybridPushupEvaluator.score_track."""
+        avg_vis = self._visibility_sum / max(1, self.frames)
+        confidence_level = _visibility_to_confidence_level(avg_vis)
+        if avg_vis < 0.3:
+            return _low_visibility_result(confidence_level)
+        
+        rep = self.detector.finish()
+        if rep is not None and self.per_rep:
+            self._complete(rep)
+        self._flush()
+        if self._scored:
+            return self.evaluator._aggregate_reps(self._scored, confidence_level, progress_callback=progress_callback)
+        summary = np.array(self._summary)[:, :10]
+        return self.evaluator._score_angles(summary, confidence_level, progress_callback=progress_callback)
+    
+    def joint_angles(self) -> Tuple[np.ndarray, int]:
+        """(rows, joints) ml.dtw joint angles of the decimated clip and the frames per row."""
+        if not self._summary:
+            return np.zeros((0, len(JOINT_NAMES))), 1
+        return np.array(self._summary)[:, 10:], self._summary_step
+    
+    def rep_vectors(self, result: Dict) -> List[Tuple[int, float, np.ndarray]]:
+        """(rep_index, score, embedding) per scored repetition, or for the whole clip."""
+        if self._scored:
+            return [(rep_result['rep'] - 1, rep_result['score'], embedding)
+                    for (rep_result, _, _), embedding in zip(self._scored, self._embeddings)]
+        if not self._summary:
+            return []
+        summary = np.array(self._summary)[:, 10:]
+        return [(0, float(result.get('form_score', result.get('score', 0.0))), rep_embedding(summary))]
+    
+    def stats(self) -> Dict:
+        return {
+            'frames': self.frames,
+            'ring_frames': self.ring_frames,
+            'summary_step': self._summary_step,
+            'dropped_reps': self.dropped_reps,
+        }
 
 
 # Singleton instance
@@ -0,0 +1,128 @@
+"""
+Pose landmarks shared between exercise evaluators.
+
+One extraction stage turns a video into a LandmarkTrack; every evaluator
+scores from that track instead of decoding and posing the video again.
+Tracks are cached per video file and extraction options, so scoring the
+same video with another evaluator costs no extra pose pass.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+LANDMARK_CACHE_SIZE = 8
+
+# Shoulder, elbow, wrist, hip, knee, ankle and foot index of each side
+SIDE_LANDMARKS = {
+    'left': [11, 13, 15, 23, 25, 27, 31],
+    'right': [12, 14, 16, 24, 26, 28, 32],
+}
+SIDE_VISIBILITY_MARGIN = 0.15
+
+
+@dataclass
+class LandmarkTrack:
+    """Pose landmarks of one video in full-frame normalised coordinates."""
+    landmarks: np.ndarray  # (frames, 33, 4): x, y, z, visibility
+    frame_indices: List[int]
+    fps: float
+    total_frames: int
+    dense: bool  # every sampled frame of the active span, not just a short window
+    preflight: Dict
+    metadata: Dict = field(default_factory=dict)
+    error: Optional[str] = None  # extraction ran but found no usable pose
+
+    @classmethod
+    def empty(cls, preflight: Dict, dense: bool, error: Optional[str] = None) -> 'LandmarkTrack':
+        return cls(
+            landmarks=np.zeros((0, 33, 4)),
+            frame_indices=[],
+            fps=preflight.get('fps') or 30.0,
+            total_frames=preflight.get('total_frames', 0),
+            dense=dense,
+            preflight=preflight,
+            error=error,
+        )
+
+    @property
+    def usable(self) -> bool:
+        return self.preflight.get('verdict') == 'ok' and self.error is None and len(self.landmarks) > 0
+
+
+def select_motion_window(track: LandmarkTrack, window_seconds: float = 5.0, desired: int = 12) -> np.ndarray:
+    """
+    Indices into the track of desired evenly spaced frames from the
+    window_seconds window with the most landmark motion.
+    """
+    n = len(track.landmarks)
+    if n <= desired:
+        return np.arange(n)
+
+    times = np.asarray(track.frame_indices, dtype=float) / (track.fps or 30.0)
+    motion = np.r_[0.0, np.abs(np.diff(track.landmarks[:, :, :2], axis=0)).mean(axis=(1, 2))]
+    cumulative = np.cumsum(motion)
+    ends = np.searchsorted(times, times + window_seconds, side='right') - 1
+    energy = cumulative[ends] - cumulative
+    start = int(np.argmax(energy))
+    end = int(ends[start])
+    if end - start + 1 < desired:
+        # Window too sparse: widen it to enough frames
+        end = min(n - 1, start + desired - 1)
+        start = max(0, end - desired + 1)
+    return np.unique(np.linspace(start, end, desired).round().astype(int))
+
+
+def detect_side(landmarks: np.ndarray, margin: float = SIDE_VISIBILITY_MARGIN) -> Optional[str]:
+    """
+    'left' or 'right' if that side of the body is clearly the one facing
+    the camera (mean visibility ahead by margin), None for a frontal view.
+    """
+    if not len(landmarks):
+        return None
+    left = float(landmarks[:, SIDE_LANDMARKS['left'], 3].mean())
+    right = float(landmarks[:, SIDE_LANDMARKS['right'], 3].mean())
+    if abs(left - right) < margin:
+        return None
+    return 'left' if left > right else 'right'
+
+
+class LandmarkCache:
+    """Small LRU of landmark tracks keyed by video file, extraction options and density."""
+
+    def __init__(self, max_entries: int = LANDMARK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _video_id(video_path: str):
+        stat = os.stat(video_path)
+        return os.path.realpath(video_path), stat.st_size, stat.st_mtime_ns
+
+    def get(self, video_path: str, options_key, dense: bool) -> Optional[LandmarkTrack]:
+        """A cached track; a dense one also serves requests for a sparse track."""
+        video_id = self._video_id(video_path)
+        with self._lock:
+            for key in ((video_id, options_key, True),) if dense else \
+                    ((video_id, options_key, True), (video_id, options_key, False)):
+                track = self._entries.get(key)
+                if track is not None:
+                    self._entries.move_to_end(key)
+                    return track
+        return None
+
+    def put(self, video_path: str, options_key, track: LandmarkTrack):
+        key = (self._video_id(video_path), options_key, track.dense)
+        with self._lock:
+            self._entries[key] = track
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+cache = LandmarkCache()
@@ -0,0 +1,107 @@
+"""
+Pre-flight check before full pose extraction.
+
+Runs a static-image MediaPipe Pose on a handful of evenly spaced frames. If
+nobody is detected, or the body is so poorly visible that the full pass
+would end in the low-visibility result anyway, the caller can return that
+result straight away instead of decoding and posing the whole video.
+"""
+
+import time
+import logging
+from typing import Dict
+
+import cv2
+import numpy as np
+
+from ml.static_pose import get_pool
+
+logger = logging.getLogger(__name__)
+
+PREFLIGHT_FRAMES = 6
+MIN_VISIBILITY = 0.3
+
+
+def run_preflight(video_path: str, num_frames: int = PREFLIGHT_FRAMES,
+                  min_visibility: float = MIN_VISIBILITY) -> Dict:
+    """
+    Pose a few evenly spaced frames of a video.
+
+    Returns:
+        Dict with 'verdict' ('ok', 'no_person' or 'low_visibility'), the
+        sampled/detected frame counts, mean visibility over the frames with
+        a person, the video's fps/frame count and the time spent (ms).
+    """
+    started = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video: {video_path}")
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        if total_frames <= 0:
+            # Unknown length (some containers): let the full pass decide
+            return {'verdict': 'ok', 'sampled': 0, 'detected': 0, 'total_frames': total_frames,
+                    'fps': fps, 'elapsed_ms': (time.perf_counter() - started) * 1000.0}
+
+        # Skip the very first/last frames, which are often the user walking in or out
+        positions = np.linspace(0, total_frames - 1, num=num_frames + 2)[1:-1]
+        pool = get_pool()
+        visibilities = []
+        sampled = 0
+        for idx in sorted({int(round(p)) for p in positions}):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                continue
+            sampled += 1
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            with pool.acquire() as pose:
+                results = pose.process(rgb)
+            if results.pose_landmarks:
+                visibilities.append(float(np.mean([lm.visibility for lm in results.pose_landmarks.landmark])))
+    finally:
+        cap.release()
+
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    # Frames where the user stepped out say nothing about how well they
+    # are seen when present; only a person who is always hard to see exits
+    detected = len(visibilities)
+    avg_visibility = float(np.mean(visibilities)) if visibilities else 0.0
+
+    if sampled == 0:
+        verdict = 'ok'  # could not seek; let the full pass decide
+    elif detected == 0:
+        verdict = 'no_person'
+    elif avg_visibility < min_visibility:
+        verdict = 'low_visibility'
+    else:
+        verdict = 'ok'
+
+    logger.info(f"Preflight {verdict}: {detected}/{sampled} frames with a person, "
+                f"visibility {avg_visibility:.3f}, {elapsed_ms:.0f} ms")
+    return {
+        'verdict': verdict,
+        'sampled': sampled,
+        'detected': detected,
+        'avg_visibility': avg_visibility,
+        'total_frames': total_frames,
+        'fps': fps,
+        'elapsed_ms': elapsed_ms,
+    }
+
+
+def estimated_savings_ms(preflight: Dict, frames_posed: float, frames_decoded: float,
+                         decode_ms_per_frame: float = 2.0) -> float:
+    """CPU time an early exit saved.
+
+    Pose time per frame is taken from the pre-flight itself; the full pass
+    would have posed frames_posed frames and decoded frames_decoded.
+    """
+    sampled = preflight.get('sampled') or 0
+    if sampled == 0:
+        return 0.0
+    pose_ms_per_frame = preflight['elapsed_ms'] / sampled
+    full_pass_ms = frames_posed * pose_ms_per_frame + frames_decoded * decode_ms_per_frame
+    return max(0.0, full_pass_ms - preflight['elapsed_ms'])
@@ -0,0 +1,168 @@
+"""
+Repetition detection from the average elbow angle.
+
+Uses the phase thresholds of the push-up rules (`phase_detection` in
+models/pushup_rules.json): a repetition starts when the elbow angle drops
+below the descent threshold, reaches its bottom below the bottom threshold
+and completes when it rises back above the ascent threshold. Its window
+runs from the lockout peak before the descent to the lockout peak after
+the ascent, so the scored sequence has the full range of motion; the
+peak between two repetitions ends the first and starts the second.
+
+segment_reps applies the same rules to a whole clip, and resample_sequence
+stretches each repetition to the fixed length the scoring models expect.
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLDS = {
+    'descent_threshold': 140.0,
+    'bottom_threshold': 90.0,
+    'ascent_threshold': 140.0,
+}
+# Drop from the top peak that closes a repetition (the lockout is over)
+PEAK_DROP_DEG = 10.0
+
+
+def load_phase_thresholds(rules_path: Path) -> dict:
+    """Phase thresholds from a rules file, falling back to the defaults."""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    try:
+        with open(rules_path, 'r', encoding='utf-8') as f:
+            phase_detection = json.load(f).get('phase_detection', {})
+        for key in thresholds:
+            if key in phase_detection:
+                thresholds[key] = float(phase_detection[key])
+    except (OSError, ValueError) as e:
+        logger.warning(f"Using default phase thresholds: {e}")
+    return thresholds
+
+
+@dataclass
+class Rep:
+    """One repetition, as indices into the frame sequence."""
+    start: int
+    bottom: int
+    end: int
+    min_angle: float
+
+
+class IncrementalRepDetector:
+    """
+    Feed elbow angles frame by frame; completed repetitions come back as they close.
+
+    A repetition closes once the angle falls PEAK_DROP_DEG below the peak
+    after its ascent (or below the descent threshold), a few frames after
+    the lockout; call finish() at the end of the sequence for one still
+    at its top.
+    """
+
+    def __init__(self, descent_threshold: float = 140.0, bottom_threshold: float = 90.0,
+                 ascent_threshold: float = 140.0, peak_drop: float = PEAK_DROP_DEG):
+        self.descent_threshold = descent_threshold
+        self.bottom_threshold = bottom_threshold
+        self.ascent_threshold = ascent_threshold
+        self.peak_drop = peak_drop
+        self.reps: List[Rep] = []
+        self._state = 'up'
+        self._top = 0
+        self._top_angle = float('-inf')
+        self._start = 0
+        self._bottom = 0
+        self._min_angle = float('inf')
+
+    @classmethod
+    def from_rules(cls, rules_path: Path) -> 'IncrementalRepDetector':
+        return cls(**load_phase_thresholds(rules_path))
+
+    def update(self, index: int, elbow_angle: float) -> Optional[Rep]:
+        """Process one frame. Returns the repetition completed by this frame, if any."""
+        rep = None
+        if self._state == 'top':
+            if elbow_angle > self._top_angle:
+                self._top, self._top_angle = index, elbow_angle
+            if elbow_angle > self._top_angle - self.peak_drop and elbow_angle >= self.descent_threshold:
+                return None
+            # Past the lockout: the peak ends this repetition and may start the next
+            rep = self._close()
+
+        if self._state == 'up':
+            if elbow_angle >= self.descent_threshold:
+                if elbow_angle > self._top_angle:
+                    self._top, self._top_angle = index, elbow_angle
+            else:
+                self._state = 'descending'
+                self._start = self._top
+                self._min_angle = elbow_angle
+                self._bottom = index
+            return rep
+
+        if elbow_angle < self._min_angle:
+            self._min_angle = elbow_angle
+            self._bottom = index
+
+        if self._state == 'descending':
+            if elbow_angle <= self.bottom_threshold:
+                self._state = 'bottom'
+            elif elbow_angle >= self.ascent_threshold:
+                # Came back up without reaching the bottom: not a repetition
+                self._state = 'up'
+                self._top, self._top_angle = index, elbow_angle
+            return rep
+
+        # At the bottom, waiting for the ascent to finish
+        if elbow_angle >= self.ascent_threshold:
+            self._state = 'top'
+            self._top, self._top_angle = index, elbow_angle
+        return rep
+
+    def finish(self) -> Optional[Rep]:
+        """End of the sequence: close a repetition that is still at its top."""
+        return self._close() if self._state == 'top' else None
+
+    def _close(self) -> Rep:
+        rep = Rep(start=self._start, bottom=self._bottom, end=self._top, min_angle=float(self._min_angle))
+        self.reps.append(rep)
+        self._state = 'up'
+        return rep
+
+
+def segment_reps(elbow_angles: np.ndarray, thresholds: Optional[dict] = None, min_frames: int = 3) -> List[Rep]:
+    """Repetitions in a whole sequence of average elbow angles (same rules as the incremental detector)."""
+    detector = IncrementalRepDetector(**(thresholds or DEFAULT_THRESHOLDS))
+    for index, angle in enumerate(elbow_angles):
+        detector.update(index, float(angle))
+    detector.finish()
+    return [rep for rep in detector.reps if rep.end - rep.start + 1 >= min_frames]
+
+
+def resample_sequence(sequence: np.ndarray, target_frames: int) -> np.ndarray:
+    """
+    Linearly resample a (frames, features) sequence to target_frames.
+
+    Equivalent to np.interp on each column over a shared 0-1 time axis, but
+    interpolates every feature in one vectorised step.
+    """
+    original_frames = sequence.shape[0]
+    if original_frames == target_frames:
+        return sequence
+    if original_frames == 1:
+        return np.repeat(sequence, target_frames, axis=0)
+    position = np.linspace(0.0, original_frames - 1, target_frames)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, original_frames - 1)
+    weight = (position - lower)[:, np.newaxis]
+    return sequence[lower] * (1.0 - weight) + sequence[upper] * weight
+
+
+def resample_batch(sequences: List[np.ndarray], target_frames: int) -> np.ndarray:
+    """Stack sequences of different lengths into a (n, target_frames, features) batch."""
+    return np.stack([resample_sequence(seq, target_frames) for seq in sequences])
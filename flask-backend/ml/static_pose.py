@@ -0,0 +1,312 @@
+"""
+Single-image pose analysis.
+
+A photo needs none of the video pipeline: one static-image Pose pass gives
+its landmarks, and a pose from the pose library is scored against the
+joint angle targets in models/pose_targets.json, the same way the
+frontend's live comparison scores a frame against its reference.
+StaticPosePool keeps several static-image Pose graphs so the photos of a
+session are posed in parallel, one graph per thread. The process-wide pool
+also serves the other static-image passes (preflight, tempo probe,
+pre-classification): a graph is not safe to share between threads, so
+every static-image pose call borrows one with acquire().
+"""
+
+import json
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+from ml.dtw import JOINT_NAMES, ZERO_SCORE_DEVIATION, joint_angles
+from ml.landmarks import LandmarkTrack
+
+logger = logging.getLogger(__name__)
+
+STATIC_POSE_POOL_SIZE = 4
+POSE_TARGETS_PATH = Path(__file__).parents[1] / 'models' / 'pose_targets.json'
+DEFAULT_TOLERANCE_DEG = 15.0
+MIN_VISIBILITY = 0.3
+# A photo counts as steady in the session summary from this score, as a
+# frame does in the frontend's stability figure
+STABLE_SCORE = 70.0
+
+
+class StaticPosePool:
+    """Static-image Pose instances, created on demand up to size."""
+
+    def __init__(self, size: int = STATIC_POSE_POOL_SIZE):
+        self.size = max(1, size)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        """A Pose for the caller's exclusive use; waits when all are busy."""
+        try:
+            pose = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            pose = _new_pose() if create else self._idle.get()
+        try:
+            yield pose
+        finally:
+            self._idle.put(pose)
+
+    def grow(self, size: int):
+        """Allow up to size graphs; a pool never shrinks below what it created."""
+        with self._lock:
+            self.size = max(self.size, size)
+
+
+def _new_pose():
+    return mp.solutions.pose.Pose(
+        static_image_mode=True,
+        model_complexity=1,
+        enable_segmentation=False,
+        min_detection_confidence=0.3
+    )
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(size: int) -> StaticPosePool:
+    """Create the process-wide pool at startup, sized from config."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = StaticPosePool(size)
+        else:
+            _pool.grow(size)
+        return _pool
+
+
+def get_pool(size: Optional[int] = None) -> StaticPosePool:
+    """Process-wide pool; grows to the largest size a caller asks for."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = StaticPosePool(size or STATIC_POSE_POOL_SIZE)
+        elif size:
+            _pool.grow(size)
+        return _pool
+
+
+def read_image(path: str) -> Optional[np.ndarray]:
+    """BGR image from a file; GIFs, which imread cannot open, give their first frame."""
+    image = cv2.imread(path)
+    if image is None:
+        cap = cv2.VideoCapture(path)
+        try:
+            ret, frame = cap.read()
+            image = frame if ret else None
+        finally:
+            cap.release()
+    return image
+
+
+def decode_image(data: bytes) -> Optional[np.ndarray]:
+    """BGR image from encoded bytes (JPEG, PNG), None if unreadable."""
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def pose_image(image_bgr: np.ndarray, pool: StaticPosePool) -> Optional[np.ndarray]:
+    """(33, 4) landmarks of the person in a photo, None if nobody is found."""
+    rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+    with pool.acquire() as pose:
+        results = pose.process(rgb)
+    if not results.pose_landmarks:
+        return None
+    return np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in results.pose_landmarks.landmark])
+
+
+def image_track(image_bgr: np.ndarray, pool: StaticPosePool) -> LandmarkTrack:
+    """One-frame LandmarkTrack of a photo, for the exercise evaluators."""
+    started = time.perf_counter()
+    landmarks = pose_image(image_bgr, pool)
+    height, width = image_bgr.shape[:2]
+    visibility = float(landmarks[:, 3].mean()) if landmarks is not None else 0.0
+    preflight = {
+        'verdict': 'ok', 'sampled': 1, 'detected': int(landmarks is not None),
+        'avg_visibility': visibility, 'total_frames': 1, 'fps': 0.0,
+        'elapsed_ms': (time.perf_counter() - started) * 1000.0,
+    }
+    metadata = {'image_size': [int(width), int(height)], 'avg_visibility': visibility}
+    if landmarks is None or visibility < MIN_VISIBILITY:
+        track = LandmarkTrack.empty(preflight, dense=False, error='No person was detected in the photo.'
+                                    if landmarks is None else 'Pose detection confidence is low.')
+        track.metadata.update(metadata)
+        return track
+    return LandmarkTrack(landmarks=landmarks[np.newaxis], frame_indices=[0], fps=0.0, total_frames=1,
+                         dense=False, preflight=preflight, metadata=metadata)
+
+
+def track_angles(track: LandmarkTrack) -> np.ndarray:
+    """Mean joint angles (JOINT_NAMES order, NaN if hidden) of a track, corrected for the photo's aspect ratio."""
+    landmarks = track.landmarks.copy()
+    width, height = track.metadata.get('image_size') or (1, 1)
+    # Normalised x and y have different units unless the image is square;
+    # video tracks carry no image size and are left as they are
+    landmarks[:, :, 0] *= width / height
+    angles = joint_angles(landmarks)
+    seen = ~np.isnan(angles).all(axis=0)
+    mean = np.full(len(JOINT_NAMES), np.nan)
+    mean[seen] = np.nanmean(angles[:, seen], axis=0)
+    return mean
+
+
+_targets = {}
+
+
+def load_pose_targets(path: Path = POSE_TARGETS_PATH) -> Dict:
+    """Pose id -> {'name', 'angles', 'tolerance_deg', 'mirror'}; empty if the file is missing."""
+    if path not in _targets:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No pose targets loaded: {e}")
+            data = {}
+        default_tolerance = float(data.get('tolerance_deg', DEFAULT_TOLERANCE_DEG))
+        _targets[path] = {
+            pose_id: {
+                'name': pose.get('name', pose_id),
+                'angles': {joint: float(value) for joint, value in pose['angles'].items()},
+                'tolerance_deg': float(pose.get('tolerance_deg', default_tolerance)),
+                'mirror': bool(pose.get('mirror', False)),
+            }
+            for pose_id, pose in data.get('poses', {}).items()
+        }
+    return _targets[path]
+
+
+def _mirrored(joint: str) -> str:
+    if joint.startswith('left_'):
+        return 'right_' + joint[len('left_'):]
+    if joint.startswith('right_'):
+        return 'left_' + joint[len('right_'):]
+    return joint
+
+
+def score_pose(angles: np.ndarray, target: Dict) -> Optional[Dict]:
+    """
+    Score joint angles against a pose's targets.
+
+    The score is 100 minus the mean absolute deviation over the targeted,
+    visible joints, reaching 0 at ZERO_SCORE_DEVIATION degrees. Poses
+    marked 'mirror' (one leg or arm differs from the other) are also
+    tried with left and right swapped, and the closer side wins.
+
+    Returns:
+        Dict with 'score', 'deviation_deg', 'mirrored', 'joints' (angle,
+        target and difference per joint) and 'off_target' (joints beyond
+        the tolerance, worst first); None if no targeted joint is visible
+    """
+    candidates = [(False, target['angles'])]
+    if target['mirror']:
+        candidates.append((True, {_mirrored(j): v for j, v in target['angles'].items()}))
+
+    best = None
+    for mirrored, targets in candidates:
+        wanted = np.array([targets.get(j, np.nan) for j in JOINT_NAMES])
+        diffs = np.abs(angles - wanted)
+        used = ~np.isnan(diffs)
+        if not used.any():
+            continue
+        deviation = float(diffs[used].mean())
+        if best is None or deviation < best[0]:
+            best = (deviation, mirrored, wanted, diffs, used)
+    if best is None:
+        return None
+
+    deviation, mirrored, wanted, diffs, used = best
+    joints = {
+        JOINT_NAMES[i]: {'angle': round(float(angles[i]), 1), 'target': float(wanted[i]),
+                         'diff': round(float(diffs[i]), 1)}
+        for i in np.flatnonzero(used)
+    }
+    off_target = sorted((j for j, v in joints.items() if v['diff'] > target['tolerance_deg']),
+                        key=lambda j: -joints[j]['diff'])
+    return {
+        'score': float(np.clip(100.0 - deviation / ZERO_SCORE_DEVIATION * 100.0, 0.0, 100.0)),
+        'deviation_deg': round(deviation, 1),
+        'mirrored': mirrored,
+        'joints': joints,
+        'off_target': off_target,
+    }
+
+
+def joint_correction(joint: str, values: Dict) -> str:
+    label = joint.replace('_', ' ')
+    direction = 'wider' if values['angle'] > values['target'] else 'narrower'
+    return (f"Your {label} angle is {values['diff']:.0f}° {direction} than the pose "
+            f"({values['angle']:.0f}° vs {values['target']:.0f}°)")
+
+
+def analyze_photos(images: List[Optional[np.ndarray]], pose_id: str, pool: StaticPosePool) -> Dict:
+    """
+    Score a session of photos of one pose.
+
+    Photos are posed in parallel on the pool; an unreadable image (None)
+    or a photo without a person gets an 'error' instead of a score.
+
+    Returns:
+        Dict with 'photos' (per-photo score details) and 'summary'
+        (overall score, stability, most common off-target joint and its
+        correction, timing)
+    """
+    started = time.perf_counter()
+    target = load_pose_targets()[pose_id]
+
+    def analyse(image):
+        if image is None:
+            return {'error': 'Unreadable image'}
+        track = image_track(image, pool)
+        if track.error is not None:
+            return {'error': track.error}
+        scored = score_pose(track_angles(track), target)
+        if scored is None:
+            return {'error': 'None of the pose\'s joints are visible'}
+        scored['corrections'] = [joint_correction(j, scored['joints'][j]) for j in scored['off_target']]
+        return scored
+
+    if len(images) > 1:
+        with ThreadPoolExecutor(max_workers=min(pool.size, len(images))) as executor:
+            photos = list(executor.map(analyse, images))
+    else:
+        photos = [analyse(image) for image in images]
+
+    scores = [p['score'] for p in photos if 'score' in p]
+    off_target = [j for p in photos for j in p.get('off_target', [])[:1]]
+    main_issue = max(set(off_target), key=off_target.count) if off_target else None
+    summary = {
+        'pose_id': pose_id,
+        'pose_name': target['name'],
+        'photos': len(images),
+        'scored': len(scores),
+        'overall_score': round(float(np.mean(scores)), 1) if scores else 0.0,
+        'best_index': int(np.argmax([p.get('score', -1.0) for p in photos])) if scores else None,
+        'stability': round(100.0 * sum(s >= STABLE_SCORE for s in scores) / len(scores), 1) if scores else 0.0,
+        'main_issue': main_issue,
+        'suggestion': next((p['corrections'][p['off_target'].index(main_issue)]
+                            for p in photos if main_issue in p.get('off_target', [])), None),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000.0, 1),
+    }
+    logger.info(f"Scored {len(scores)}/{len(images)} photos of {pose_id} in {summary['elapsed_ms']:.0f} ms")
+    return {'photos': photos, 'summary': summary}
@@ -65,7 +65,10 @@ class Upload(db.Model):
     file_path = db.Column(db.String(500), nullable=False)
     file_type = db.Column(db.String(50), nullable=False)  # 'image' or 'video'
     file_size = db.Column(db.Integer, nullable=False)  # in bytes
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the file, computed while streaming
     exercise_type = db.Column(db.String(100), nullable=False)  # 'pushup', 'squat', etc.
+    model_version = db.Column(db.String(100))  # analysis pipeline/model that produced the result
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('uploads.id'))  # upload whose result was reused
     
     # Analysis results
     accuracy = db.Column(db.Float, nullable=False, default=0.0)
@@ -75,7 +78,7 @@ class Upload(db.Model):
     result_json = db.Column(db.Text)  # Complete analysis result as JSON
     
     # Processing status
-    processing_status = db.Column(db.String(50), default='pending')  # 'pending', 'processing', 'completed', 'failed'
+    processing_status = db.Column(db.String(50), default='pending')  # 'pending', 'processing', 'completed', 'failed', 'cancelled'
     processing_started_at = db.Column(db.DateTime)
     processing_completed_at = db.Column(db.DateTime)
     
@@ -90,7 +93,10 @@ class Upload(db.Model):
             'file_name': self.file_name,
             'file_type': self.file_type,
             'file_size': self.file_size,
+            'content_hash': self.content_hash,
             'exercise_type': self.exercise_type,
+            'model_version': self.model_version,
+            'duplicate_of_id': self.duplicate_of_id,
             'accuracy': self.accuracy,
             'form_status': self.form_status,
             'corrections': json.loads(self.corrections) if self.corrections else [],
@@ -104,6 +110,92 @@ class Upload(db.Model):
         }
 
 
+class StoredFile(db.Model):
+    """One copy of an uploaded file on disk, shared by every Upload with the same bytes."""
+    __tablename__ = 'stored_files'
+
+    content_hash = db.Column(db.String(64), primary_key=True)  # SHA-256
+    file_path = db.Column(db.String(500), nullable=False)
+    file_size = db.Column(db.Integer, nullable=False)  # in bytes
+    ref_count = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class AnalysisJob(db.Model):
+    __tablename__ = 'analysis_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    upload_id = db.Column(db.Integer, db.ForeignKey('uploads.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # 'queued', 'running', 'completed', 'failed', 'cancelled'
+    lane = db.Column(db.String(20), nullable=False, default='batch')  # 'interactive' or 'batch'
+    expected_cost = db.Column(db.Float)  # estimated CPU-seconds, from the container headers
+    video_duration = db.Column(db.Float)  # seconds
+    frame_count = db.Column(db.Integer)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    worker_id = db.Column(db.String(100))  # lease owner: '<hostname>:<pid>' of the claiming worker
+    lease_expires_at = db.Column(db.DateTime, index=True)
+    heartbeat_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+
+    enqueued_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    upload = db.relationship('Upload', backref=db.backref('jobs', lazy=True, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'upload_id': self.upload_id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'lane': self.lane,
+            'expected_cost': self.expected_cost,
+            'video_duration': self.video_duration,
+            'frame_count': self.frame_count,
+            'attempts': self.attempts,
+            'worker_id': self.worker_id,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'error': self.error,
+            'enqueued_at': self.enqueued_at.isoformat() if self.enqueued_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class UploadSession(db.Model):
+    """Resumable (chunked) upload in progress."""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, used in the session URL
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    file_name = db.Column(db.String(255), nullable=False)
+    exercise_type = db.Column(db.String(100), nullable=False)
+    total_size = db.Column(db.Integer, nullable=False)  # in bytes
+    received = db.Column(db.Integer, nullable=False, default=0)  # current offset
+    staging_path = db.Column(db.String(500), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='open')  # 'open', 'completed', 'expired', 'rejected'
+    upload_id = db.Column(db.Integer, db.ForeignKey('uploads.id'))
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'session_id': self.id,
+            'file_name': self.file_name,
+            'exercise_type': self.exercise_type,
+            'size': self.total_size,
+            'offset': self.received,
+            'status': self.status,
+            'upload_id': self.upload_id,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+        }
+
+
 class LiveSession(db.Model):
     __tablename__ = 'live_sessions'
 
@@ -134,6 +226,48 @@ class LiveSession(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
 
+
+class RepEmbedding(db.Model):
+    """Fixed-length embedding of one analysed repetition (ml/embeddings.py)."""
+    __tablename__ = 'rep_embeddings'
+    __table_args__ = (db.Index('ix_rep_embeddings_user_exercise', 'user_id', 'exercise_type', 'id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    upload_id = db.Column(db.Integer, db.ForeignKey('uploads.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    exercise_type = db.Column(db.String(100), nullable=False)
+    rep_index = db.Column(db.Integer, nullable=False, default=0)  # 0-based; whole clip when no reps were found
+    score = db.Column(db.Float, nullable=False, default=0.0)
+    vector = db.Column(db.LargeBinary, nullable=False)  # float32 bytes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    upload = db.relationship('Upload', backref=db.backref('rep_embeddings', lazy=True, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'upload_id': self.upload_id,
+            'exercise_type': self.exercise_type,
+            'rep_index': self.rep_index,
+            'score': float(self.score or 0.0),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+class AngleSequence(db.Model):
+    """Joint angles (ml.dtw.joint_angles) of an analysed video, for reference comparisons."""
+    __tablename__ = 'angle_sequences'
+
+    id = db.Column(db.Integer, primary_key=True)
+    upload_id = db.Column(db.Integer, db.ForeignKey('uploads.id'), nullable=False, unique=True)
+    frames = db.Column(db.Integer, nullable=False)
+    joints = db.Column(db.Integer, nullable=False)
+    frame_step = db.Column(db.Integer, nullable=False, default=1)  # pose frames per stored row (decimated streams)
+    vector = db.Column(db.LargeBinary, nullable=False)  # (frames, joints) float32 bytes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    upload = db.relationship('Upload', backref=db.backref('angle_sequence', uselist=False,
+                                                          cascade='all, delete-orphan'))
+
 class Settings(db.Model):
     __tablename__ = 'settings'
     
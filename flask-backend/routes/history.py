@@ -2,7 +2,7 @@ from flask import Blueprint, request, jsonify, send_file
 from flask_login import current_user
 from decorators import login_required_api
 from models import Upload, LiveSession, db
-import os
+from utils import dedup, similarity
 import logging
 from io import BytesIO
 
@@ -67,13 +67,16 @@ def delete_upload(upload_id):
         if not upload:
             return jsonify({'error': 'Upload not found'}), 404
 
-        # Delete the file from disk if present
+        # Drop this upload's reference on the stored file; the file itself is
+        # only removed from disk when no other upload shares the same bytes
         try:
-            if os.path.exists(upload.file_path):
-                os.remove(upload.file_path)
+            dedup.release_file(upload)
         except OSError as e:
             logger.warning(f"Failed to delete file {upload.file_path}: {str(e)}")
 
+        # Uploads that reused this result keep their own copy of it
+        Upload.query.filter_by(duplicate_of_id=upload.id).update({'duplicate_of_id': None}, synchronize_session=False)
+
         # Delete from database
         db.session.delete(upload)
         db.session.commit()
@@ -87,6 +90,49 @@ def delete_upload(upload_id):
         return jsonify({'error': 'Failed to delete upload'}), 500
 
 
+@history_bp.route('/history/<int:upload_id>/similar-reps', methods=['GET'])
+@login_required_api
+def get_similar_reps(upload_id):
+    """Past repetitions closest to one repetition of this upload (?rep=0-based index, ?k=)."""
+    try:
+        upload = Upload.query.filter_by(id=upload_id, user_id=current_user.id).first()
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+
+        rep = request.args.get('rep', 0, type=int)
+        k = max(1, min(request.args.get('k', 5, type=int), 50))
+        matches = similarity.index.similar_reps(upload, rep, k=k)
+        if matches is None:
+            return jsonify({'error': 'No stored repetition for this upload'}), 404
+
+        return jsonify({'success': True, 'upload_id': upload_id, 'rep': rep, 'matches': matches}), 200
+
+    except Exception as e:
+        logger.error(f"Similar reps error: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to search similar repetitions'}), 500
+
+
+@history_bp.route('/history/<int:upload_id>/similar-sets', methods=['GET'])
+@login_required_api
+def get_similar_sets(upload_id):
+    """Past uploads whose repetitions best match this upload's (?k=)."""
+    try:
+        upload = Upload.query.filter_by(id=upload_id, user_id=current_user.id).first()
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+
+        k = max(1, min(request.args.get('k', 5, type=int), 50))
+        matches = similarity.index.similar_sets(upload, k=k)
+        if matches is None:
+            return jsonify({'error': 'No stored repetitions for this upload'}), 404
+
+        return jsonify({'success': True, 'upload_id': upload_id, 'matches': matches}), 200
+
+    except Exception as e:
+        logger.error(f"Similar sets error: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to search similar sets'}), 500
+
+
 @history_bp.route('/live-sessions', methods=['GET'])
 @login_required_api
 def get_live_sessions():
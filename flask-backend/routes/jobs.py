@@ -0,0 +1,22 @@
+from flask import Blueprint, jsonify
+from decorators import login_required_api
+from utils import job_queue, admission
+import logging
+
+jobs_bp = Blueprint('jobs', __name__)
+logger = logging.getLogger(__name__)
+
+
+@jobs_bp.route('/jobs/stats', methods=['GET'])
+@login_required_api
+def get_job_stats():
+    """Queue depth, job latency and admission counters for the analysis path."""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': job_queue.queue_stats(),
+            'admission': admission.controller.stats()
+        }), 200
+    except Exception as e:
+        logger.error(f"Job stats error: {str(e)}")
+        return jsonify({'error': 'Failed to fetch job stats'}), 500
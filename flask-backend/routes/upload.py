@@ -1,11 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_login import current_user
-from decorators import login_required_api
+from decorators import login_required_api, admission_controlled
 from werkzeug.utils import secure_filename
-from models import User, Upload, db
-from utils.ml_processor import MLProcessor
-from utils.email_service import send_analysis_email
-import os, re, json, logging
+from models import User, Upload, UploadSession, db
+from utils.analysis import run_analysis, mark_failed, model_version
+from utils import job_queue
+from utils.ingest import RejectedUpload, VIDEO_EXTENSIONS, store_upload, discard_upload
+from utils import resumable, dedup, admission, progress
+from utils import batch as batch_analysis
+from utils import cancellation, comparison, preclassify, evaluators
+from routes.exercises import EXERCISES_DATA
+from ml.cancel import AnalysisCancelled, CancelToken
+from ml import static_pose
+import os, re, json, time, queue, logging
 from datetime import datetime
 
 upload_bp = Blueprint('upload', __name__)
@@ -24,6 +31,150 @@ def normalize_exercise_name(name):
     name = re.sub(r'[\s_\-]', '', name)
     return name
 
+def upload_file_type(filename):
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    return 'video' if file_extension in VIDEO_EXTENSIONS else 'image'
+
+def sweep_stale_parts():
+    """Throttled sweep of part files left by processes that died mid-upload."""
+    resumable.maybe_cleanup(current_app.config['UPLOAD_FOLDER'], current_app.config['RESUMABLE_SESSION_TTL'])
+
+def check_exercise(exercise_type, file_path, file_type):
+    """Pre-classify a stored file against the selected exercise (see utils/preclassify.py).
+
+    Returns (exercise type to analyse, check dict or None, 400 response or None).
+    """
+    config = current_app.config
+    # The type model only knows the gym exercises, not the pose library's poses
+    mode = 'off' if evaluators.get(exercise_type).pipeline == 'pose-targets' else config['EXERCISE_PRECLASSIFY']
+    analysed_type, check, reject = preclassify.check_exercise(
+        exercise_type, file_path, file_type, mode, config['PRECLASSIFY_MIN_CONFIDENCE'])
+    if reject:
+        return exercise_type, check, (jsonify({
+            'success': False,
+            'error': 'video mismatch',
+            'message': f"The selected exercise type '{exercise_type}' does not match this video.",
+            'exercise_check': check
+        }), 400)
+    if check and check.get('corrected'):
+        logger.info(f"Exercise corrected from {exercise_type} to {analysed_type} for {file_path}")
+    return analysed_type, check, None
+
+def register_upload(user, filename, file_path, file_type, file_size, content_hash, exercise_type):
+    """Create the Upload row for a file that has been stored on disk."""
+    upload = Upload(
+        user_id=user.id,
+        file_name=filename,
+        file_path=file_path,
+        file_type=file_type,
+        file_size=file_size,
+        content_hash=content_hash,
+        exercise_type=exercise_type,
+        processing_status='pending'
+    )
+    db.session.add(upload)
+    db.session.commit()
+    return upload
+
+def ingest_stored_file(user, filename, file_path, file_type, file_size, content_hash, exercise_type):
+    """Check, deduplicate and register a file just stored at file_path.
+
+    Returns (upload or None, check dict or None, 400 response or None). If
+    any step fails the file, or the reference taken on its deduplicated
+    copy, is released before the error propagates.
+    """
+    stored_path = None
+    try:
+        exercise_type, check, mismatch = check_exercise(exercise_type, file_path, file_type)
+        if mismatch:
+            os.remove(file_path)
+            return None, check, mismatch
+
+        stored_path = dedup.store_file(content_hash, file_path, file_size)
+        upload = register_upload(user, filename, stored_path, file_type, file_size, content_hash, exercise_type)
+        return upload, check, None
+    except Exception:
+        db.session.rollback()
+        if stored_path is not None:
+            dedup.release_reference(content_hash, stored_path)
+        elif os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+def dispatch_analysis(upload, **extra):
+    """Queue (or, in sync mode, run) the analysis and build the upload response.
+
+    extra is added to every successful response.
+    """
+    # -----------------------
+    # Identical bytes already analysed by the current model
+    # -----------------------
+    version = model_version(upload.exercise_type)
+    source = dedup.find_reusable_result(upload, version)
+    if source:
+        dedup.reuse_result(upload, source, version)
+        logger.info(f"Upload {upload.id} reused the result of upload {upload.duplicate_of_id}")
+        return jsonify({
+            'success': True,
+            'upload_id': upload.id,
+            'status': upload.processing_status,
+            'deduplicated': True,
+            'result': upload.to_dict(),
+            'xp_earned': 0,
+            'level_up': False,
+            'new_level': current_user.level,
+            **extra
+        }), 200
+
+    # -----------------------
+    # Background analysis (photos take one pose pass and are analysed inline)
+    # -----------------------
+    if current_app.config['ANALYSIS_MODE'] == 'async' and upload.file_type == 'video':
+        job = job_queue.enqueue(upload, lane=request.form.get('lane') or request.args.get('lane', 'batch'))
+        return jsonify({
+            'success': True,
+            'upload_id': upload.id,
+            'job_id': job.id,
+            'status': upload.processing_status,
+            **extra
+        }), 202
+
+    # -----------------------
+    # ML Processing (synchronous mode)
+    # -----------------------
+    # Stop early if the client hangs up or the analysis is cancelled
+    environ = request.environ
+    token = CancelToken(probe=lambda: cancellation.client_disconnected(environ))
+    try:
+        with admission.controller.track(), cancellation.watch(upload.id, token):
+            result, xp_info = run_analysis(upload, cancel_token=token)
+
+        return jsonify({
+            'success': True,
+            'upload_id': upload.id,
+            'result': upload.to_dict(),
+            **xp_info,
+            **extra
+        }), 200
+
+    except AnalysisCancelled as e:
+        logger.info(f"Analysis of upload {upload.id} stopped: {e.reason}")
+        db.session.rollback()
+        cancellation.mark_cancelled(upload, e.reason)
+        return jsonify({
+            'success': False,
+            'upload_id': upload.id,
+            'status': 'cancelled',
+            'error': 'Analysis was cancelled'
+        }), 409
+
+    except Exception as e:
+        logger.error(f"ML processing error: {e}", exc_info=True)
+        db.session.rollback()
+        mark_failed(upload)
+        return jsonify({'error': 'Processing failed'}), 500
+
+
 # -----------------------
 # Upload + Analysis
 # -----------------------
@@ -31,144 +182,365 @@ def normalize_exercise_name(name):
 @upload_bp.route('/upload', methods=['POST'])
 @upload_bp.route('/uploads', methods=['POST'])
 @login_required_api
+@admission_controlled
 def upload_file():
     try:
         user = current_user
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        if 'file' not in request.files:
+        # Stream file parts straight into the upload folder while parsing
+        request.ingest_folder = current_app.config['UPLOAD_FOLDER']
+        sweep_stale_parts()
+        try:
+            files = request.files
+        except RejectedUpload as e:
+            return jsonify({'error': 'Unsupported file content', 'message': e.description}), 415
+
+        if 'file' not in files:
             return jsonify({'error': 'No file uploaded'}), 400
 
-        file = request.files['file']
+        file = files['file']
+        for extra in files.getlist('file')[1:] + [f for k, f in files.items(multi=True) if k != 'file']:
+            discard_upload(extra)
         exercise_type = request.form.get('exercise_id') or request.form.get('exercise_type', 'general')
 
         if file.filename == '':
+            discard_upload(file)
             return jsonify({'error': 'No file selected'}), 400
 
         if not allowed_file(file.filename):
+            discard_upload(file)
             return jsonify({'error': 'File type not allowed'}), 400
 
-        # Save file
         filename = secure_filename(file.filename)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{user.id}_{timestamp}_{filename}"
         file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
 
-        file.save(file_path)
-        file_size = os.path.getsize(file_path)
+        file_type = upload_file_type(filename)
 
-        file_extension = filename.rsplit('.', 1)[1].lower()
-        file_type = 'video' if file_extension in ['mp4', 'avi', 'mov', 'wmv'] else 'image'
+        # Save file (already on disk when streamed; this just moves it into place)
+        file_size, content_hash = store_upload(file, file_path)
 
-        # Validate exercise vs filename
-        if normalize_exercise_name(exercise_type) not in normalize_exercise_name(filename):
-            return jsonify({
-                'success': False,
-                'error': 'video mismatch',
-                'message': f"The selected exercise type '{exercise_type}' does not match this video."
-            }), 400
-
-        upload = Upload(
-            user_id=user.id,
-            file_name=filename,
-            file_path=file_path,
-            file_type=file_type,
-            file_size=file_size,
-            exercise_type=exercise_type,
-            processing_status='pending'
-        )
-        db.session.add(upload)
-        db.session.commit()
+        # Confirm (or correct) the exercise from a few posed frames
+        upload, check, mismatch = ingest_stored_file(user, filename, file_path, file_type,
+                                                     file_size, content_hash, exercise_type)
+        if mismatch:
+            return mismatch
+        return dispatch_analysis(upload, exercise_check=check)
 
-        # -----------------------
-        # ML Processing
-        # -----------------------
+    except Exception as e:
+        logger.error(f"Upload error: {e}", exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': 'Upload failed'}), 500
+
+
+# -----------------------
+# Batch upload + analysis
+# -----------------------
+
+@upload_bp.route('/uploads/batch', methods=['POST'])
+@login_required_api
+@admission_controlled
+def upload_batch():
+    """Upload several clips in one multipart request and analyse them together.
+
+    Files are sent as repeated 'files' parts with a matching 'exercise_ids'
+    field per file (or one 'exercise_id' for all of them). Every item gets
+    its own status; a rejected or failed item does not fail the batch.
+    """
+    try:
+        user = current_user
+        request.ingest_folder = current_app.config['UPLOAD_FOLDER']
+        sweep_stale_parts()
         try:
-            upload.processing_status = 'processing'
-            upload.processing_started_at = datetime.utcnow()
-            db.session.commit()
+            files = request.files
+        except RejectedUpload as e:
+            return jsonify({'error': 'Unsupported file content', 'message': e.description}), 415
+
+        batch = files.getlist('files')
+        for extra in [f for k, f in files.items(multi=True) if k != 'files']:
+            discard_upload(extra)
+        if not batch:
+            return jsonify({'error': 'No files uploaded'}), 400
+
+        max_files = current_app.config['BATCH_MAX_FILES']
+        if len(batch) > max_files:
+            for file in batch:
+                discard_upload(file)
+            return jsonify({'error': f'At most {max_files} files per batch'}), 400
+
+        exercise_ids = request.form.getlist('exercise_ids')
+        if not exercise_ids:
+            exercise_ids = [request.form.get('exercise_id') or request.form.get('exercise_type', 'general')] * len(batch)
+        if len(exercise_ids) != len(batch):
+            for file in batch:
+                discard_upload(file)
+            return jsonify({'error': 'Provide one exercise id per file'}), 400
 
-            # === HYBRID PUSH-UP MODEL ===
-            if exercise_type.lower() in ['pushup', 'push-up', 'push_up']:
-                from ml.hybrid_pushup_evaluator import get_evaluator
-                evaluator = get_evaluator()
-                result = evaluator.evaluate(file_path)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        items = []
+        uploads = []
+        for index, (file, exercise_type) in enumerate(zip(batch, exercise_ids)):
+            item = {'index': index, 'file_name': file.filename, 'exercise_type': exercise_type}
+            items.append(item)
+
+            if not file.filename or not allowed_file(file.filename):
+                discard_upload(file)
+                item.update(status='rejected', error='File type not allowed')
+                continue
+
+            filename = f"{user.id}_{timestamp}_{index}_{secure_filename(file.filename)}"
+            try:
+                file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+                file_type = upload_file_type(filename)
+                file_size, content_hash = store_upload(file, file_path)
+
+                upload, check, mismatch = ingest_stored_file(user, filename, file_path, file_type,
+                                                             file_size, content_hash, exercise_type)
+                if check:
+                    item['exercise_check'] = check
+                if mismatch:
+                    item.update(status='rejected', error='video mismatch')
+                    continue
+                item['exercise_type'] = upload.exercise_type
+            except Exception as e:
+                # ingest_stored_file has released the stored file; the part
+                # of a file that never got stored goes with the request
+                logger.error(f"Batch item {index} upload error: {e}", exc_info=True)
+                db.session.rollback()
+                item.update(status='failed', error='Upload failed')
+                continue
+
+            item['upload_id'] = upload.id
+            uploads.append((item, upload))
+
+        # Reuse results for bytes already analysed by the current model
+        to_analyse = []
+        for item, upload in uploads:
+            version = model_version(upload.exercise_type)
+            source = dedup.find_reusable_result(upload, version)
+            if source:
+                dedup.reuse_result(upload, source, version)
+                item.update(status='completed', deduplicated=True)
+            else:
+                to_analyse.append((item, upload))
+
+        if current_app.config['ANALYSIS_MODE'] == 'async':
+            for item, upload in to_analyse:
+                job = job_queue.enqueue(upload, lane='batch')
+                item.update(status='queued', job_id=job.id)
+        elif to_analyse:
+            with admission.controller.track():
+                outcomes = batch_analysis.analyze_many([upload.id for _, upload in to_analyse],
+                                                       current_app.config['BATCH_WORKERS'])
+            for item, upload in to_analyse:
+                status, error = outcomes[upload.id]
+                item['status'] = status
+                if error:
+                    item['error'] = 'Processing failed'
+
+        for item, upload in uploads:
+            if item['status'] == 'completed':
+                item['result'] = upload.to_dict()
+
+        summary = {}
+        for item in items:
+            summary[item['status']] = summary.get(item['status'], 0) + 1
+
+        return jsonify({
+            'success': any(item['status'] in ('completed', 'queued') for item in items),
+            'items': items,
+            'summary': summary
+        }), 202 if summary.get('queued') else 200
 
-                # 🔑 CRITICAL FIX:
-                # form_score is the ONLY user-visible score
-                form_score = float(result.get('form_score', result.get('score', 0.0)))
+    except Exception as e:
+        logger.error(f"Batch upload error: {e}", exc_info=True)
+        return jsonify({'error': 'Batch upload failed'}), 500
 
-                # Enforce bounds
-                form_score = max(0.0, min(100.0, form_score))
 
-                result['form_score'] = form_score
+@upload_bp.route('/photos/analyze', methods=['POST'])
+@login_required_api
+def analyze_photos():
+    """Score a photo session of one pose-library pose, without storing the photos.
 
-                # Legacy DB compatibility ONLY
-                result['accuracy'] = form_score
+    Photos are sent as repeated 'photos' parts with a 'pose_id' field
+    (e.g. 'tree_pose'). The summary is shaped for POST /live-sessions.
+    """
+    try:
+        pose_id = (request.form.get('pose_id') or '').lower()
+        targets = static_pose.load_pose_targets()
+        if pose_id not in targets:
+            return jsonify({'error': 'Unknown pose', 'poses': sorted(targets)}), 400
+
+        photos = request.files.getlist('photos')
+        if not photos:
+            return jsonify({'error': 'No photos uploaded'}), 400
+        max_files = current_app.config['PHOTO_BATCH_MAX_FILES']
+        if len(photos) > max_files:
+            return jsonify({'error': f'At most {max_files} photos per request'}), 400
+
+        images = [static_pose.decode_image(photo.read()) if allowed_file(photo.filename or '') else None
+                  for photo in photos]
+        analysis = static_pose.analyze_photos(images, pose_id,
+                                              static_pose.get_pool(current_app.config['PHOTO_POSE_POOL_SIZE']))
+        for photo, result in zip(photos, analysis['photos']):
+            result['file_name'] = photo.filename
+
+        summary = analysis['summary']
+        return jsonify({
+            'success': summary['scored'] > 0,
+            'photos': analysis['photos'],
+            'summary': summary,
+            'session': {
+                'poseType': summary['pose_name'],
+                'sessionType': 'photo',
+                'durationSeconds': 0,
+                'overallScore': summary['overall_score'],
+                'stability': summary['stability'],
+                'mainIssueType': summary['main_issue'],
+                'suggestion': summary['suggestion'] or '',
+            },
+        }), 200
 
-                result['corrections'] = result.get('failures', [])
-                result['form_status'] = result.get('status', 'NEEDS_IMPROVEMENT')
+    except Exception as e:
+        logger.error(f"Photo analysis error: {e}", exc_info=True)
+        return jsonify({'error': 'Photo analysis failed'}), 500
 
-            else:
-                # OLD MLProcessor (non-pushup exercises)
-                ml_processor = MLProcessor()
-                result = ml_processor.process_file(file_path, file_type, exercise_type)
-
-                form_score = float(result.get('accuracy', 0.0))
-                result['form_score'] = form_score
-                result['accuracy'] = form_score
-
-            # -----------------------
-            # Save Results
-            # -----------------------
-            upload.accuracy = form_score                # legacy column
-            upload.form_status = result.get('form_status', 'NEEDS_IMPROVEMENT')
-            upload.corrections = json.dumps(result.get('corrections', []))
-            upload.feedback = result.get('feedback', '')
-            upload.result_json = json.dumps(result)
-            upload.processing_status = 'completed'
-            upload.processing_completed_at = datetime.utcnow()
-
-            # -----------------------
-            # XP Logic (USES form_score)
-            # -----------------------
-            if form_score >= 90:
-                xp_earned = 50
-            elif form_score >= 80:
-                xp_earned = 30
-            elif form_score >= 70:
-                xp_earned = 20
-            else:
-                xp_earned = 10
 
-            old_level = user.level
-            new_level = user.add_xp(xp_earned)
-            level_up = new_level > old_level
+# -----------------------
+# Resumable uploads
+# -----------------------
+
+def _get_upload_session(session_id):
+    session = UploadSession.query.filter_by(id=session_id, user_id=current_user.id).first()
+    if not session:
+        return None, (jsonify({'error': 'Upload session not found'}), 404)
+    if session.status != 'open' or resumable.is_expired(session):
+        return None, _session_closed(session)
+    return session, None
+
+def _session_closed(session):
+    # Past expires_at but not yet swept by cleanup counts as expired
+    status = 'expired' if session.status == 'open' else session.status
+    return jsonify({'error': f'Upload session is {status}', 'status': status}), 410
+
+def _session_response(session, status=200, **extra):
+    response = jsonify({'success': True, **session.to_dict(), **extra})
+    response.headers['Upload-Offset'] = str(session.received)
+    return response, status
+
+@upload_bp.route('/uploads/sessions', methods=['POST'])
+@login_required_api
+@admission_controlled
+def create_upload_session():
+    try:
+        data = request.get_json() or {}
+        original_name = data.get('filename') or ''
+        exercise_type = data.get('exercise_id') or data.get('exercise_type', 'general')
+        total_size = int(data.get('size') or 0)
+
+        if not original_name or not allowed_file(original_name):
+            return jsonify({'error': 'File type not allowed'}), 400
+        if total_size <= 0:
+            return jsonify({'error': 'File size is required'}), 400
+        if total_size > current_app.config['RESUMABLE_MAX_SIZE']:
+            return jsonify({'error': 'File too large'}), 413
 
-            db.session.commit()
+        filename = secure_filename(original_name)
 
-            if user.settings and user.settings.email_notifications:
-                send_analysis_email(user.email, user.name, result)
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        ttl = current_app.config['RESUMABLE_SESSION_TTL']
+        sweep_stale_parts()
 
-            return jsonify({
-                'success': True,
-                'upload_id': upload.id,
-                'result': upload.to_dict(),
-                'xp_earned': xp_earned,
-                'level_up': level_up,
-                'new_level': new_level
-            }), 200
-
-        except Exception as e:
-            logger.error(f"ML processing error: {e}", exc_info=True)
-            upload.processing_status = 'failed'
-            upload.processing_completed_at = datetime.utcnow()
-            db.session.commit()
-            return jsonify({'error': 'Processing failed'}), 500
+        session = resumable.create_session(current_user.id, filename, exercise_type, total_size, upload_folder, ttl)
+        return _session_response(session, 201, chunk_size=current_app.config['RESUMABLE_CHUNK_SIZE'])
 
     except Exception as e:
-        logger.error(f"Upload error: {e}", exc_info=True)
+        logger.error(f"Upload session create error: {e}", exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': 'Failed to create upload session'}), 500
+
+@upload_bp.route('/uploads/sessions/<session_id>', methods=['GET', 'HEAD'])
+@login_required_api
+def get_upload_session(session_id):
+    session = UploadSession.query.filter_by(id=session_id, user_id=current_user.id).first()
+    if not session:
+        return jsonify({'error': 'Upload session not found'}), 404
+    return _session_response(session)
+
+@upload_bp.route('/uploads/sessions/<session_id>', methods=['PUT'])
+@login_required_api
+def put_upload_chunk(session_id):
+    try:
+        session, error = _get_upload_session(session_id)
+        if error:
+            return error
+
+        content_range = resumable.parse_content_range(request.headers.get('Content-Range'))
+        if content_range:
+            start, _, total = content_range
+            if total is not None and total != session.total_size:
+                return jsonify({'error': 'Content-Range total does not match the session size'}), 400
+        else:
+            start = request.args.get('offset', type=int)
+            if start is None:
+                return jsonify({'error': 'Content-Range header or offset parameter is required'}), 400
+
+        try:
+            resumable.write_chunk(session, start, request.stream, current_app.config['RESUMABLE_SESSION_TTL'])
+        except resumable.OffsetMismatch as e:
+            return _session_response(session, 409, error='Offset mismatch', expected_offset=e.expected)
+        except resumable.ChunkOutOfRange as e:
+            return jsonify({'error': str(e)}), 416
+        except resumable.SessionClosed:
+            return _session_closed(session)
+        except RejectedUpload as e:
+            return jsonify({'error': 'Unsupported file content', 'message': e.description}), 415
+
+        db.session.refresh(session)
+        return _session_response(session, complete=session.received == session.total_size)
+
+    except Exception as e:
+        logger.error(f"Upload chunk error: {e}", exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': 'Failed to store chunk'}), 500
+
+@upload_bp.route('/uploads/sessions/<session_id>/complete', methods=['POST'])
+@login_required_api
+def complete_upload_session(session_id):
+    try:
+        session, error = _get_upload_session(session_id)
+        if error:
+            return error
+
+        user = current_user
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"{user.id}_{timestamp}_{session.file_name}"
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+
+        try:
+            file_size, content_hash = resumable.finalize(session, file_path, current_app.config['RESUMABLE_SESSION_TTL'])
+        except resumable.OffsetMismatch as e:
+            return _session_response(session, 409, error='Upload is incomplete', expected_offset=e.expected)
+        except resumable.SessionClosed:
+            return _session_closed(session)
+        except RejectedUpload as e:
+            return jsonify({'error': 'Unsupported file content', 'message': e.description}), 415
+
+        file_type = upload_file_type(filename)
+        upload, check, mismatch = ingest_stored_file(user, filename, file_path, file_type,
+                                                     file_size, content_hash, session.exercise_type)
+        if mismatch:
+            return mismatch
+        session.upload_id = upload.id
+        db.session.commit()
+        return dispatch_analysis(upload, exercise_check=check)
+
+    except Exception as e:
+        logger.error(f"Upload session complete error: {e}", exc_info=True)
+        db.session.rollback()
         return jsonify({'error': 'Upload failed'}), 500
 
 
@@ -185,56 +557,11 @@ def get_latest_result():
     if not latest_upload:
         return jsonify({'error': 'No uploads found'}), 404
 
-    result_json = json.loads(latest_upload.result_json or "{}")
-    score = result_json.get('form_score', 0.0)
-
-    scores = result_json.get('breakdown', {})
-    
-    # Format suggestions from string list to objects
-    raw_corrections = result_json.get('corrections', [])
-    formatted_suggestions = []
-    for i, correction in enumerate(raw_corrections):
-        if isinstance(correction, str):
-            formatted_suggestions.append({
-               'id': i + 1,
-               'title': f"Improvement {i+1}",
-               'description': correction,
-               'type': 'improvement',
-               'priority': 'medium',
-               'expanded': 'Focus on maintaining proper form throughout the movement.'
-            })
-        else:
-            formatted_suggestions.append(correction)
-
-    formatted_result = {
-        'title': f"{latest_upload.exercise_type.capitalize()} Analysis",
-        'uploadDate': latest_upload.created_at.strftime('%b %d, %Y'),
-        'duration': "00:15",
-        'videoUrl': latest_upload.file_path,
-        'overallScore': score,
-        'feedback': result_json.get('feedback', ''),
-        'confidenceLevel': result_json.get('confidenceLevel'),
-        'breakdown': {
-            'form': score,
-            'timing': score,
-            'accuracy': score,
-            'consistency': score
-        },
-        'suggestions': formatted_suggestions,
-        'keyMoments': [] # Placeholder
-    }
-
-    return jsonify({'success': True, 'result': formatted_result}), 200
+    return jsonify({'success': True, 'result': format_result(latest_upload)['result']}), 200
 
 
-@upload_bp.route('/results/<int:upload_id>', methods=['GET'])
-@upload_bp.route('/uploads/<int:upload_id>/results', methods=['GET'])  # Frontend uses this path
-@login_required_api
-def get_result(upload_id):
-    upload = Upload.query.filter_by(id=upload_id, user_id=current_user.id).first()
-    if not upload:
-        return jsonify({'error': 'Result not found'}), 404
-
+def format_result(upload):
+    """Response body for a completed analysis."""
     result_json = json.loads(upload.result_json or "{}")
     score = result_json.get('form_score', 0.0)
 
@@ -254,9 +581,12 @@ def get_result(upload_id):
         else:
             formatted_suggestions.append(correction)
 
-    return jsonify({
+    xp_info = {k: result_json[k] for k in ('xp_earned', 'level_up', 'new_level') if k in result_json}
+
+    return {
         'success': True,
         'status': 'done',
+        **xp_info,
         'result': {
             'title': f"{upload.exercise_type.capitalize()} Analysis",
             'uploadDate': upload.created_at.strftime('%b %d, %Y'),
@@ -276,4 +606,182 @@ def get_result(upload_id):
             'suggestions': formatted_suggestions,
             'keyMoments': []
         }
-    }), 200
+    }
+
+
+@upload_bp.route('/results/<int:upload_id>', methods=['GET'])
+@upload_bp.route('/uploads/<int:upload_id>/results', methods=['GET'])  # Frontend uses this path
+@login_required_api
+def get_result(upload_id):
+    upload = Upload.query.filter_by(id=upload_id, user_id=current_user.id).first()
+    if not upload:
+        return jsonify({'error': 'Result not found'}), 404
+
+    if upload.processing_status in ('pending', 'processing'):
+        # The user is waiting on this result, so let it overtake batch work
+        if upload.processing_status == 'pending':
+            job_queue.promote(upload.id)
+        return jsonify({
+            'success': False,
+            'status': upload.processing_status,
+            'upload_id': upload.id,
+            'error': 'Analysis still in progress'
+        }), 202
+
+    if upload.processing_status == 'failed':
+        return jsonify({'success': False, 'status': 'failed', 'error': 'Processing failed'}), 500
+
+    if upload.processing_status == 'cancelled':
+        return jsonify({'success': False, 'status': 'cancelled', 'error': 'Analysis was cancelled'}), 409
+
+    return jsonify(format_result(upload)), 200
+
+
+@upload_bp.route('/uploads/<int:upload_id>/comparison', methods=['GET'])
+@login_required_api
+def get_comparison(upload_id):
+    """Align the upload's movement to its exercise's reference video."""
+    try:
+        upload = Upload.query.filter_by(id=upload_id, user_id=current_user.id).first()
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        if upload.file_type != 'video':
+            return jsonify({'error': 'Only videos can be compared with a reference'}), 400
+
+        if upload.processing_status != 'completed':
+            return jsonify({'error': 'Analysis is not completed', 'status': upload.processing_status}), 409
+
+        exercise_id = normalize_exercise_name(upload.exercise_type or '')
+        exercise = next((ex for ex in EXERCISES_DATA if ex['id'] == exercise_id), None)
+        if not exercise:
+            return jsonify({'error': 'No reference for this exercise'}), 404
+
+        try:
+            result = comparison.compare_upload(upload, exercise)
+        except comparison.ReferencePending:
+            response = jsonify({'error': 'The reference video is still being prepared'})
+            response.headers['Retry-After'] = '30'
+            return response, 503
+        if result is None:
+            return jsonify({'error': 'No reference video or no pose detected for comparison'}), 404
+        return jsonify({'success': True, 'upload_id': upload.id, 'comparison': result}), 200
+    except Exception as e:
+        logger.error(f"Comparison error: {str(e)}")
+        return jsonify({'error': 'Comparison failed'}), 500
+
+
+@upload_bp.route('/uploads/<int:upload_id>/job', methods=['DELETE'])
+@login_required_api
+def cancel_analysis(upload_id):
+    """Cancel a queued or running analysis; the worker stops at its next frame."""
+    try:
+        upload = Upload.query.filter_by(id=upload_id, user_id=current_user.id).first()
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+
+        if not cancellation.request_cancel(upload):
+            return jsonify({
+                'success': False,
+                'status': upload.processing_status,
+                'error': 'Analysis is not running'
+            }), 409
+
+        return jsonify({'success': True, 'upload_id': upload.id, 'status': 'cancelled'}), 200
+
+    except Exception as e:
+        logger.error(f"Cancel analysis error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to cancel analysis'}), 500
+
+
+# -----------------------
+# Progress events (SSE)
+# -----------------------
+
+def _sse(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+def _final_event(upload_id):
+    """SSE message for a finished analysis, or None while it is still running.
+
+    Uses a short-lived session that is removed again before returning, so an
+    open stream never holds a database connection while it waits.
+    """
+    try:
+        status = db.session.query(Upload.processing_status).filter_by(id=upload_id).scalar()
+        if status == 'completed':
+            return _sse('result', format_result(Upload.query.get(upload_id)))
+        if status == 'cancelled':
+            return _sse('cancelled', {'success': False, 'status': 'cancelled', 'error': 'Analysis was cancelled'})
+        if status == 'failed' or status is None:
+            return _sse('failed', {'success': False, 'status': 'failed', 'error': 'Processing failed'})
+        return None
+    finally:
+        db.session.remove()
+
+
+@upload_bp.route('/uploads/<int:upload_id>/events', methods=['GET'])
+@login_required_api
+def upload_events(upload_id):
+    """Stream analysis progress, then the final result, as Server-Sent Events.
+
+    Events come from the in-process progress broker. Analyses run by
+    workers on other nodes publish nothing here, so the stream also checks
+    the upload's status whenever it has been quiet for SSE_POLL_SECONDS.
+    """
+    # Subscribe before reading the status so no transition is missed
+    updates = progress.broker.subscribe(upload_id)
+    try:
+        upload = Upload.query.filter_by(id=upload_id, user_id=current_user.id).first()
+        if not upload:
+            progress.broker.unsubscribe(upload_id, updates)
+            return jsonify({'error': 'Result not found'}), 404
+        status = upload.processing_status
+        if status == 'pending':
+            job_queue.promote(upload.id)
+    except Exception as e:
+        progress.broker.unsubscribe(upload_id, updates)
+        logger.error(f"Event stream setup error: {str(e)}")
+        return jsonify({'error': 'Failed to open event stream'}), 500
+    finally:
+        db.session.remove()
+
+    poll_seconds = current_app.config['SSE_POLL_SECONDS']
+    max_seconds = current_app.config['SSE_MAX_STREAM_SECONDS']
+
+    def stream():
+        try:
+            final = _final_event(upload_id) if status in ('completed', 'failed', 'cancelled') else None
+            if final:
+                yield final
+                return
+
+            yield _sse('progress', {'type': 'progress', 'stage': 'queued' if status == 'pending' else 'processing'})
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                try:
+                    event = updates.get(timeout=poll_seconds)
+                except queue.Empty:
+                    event = None
+
+                if event is not None and event.get('type') not in progress.TERMINAL_EVENTS:
+                    yield _sse(event['type'], event)
+                    continue
+
+                # Finished, or quiet for a while: the stored status decides
+                final = _final_event(upload_id)
+                if final:
+                    yield final
+                    return
+                yield ': keepalive\n\n'
+
+            # The client's EventSource reconnects and picks up from here
+            yield _sse('timeout', {'upload_id': upload_id})
+        finally:
+            progress.broker.unsubscribe(upload_id, updates)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
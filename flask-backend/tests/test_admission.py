@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip('flask_sqlalchemy')
+
+from utils import admission
+from utils.admission import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_bucket_starts_full_and_empties(clock):
+    bucket = TokenBucket(rate=0.5, capacity=3)
+    assert [bucket.take()[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_wait_is_time_to_refill_the_shortfall(clock):
+    bucket = TokenBucket(rate=0.5, capacity=1)
+    bucket.take()
+    clock[0] += 1.0
+    ok, wait = bucket.take()
+    assert not ok
+    assert wait == pytest.approx(1.0)  # 0.5 tokens short at 0.5 tokens/s
+
+
+def test_refill_is_proportional_to_elapsed_time(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4)
+    for _ in range(4):
+        bucket.take()
+    clock[0] += 1.25
+    assert [bucket.take()[0] for _ in range(3)] == [True, True, False]
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    bucket.take()
+    clock[0] += 3600.0
+    assert [bucket.take()[0] for _ in range(3)] == [True, True, False]
+
+
+def test_zero_rate_never_refills(clock):
+    bucket = TokenBucket(rate=0.0, capacity=1)
+    bucket.take()
+    clock[0] += 3600.0
+    assert bucket.take() == (False, float('inf'))
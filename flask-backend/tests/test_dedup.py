@@ -0,0 +1,77 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('numpy')
+flask = pytest.importorskip('flask')
+pytest.importorskip('flask_sqlalchemy')
+
+from models import StoredFile, db
+
+# utils.dedup pulls in the analysis pipeline and its dependencies
+dedup = pytest.importorskip('utils.dedup')
+
+CONTENT_HASH = 'ab' * 32
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _write(path, data=b'clip'):
+    with open(path, 'wb') as fh:
+        fh.write(data)
+    return str(path)
+
+
+def _ref_count():
+    db.session.expire_all()
+    stored = db.session.get(StoredFile, CONTENT_HASH)
+    return stored.ref_count if stored else None
+
+
+def test_identical_uploads_share_one_file(app, tmp_path):
+    first = dedup.store_file(CONTENT_HASH, _write(tmp_path / 'a.mp4'), 4)
+    second = dedup.store_file(CONTENT_HASH, _write(tmp_path / 'b.mp4'), 4)
+
+    assert first == second == str(tmp_path / 'a.mp4')
+    assert not os.path.exists(tmp_path / 'b.mp4')
+    assert _ref_count() == 2
+
+
+def test_last_release_deletes_the_file(app, tmp_path):
+    path = dedup.store_file(CONTENT_HASH, _write(tmp_path / 'a.mp4'), 4)
+    dedup.store_file(CONTENT_HASH, _write(tmp_path / 'b.mp4'), 4)
+    upload = SimpleNamespace(content_hash=CONTENT_HASH, file_path=path)
+
+    assert dedup.release_file(upload) is False
+    assert _ref_count() == 1
+    assert os.path.exists(path)
+
+    assert dedup.release_file(upload) is True
+    assert _ref_count() is None
+    assert not os.path.exists(path)
+
+
+def test_store_after_release_to_zero_starts_afresh(app, tmp_path):
+    path = dedup.store_file(CONTENT_HASH, _write(tmp_path / 'a.mp4'), 4)
+    dedup.release_reference(CONTENT_HASH, path)
+
+    again = dedup.store_file(CONTENT_HASH, _write(tmp_path / 'b.mp4'), 4)
+    assert again == str(tmp_path / 'b.mp4')
+    assert _ref_count() == 1
+
+
+def test_upload_from_before_deduplication_owns_its_file(app, tmp_path):
+    upload = SimpleNamespace(content_hash=None, file_path=_write(tmp_path / 'old.mp4'))
+    assert dedup.release_file(upload) is True
+    assert not os.path.exists(upload.file_path)
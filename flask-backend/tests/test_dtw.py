@@ -0,0 +1,69 @@
+import itertools
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from ml.dtw import _band, banded_dtw
+
+
+def _brute_force(x, y, lo, hi, weights):
+    """Cost of the cheapest monotone (0, 0) -> (n-1, m-1) path through the band, cell by cell."""
+    n, m = len(x), len(y)
+    weights = weights / weights.sum()
+    D = np.full((n, m), np.inf)
+    for i, j in itertools.product(range(n), range(m)):
+        if not lo[i] <= j <= hi[i]:
+            continue
+        cost = float(np.abs(x[i] - y[j]) @ weights)
+        if i == 0 and j == 0:
+            D[i, j] = cost
+            continue
+        best = min(D[i - 1, j] if i else np.inf,
+                   D[i, j - 1] if j else np.inf,
+                   D[i - 1, j - 1] if i and j else np.inf)
+        D[i, j] = cost + best
+    return D[n - 1, m - 1]
+
+
+def _path_cost(x, y, path, weights):
+    weights = weights / weights.sum()
+    return sum(float(np.abs(x[i] - y[j]) @ weights) for i, j in path)
+
+
+@pytest.mark.parametrize('n, m, band_ratio', [
+    (1, 1, 0.1), (1, 6, 0.1), (6, 1, 0.1),
+    (8, 8, 0.1), (9, 13, 0.2), (13, 9, 0.3), (12, 20, 1.0),
+])
+def test_matches_brute_force_dtw(n, m, band_ratio):
+    rng = np.random.default_rng(n * 100 + m)
+    weights = rng.uniform(0.5, 2.0, 3)
+    for _ in range(5):
+        x, y = rng.normal(size=(n, 3)), rng.normal(size=(m, 3))
+        cost, path = banded_dtw(x, y, band_ratio=band_ratio, weights=weights)
+
+        radius = max(1, int(np.ceil(band_ratio * max(n, m))))
+        lo, hi = _band(n, m, radius)
+        assert cost == pytest.approx(_brute_force(x, y, lo, hi, weights))
+
+        # The path is a monotone walk inside the band whose cells add up to the cost
+        assert path[0] == (0, 0) and path[-1] == (n - 1, m - 1)
+        for (i0, j0), (i1, j1) in zip(path, path[1:]):
+            assert (i1 - i0, j1 - j0) in ((1, 0), (0, 1), (1, 1))
+        assert all(lo[i] <= j <= hi[i] for i, j in path)
+        assert _path_cost(x, y, path, weights) == pytest.approx(cost)
+
+
+def test_full_band_is_unconstrained_dtw():
+    rng = np.random.default_rng(7)
+    x, y = rng.normal(size=(10, 2)), rng.normal(size=(7, 2))
+    cost, _ = banded_dtw(x, y, band_ratio=1.0)
+    full_lo, full_hi = np.zeros(10, dtype=int), np.full(10, 6)
+    assert cost == pytest.approx(_brute_force(x, y, full_lo, full_hi, np.ones(2)))
+
+
+def test_time_shifted_copy_aligns_at_no_cost():
+    x = np.sin(np.linspace(0.0, 4.0 * np.pi, 40))[:, None]
+    y = np.repeat(x, 2, axis=0)  # same movement at half speed
+    cost, _ = banded_dtw(x, y, band_ratio=0.5)
+    assert cost == pytest.approx(0.0)
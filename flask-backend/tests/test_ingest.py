@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip('flask')
+
+from utils.ingest import SNIFF_BYTES, sniff_container
+
+
+@pytest.mark.parametrize('head, kind', [
+    (b'\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00', 'video'),
+    (b'\x00\x00\x00\x14ftypqt  \x00\x00\x00\x00', 'video'),
+    (b'\x00\x00\x00\x08wide\x00\x00\x00\x00mdat', 'video'),
+    (b'RIFF\x24\x00\x00\x00AVI LIST', 'video'),
+    (bytes.fromhex('3026b2758e66cf11a6d900aa0062ce6c'), 'video'),
+    (b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01', 'image'),
+    (b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR', 'image'),
+    (b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00', 'image'),
+    (b'GIF87a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00', 'image'),
+])
+def test_recognises_supported_containers(head, kind):
+    assert len(head) <= SNIFF_BYTES
+    assert sniff_container(head) == kind
+
+
+@pytest.mark.parametrize('head', [
+    b'',
+    b'\x00\x00\x00',
+    b'RIFF\x24\x00\x00\x00WAVEfmt ',  # RIFF, but audio
+    b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n',
+    b'PK\x03\x04\x14\x00\x00\x00\x08\x00',
+    b'<!DOCTYPE html>\n',
+    b'\x00\x00\x00\x18ftyp'[:7],  # cut before the box type is complete
+])
+def test_rejects_everything_else(head):
+    assert sniff_container(head) is None
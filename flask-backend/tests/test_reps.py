@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from ml.reps import IncrementalRepDetector, load_phase_thresholds, segment_reps
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'pushup_rules.json')
+
+
+def _rules():
+    with open(RULES_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)['rules']
+
+
+def _pushups(reps, top=170.0, bottom=80.0, frames_per_rep=20):
+    """Average elbow angle of `reps` cosine push-ups from lockout to lockout."""
+    t = np.linspace(0.0, 2.0 * np.pi * reps, frames_per_rep * reps + 1)
+    return (top + bottom) / 2.0 + (top - bottom) / 2.0 * np.cos(t)
+
+
+def test_rep_windows_run_from_peak_to_peak():
+    angles = _pushups(3)
+    reps = segment_reps(angles, load_phase_thresholds(RULES_PATH))
+
+    assert len(reps) == 3
+    for rep in reps:
+        assert angles[rep.start] == pytest.approx(170.0)
+        assert angles[rep.end] == pytest.approx(170.0)
+        assert angles[rep.bottom] == pytest.approx(80.0)
+    # The lockout between two reps ends the first and starts the second
+    assert [r.end for r in reps[:-1]] == [r.start for r in reps[1:]]
+
+
+def test_rep_windows_pass_extension_and_range_rules():
+    rules = _rules()
+    angles = _pushups(3)
+    for rep in segment_reps(angles, load_phase_thresholds(RULES_PATH)):
+        window = angles[rep.start:rep.end + 1]
+        assert window.max() >= rules['elbow_max_extension']['value']
+        assert window.max() - window.min() >= rules['min_range_of_motion']['value']
+
+
+def test_incremental_detector_closes_rep_after_lockout():
+    angles = _pushups(2)
+    detector = IncrementalRepDetector(**load_phase_thresholds(RULES_PATH))
+    closed = [(i, rep) for i, angle in enumerate(angles) if (rep := detector.update(i, float(angle))) is not None]
+    last = detector.finish()
+
+    # The first rep closes a few frames past its top peak; the last one at the end of the clip
+    assert len(closed) == 1 and last is not None
+    index, rep = closed[0]
+    assert rep.end < index < rep.end + 10
+    assert (last.start, last.end) == (rep.end, len(angles) - 1)
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip('flask_sqlalchemy')
+
+from utils.resumable import parse_content_range
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes 0-99/1000', (0, 99, 1000)),
+    ('bytes 900-999/1000', (900, 999, 1000)),
+    ('bytes 0-0/1', (0, 0, 1)),
+    ('bytes 100-199/*', (100, 199, None)),
+    ('  bytes 0-9/10 ', (0, 9, 10)),
+])
+def test_parses_byte_ranges(header, expected):
+    assert parse_content_range(header) == expected
+
+
+@pytest.mark.parametrize('header', [
+    None,
+    '',
+    'bytes */1000',  # unsatisfied-range form
+    'bytes 0-99',
+    'bytes -99/1000',
+    'bytes 0-99/',
+    'bytes=0-99/1000',
+    'items 0-99/1000',
+    'bytes 0-99/1000, 200-299/1000',
+    'bytes 0x10-99/1000',
+])
+def test_rejects_malformed_headers(header):
+    assert parse_content_range(header) is None
+
+
+def test_leaves_range_checks_to_the_caller():
+    # Ordering and bounds are validated against the session, not here
+    assert parse_content_range('bytes 99-0/50') == (99, 0, 50)
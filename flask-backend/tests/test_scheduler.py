@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('cv2')
+
+from utils.scheduler import pick_next
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+AGING_SECONDS = 600
+
+
+def _job(job_id, user_id, lane='batch', waited=0.0, cost=10.0):
+    return SimpleNamespace(id=job_id, user_id=user_id, lane=lane, expected_cost=cost,
+                           enqueued_at=NOW - timedelta(seconds=waited))
+
+
+def _pick(candidates, running=None, service=None):
+    return pick_next(candidates, running or {}, service or {}, AGING_SECONDS, now=NOW)
+
+
+def test_no_candidates_picks_nothing():
+    assert _pick([]) is None
+
+
+def test_interactive_lane_goes_first():
+    jobs = [_job(1, 1, 'batch', waited=300), _job(2, 2, 'interactive')]
+    assert _pick(jobs).id == 2
+
+
+def test_user_with_fewest_running_jobs_goes_first():
+    jobs = [_job(1, 1, waited=60), _job(2, 2)]
+    assert _pick(jobs, running={1: 2, 2: 1}).id == 2
+
+
+def test_least_served_user_breaks_running_ties():
+    jobs = [_job(1, 1, waited=60), _job(2, 2)]
+    assert _pick(jobs, running={1: 1, 2: 1}, service={1: 30.0, 2: 120.0}).id == 1
+
+
+def test_shortest_job_first_within_a_user():
+    jobs = [_job(1, 1, cost=40.0, waited=60), _job(2, 1, cost=5.0), _job(3, 1, cost=5.0, waited=30)]
+    # Equal costs fall back to the longest waiting
+    assert _pick(jobs).id == 3
+
+
+def test_aged_jobs_jump_every_rule():
+    jobs = [
+        _job(1, 1, 'interactive'),
+        _job(2, 2, 'batch', waited=AGING_SECONDS + 5, cost=500.0),
+        _job(3, 3, 'batch', waited=AGING_SECONDS + 50, cost=500.0),
+    ]
+    assert _pick(jobs, running={3: 4}).id == 3
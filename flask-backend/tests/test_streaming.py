@@ -0,0 +1,97 @@
+import os
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+pytest.importorskip('mediapipe')
+
+from ml.hybrid_pushup_evaluator import HybridPushupEvaluator, StreamingScorer
+from ml.reps import load_phase_thresholds
+
+MODELS_DIR = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) / 'models'
+
+FPS = 10
+CLIP_FRAMES = 10 * 60 * FPS  # a 10 minute set, posed at 10 fps
+FRAMES_PER_REP = 2 * FPS
+CHUNK_FRAMES = 32
+# Growth of traced allocations while a clip streams: a fixed ceiling for
+# the scorer's buffers, plus what each scored repetition's result keeps.
+# The clip's landmarks alone are several times the ceiling.
+PEAK_CEILING_BYTES = 512 * 1024
+PER_REP_BYTES = 4 * 1024
+
+
+def _evaluator():
+    """HybridPushupEvaluator without models: scoring runs on the rule-free defaults."""
+    evaluator = object.__new__(HybridPushupEvaluator)
+    evaluator.models_dir = MODELS_DIR
+    evaluator.phase_thresholds = load_phase_thresholds(MODELS_DIR / 'pushup_rules.json')
+    evaluator.rule_engine = None
+    evaluator.lstm = None
+    return evaluator
+
+
+def _landmark_chunks(frames, chunk_frames=CHUNK_FRAMES, frames_per_rep=FRAMES_PER_REP):
+    """(k, 33, 4) landmarks of push-ups whose elbows swing between 170 and 80 degrees."""
+    rng = np.random.default_rng(0)
+    skeleton = np.concatenate([rng.uniform(0.2, 0.8, (33, 3)), np.ones((33, 1))], axis=1)
+    for start in range(0, frames, chunk_frames):
+        index = np.arange(start, min(start + chunk_frames, frames))
+        elbow = np.radians(125.0 + 45.0 * np.cos(2.0 * np.pi * index / frames_per_rep))
+        chunk = np.repeat(skeleton[np.newaxis], len(index), axis=0)
+        for shoulder, joint, wrist in ((11, 13, 15), (12, 14, 16)):
+            chunk[:, joint, :3] = chunk[:, shoulder, :3] + [0.1, 0.0, 0.0]
+            chunk[:, wrist, 0] = chunk[:, joint, 0] - 0.1 * np.cos(elbow)
+            chunk[:, wrist, 1] = chunk[:, joint, 1] + 0.1 * np.sin(elbow)
+            chunk[:, wrist, 2] = chunk[:, joint, 2]
+        yield chunk
+
+
+def test_landmark_chunks_swing_the_elbows():
+    chunk = next(_landmark_chunks(FRAMES_PER_REP, chunk_frames=FRAMES_PER_REP))
+    elbows = _evaluator().compute_angles(chunk)[:, :2]
+    assert elbows.max() == pytest.approx(170.0, abs=0.5)
+    assert elbows.min() == pytest.approx(80.0, abs=0.5)
+
+
+def _stream(per_rep):
+    """Feed a long clip to a StreamingScorer; returns it and the peak traced growth (bytes)."""
+    scorer = StreamingScorer(_evaluator(), per_rep=per_rep)
+    chunks = _landmark_chunks(CLIP_FRAMES)
+    # Warm up lazily created state before measuring
+    scorer.add_chunk(next(chunks))
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for chunk in chunks:
+            scorer.add_chunk(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return scorer, peak - baseline
+
+
+def test_streaming_scorer_buffers_stay_bounded():
+    assert PEAK_CEILING_BYTES * 4 < CLIP_FRAMES * 33 * 4 * 8
+
+    scorer, growth = _stream(per_rep=False)
+    assert growth < PEAK_CEILING_BYTES
+
+    stats = scorer.stats()
+    assert stats['frames'] == CLIP_FRAMES
+    assert scorer._ring.shape[0] == scorer.ring_frames
+    assert len(scorer._summary) < scorer.summary_frames
+
+
+def test_streaming_scorer_keeps_only_rep_results():
+    reps = CLIP_FRAMES // FRAMES_PER_REP
+    scorer, growth = _stream(per_rep=True)
+    assert growth < PEAK_CEILING_BYTES + reps * PER_REP_BYTES
+    assert scorer.stats()['dropped_reps'] == 0
+
+    result = scorer.result()
+    assert result['rep_count'] == reps
@@ -0,0 +1,133 @@
+"""
+Admission control for the upload/analysis path.
+
+Before an upload body is read, the analysis backlog must be under the
+configured limits (outstanding analyses and estimated CPU-seconds queued)
+and the request must get a token from its user's token bucket. Rejected requests
+get 429 with a Retry-After that reflects when capacity is projected to free
+up, so clients back off instead of piling onto a saturated box.
+"""
+
+import math
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import func
+from models import AnalysisJob, db
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, n: float = 1.0):
+        """Take n tokens. Returns (ok, seconds until n tokens are available)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= n:
+            self.tokens -= n
+            return True, 0.0
+        return False, (n - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+
+class AdmissionController:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._inflight = 0  # synchronous analyses running in this process
+        self.rejections = Counter()
+        self.admitted = 0
+
+    # -----------------------
+    # Load
+    # -----------------------
+
+    def backlog(self):
+        """Outstanding analyses and their estimated CPU-seconds (queued + running)."""
+        count, cost = db.session.query(func.count(AnalysisJob.id), func.sum(AnalysisJob.expected_cost))\
+                                .filter(AnalysisJob.status.in_(('queued', 'running')))\
+                                .one()
+        return int(count or 0) + self._inflight, float(cost or 0.0)
+
+    @contextmanager
+    def track(self):
+        """Count a synchronous in-request analysis as in flight."""
+        with self._lock:
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    # -----------------------
+    # Decision
+    # -----------------------
+
+    def _reject(self, reason: str, retry_after: float):
+        with self._lock:
+            self.rejections[reason] += 1
+        retry_after = max(1, int(math.ceil(retry_after)))
+        logger.warning(f"Admission rejected ({reason}); retry after {retry_after}s")
+        return False, reason, retry_after
+
+    def check(self, user_id: int, config):
+        """Decide whether to admit a new analysis for user_id.
+
+        Returns:
+            (admitted, reason, retry_after_seconds)
+        """
+        # The backlog is checked first so a request turned away by it does
+        # not also spend one of the user's tokens
+        pending, queued_cpu = self.backlog()
+        capacity = max(1, config['ADMISSION_CAPACITY'])
+
+        # Retry-After is the projected time for the workers to drain the
+        # backlog back under the limit that was hit
+        if pending >= config['ADMISSION_MAX_PENDING']:
+            excess = pending - config['ADMISSION_MAX_PENDING'] + 1
+            avg_cost = queued_cpu / pending if pending else 0.0
+            return self._reject('max_pending', excess * avg_cost / capacity)
+
+        if queued_cpu >= config['ADMISSION_MAX_QUEUED_CPU_SECONDS']:
+            excess = queued_cpu - config['ADMISSION_MAX_QUEUED_CPU_SECONDS']
+            return self._reject('max_queued_cpu', excess / capacity)
+
+        rate = config['UPLOAD_RATE_PER_MINUTE'] / 60.0
+        with self._lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = TokenBucket(rate, config['UPLOAD_BURST'])
+            ok, wait = bucket.take()
+        if not ok:
+            return self._reject('user_rate_limit', wait)
+
+        with self._lock:
+            self.admitted += 1
+        return True, None, 0
+
+    def stats(self) -> dict:
+        pending, queued_cpu = self.backlog()
+        with self._lock:
+            return {
+                'pending': pending,
+                'queued_cpu_seconds': queued_cpu,
+                'inflight_sync': self._inflight,
+                'admitted': self.admitted,
+                'rejected': dict(self.rejections),
+            }
+
+
+# Per-process controller (each web worker enforces its own buckets)
+controller = AdmissionController()
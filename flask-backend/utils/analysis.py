@@ -0,0 +1,194 @@
+from flask import current_app
+from models import User, db
+from utils import comparison, evaluators, similarity
+from utils.email_service import send_analysis_email
+from utils import progress, job_queue
+from ml.cancel import AnalysisCancelled
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Bump when feature extraction or scoring changes in a way that should
+# invalidate results reused by content-hash deduplication
+ANALYSIS_PIPELINE_VERSION = '9'
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_FILES = {
+    'hybrid-pushup': [
+        os.path.join(BACKEND_DIR, 'models', 'pushup_rules.json'),
+        os.path.join(BACKEND_DIR, 'models', 'pushup_lstm.pkl'),
+    ],
+    'mlprocessor': [
+        os.path.join(BACKEND_DIR, 'utils', 'models', 'exercise_model.pkl'),
+    ],
+    'pose-targets': [
+        os.path.join(BACKEND_DIR, 'models', 'pose_targets.json'),
+    ],
+}
+
+_fingerprint_cache = {}
+
+
+def is_pushup(exercise_type):
+    return exercise_type.lower() in ['pushup', 'push-up', 'push_up']
+
+
+def _file_fingerprint(path):
+    """SHA-256 of a model file, cached until its size or mtime changes."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 'missing'
+    key = (path, stat.st_size, stat.st_mtime)
+    if key not in _fingerprint_cache:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+                digest.update(chunk)
+        _fingerprint_cache[key] = digest.hexdigest()
+    return _fingerprint_cache[key]
+
+
+def model_version(exercise_type):
+    """Identify the pipeline and model files that would analyse this exercise."""
+    pipeline = evaluators.get(exercise_type).pipeline
+    digest = hashlib.sha256()
+    for path in MODEL_FILES[pipeline]:
+        digest.update(_file_fingerprint(path).encode())
+    return f"{pipeline}:{ANALYSIS_PIPELINE_VERSION}:{digest.hexdigest()[:12]}"
+
+
+def warm_models():
+    """Load the analysis models once for reuse by every job in this process."""
+    evaluators.warm_models()
+    logger.info("Analysis models loaded")
+
+
+def analysis_options(config):
+    """Extraction and scoring settings for evaluators.evaluate_video from the app config."""
+    return {
+        'activity_padding': config['ACTIVITY_PADDING_SECONDS'] if config.get('ACTIVITY_WINDOWS') else None,
+        'sampling_error_deg': config['SAMPLING_ERROR_BUDGET_DEG'] if config.get('ADAPTIVE_SAMPLING') else None,
+        'keyframe_interval': config['KEYFRAME_INTERVAL'] if config.get('KEYFRAME_POSE') else 1,
+        'roi': bool(config.get('POSE_ROI', False)),
+        'duplicate_max_distance': config['DUPLICATE_FRAME_MAX_BITS'] if config.get('DUPLICATE_FRAME_SKIP') else None,
+        'per_rep': bool(config.get('PER_REP_SCORING', False)),
+        'side_aware': bool(config.get('SIDE_AWARE_FEATURES', False)),
+        'stream_min_seconds': config['STREAMING_MIN_SECONDS'] if config.get('STREAMING_ANALYSIS') else None,
+    }
+
+
+def run_analysis(upload, progress_callback=None, cancel_token=None, lease=None):
+    """Run the ML pipeline for an upload and persist the result on the row.
+
+    Shared by the synchronous upload path and the background job workers.
+    Progress is published for the upload's event stream unless a
+    progress_callback(stage, fraction) is given. If cancel_token is tripped
+    the analysis stops between frames with AnalysisCancelled and nothing is
+    saved. A job worker passes its lease as (job_id, worker_id): the result
+    and XP are only committed together with finishing the job, and if the
+    lease was lost meanwhile nothing is saved and AnalysisCancelled('lease_lost')
+    is raised.
+
+    Returns:
+        (result, xp_info) where xp_info holds xp_earned / level_up / new_level
+    """
+    file_path = upload.file_path
+    exercise_type = upload.exercise_type
+    version = model_version(exercise_type)
+    progress_callback = progress_callback or progress.reporter(upload.id)
+
+    upload.processing_status = 'processing'
+    upload.processing_started_at = upload.processing_started_at or datetime.utcnow()
+    db.session.commit()
+
+    track = None
+    if upload.file_type != 'video':
+        result, track = evaluators.evaluate_image(file_path, exercise_type, options=analysis_options(current_app.config),
+                                                  pool_size=current_app.config['PHOTO_POSE_POOL_SIZE'])
+    else:
+        preview_callback = progress.previewer(upload.id) if current_app.config.get('PROGRESSIVE_PREVIEW') else None
+        results, track = evaluators.evaluate_video(file_path, [exercise_type],
+                                                   options=analysis_options(current_app.config),
+                                                   progress_callback=progress_callback, cancel_token=cancel_token,
+                                                   preview_callback=preview_callback, with_track=True)
+        result = results[exercise_type]
+    form_score = result['form_score']
+
+    # Cancelled after the frame loop: don't award XP or overwrite the status
+    if cancel_token is not None:
+        cancel_token.check()
+
+    # -----------------------
+    # XP Logic (USES form_score)
+    # -----------------------
+    if form_score >= 90:
+        xp_earned = 50
+    elif form_score >= 80:
+        xp_earned = 30
+    elif form_score >= 70:
+        xp_earned = 20
+    else:
+        xp_earned = 10
+
+    user = User.query.get(upload.user_id)
+    old_level = user.level
+    new_level = user.add_xp(xp_earned)
+    level_up = new_level > old_level
+    xp_info = {'xp_earned': xp_earned, 'level_up': level_up, 'new_level': new_level}
+
+    # Kept with the result so clients that did not wait on the upload
+    # request can still show the XP award
+    result.update(xp_info)
+
+    # -----------------------
+    # Save Results
+    # -----------------------
+    upload.accuracy = form_score                # legacy column
+    upload.form_status = result.get('form_status', 'NEEDS_IMPROVEMENT')
+    upload.corrections = json.dumps(result.get('corrections', []))
+    upload.feedback = result.get('feedback', '')
+    upload.result_json = json.dumps(result)
+    upload.model_version = version
+    upload.processing_status = 'completed'
+    upload.processing_completed_at = datetime.utcnow()
+
+    if current_app.config.get('REP_EMBEDDINGS'):
+        try:
+            similarity.store_embeddings(upload, track, result)
+        except Exception as e:
+            logger.error(f"Storing rep embeddings for upload {upload.id} failed: {e}")
+    if upload.file_type == 'video':
+        try:
+            comparison.store_angles(upload, track)
+        except Exception as e:
+            logger.error(f"Storing joint angles for upload {upload.id} failed: {e}")
+
+    if lease is not None and not job_queue.finish(*lease, 'completed', commit=False):
+        # The job was reclaimed by another worker, which records its own result
+        db.session.rollback()
+        raise AnalysisCancelled('lease_lost')
+    db.session.commit()
+
+    # Subscribers read the stored result once they see this
+    progress.publish(upload.id, {'type': 'result', 'status': 'completed'})
+
+    if user.settings and user.settings.email_notifications:
+        send_analysis_email(user.email, user.name, result)
+
+    return result, xp_info
+
+
+def mark_failed(upload, lease=None, error=None):
+    """Record a failed analysis on the upload row (and its job, for a worker holding lease)."""
+    upload.processing_status = 'failed'
+    upload.processing_completed_at = datetime.utcnow()
+    if lease is not None and not job_queue.finish(*lease, 'failed', error, commit=False):
+        db.session.rollback()
+        return
+    db.session.commit()
+    progress.publish(upload.id, {'type': 'failed', 'status': 'failed'})
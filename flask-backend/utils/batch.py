@@ -0,0 +1,132 @@
+"""
+Parallel analysis of a batch of uploads (synchronous analysis mode).
+
+Items run across a process pool whose workers each build the Flask app and
+load the pose/scoring models once in their initializer, so every item after
+the first in a worker starts with warm models. In async mode batches go
+through the job queue instead, whose worker processes warm up the same way.
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import progress
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_forwarder = None
+_lock = threading.Lock()
+
+_app = None  # per pool process
+
+WORKER_CRASHED = 'Worker crashed during analysis'
+
+
+def _init_worker(events):
+    global _app
+    from app import app
+    from utils.analysis import warm_models
+
+    progress.set_sink(events)
+    _app = app
+    with _app.app_context():
+        warm_models()
+
+
+def _analyze(upload_id: int):
+    """Run one item in a pool process. Returns (upload_id, status, error)."""
+    from models import Upload, db
+    from ml.cancel import AnalysisCancelled, CancelToken
+    from utils import cancellation
+    from utils.analysis import run_analysis, mark_failed
+
+    with _app.app_context():
+        upload = Upload.query.get(upload_id)
+        if upload is None:
+            return upload_id, 'failed', 'Upload no longer exists'
+        try:
+            with cancellation.watch(upload_id, CancelToken()) as token:
+                run_analysis(upload, cancel_token=token)
+            return upload_id, 'completed', None
+        except AnalysisCancelled as e:
+            db.session.rollback()
+            cancellation.mark_cancelled(upload, e.reason)
+            return upload_id, 'cancelled', None
+        except Exception as e:
+            logger.error(f"Batch analysis of upload {upload_id} failed: {e}", exc_info=True)
+            db.session.rollback()
+            mark_failed(upload)
+            return upload_id, 'failed', str(e)
+        finally:
+            db.session.remove()
+
+
+def get_executor(num_workers: int) -> ProcessPoolExecutor:
+    global _executor, _forwarder
+    with _lock:
+        if _executor is None:
+            ctx = multiprocessing.get_context('spawn')
+            events = ctx.Queue()
+            _forwarder = progress.EventForwarder(events)
+            _forwarder.start()
+            _executor = ProcessPoolExecutor(
+                max_workers=max(1, int(num_workers)),
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(events,),
+            )
+        return _executor
+
+
+def analyze_many(upload_ids, num_workers: int) -> dict:
+    """Analyse uploads in parallel; one item failing does not affect the others.
+
+    Must be called inside an app context.
+
+    Returns:
+        {upload_id: (status, error)}
+    """
+    from models import Upload, db
+    from utils.analysis import mark_failed
+
+    # End our read transaction so the pool processes can write to the rows
+    db.session.commit()
+    executor = get_executor(num_workers)
+    futures = {executor.submit(_analyze, upload_id): upload_id for upload_id in upload_ids}
+
+    outcomes = {}
+    crashed = False
+    for future, upload_id in futures.items():
+        try:
+            _, status, error = future.result()
+        except Exception as e:
+            # The pool process died (e.g. a decoder crash) before recording anything
+            logger.error(f"Batch worker crashed on upload {upload_id}: {e}")
+            crashed = True
+            status, error = 'failed', WORKER_CRASHED
+            upload = Upload.query.get(upload_id)
+            if upload:
+                mark_failed(upload)
+        outcomes[upload_id] = (status, error)
+
+    if crashed:
+        # A broken pool rejects all further work; start a fresh one next time
+        shutdown()
+
+    # The rows were updated by other processes
+    db.session.expire_all()
+    return outcomes
+
+
+def shutdown():
+    global _executor, _forwarder
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+        if _forwarder is not None:
+            _forwarder.done.set()
+            _forwarder = None
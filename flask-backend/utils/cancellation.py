@@ -0,0 +1,124 @@
+"""
+Cancelling analyses from the web tier.
+
+A cancel request marks the upload 'cancelled' (and its job, if any) in the
+database. Whatever process is running the analysis has a watcher thread
+that polls the upload's status and trips the analysis' CancelToken, so the
+frame loop stops within about a second on any node.
+"""
+
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import current_app
+
+from models import AnalysisJob, Upload, db
+from ml.cancel import CancelToken
+from utils import progress
+
+logger = logging.getLogger(__name__)
+
+
+def request_cancel(upload) -> bool:
+    """Cancel a pending or running analysis. Returns False if it already finished."""
+    now = datetime.utcnow()
+    cancelled = Upload.query.filter(
+        Upload.id == upload.id,
+        Upload.processing_status.in_(('pending', 'processing')),
+    ).update({
+        'processing_status': 'cancelled',
+        'processing_completed_at': now,
+    }, synchronize_session=False)
+    if not cancelled:
+        db.session.rollback()
+        return False
+
+    AnalysisJob.query.filter(
+        AnalysisJob.upload_id == upload.id,
+        AnalysisJob.status.in_(('queued', 'running')),
+    ).update({
+        'status': 'cancelled',
+        'error': 'Cancelled by user',
+        'finished_at': now,
+        'lease_expires_at': None,
+    }, synchronize_session=False)
+    db.session.commit()
+    db.session.refresh(upload)
+
+    logger.info(f"Analysis of upload {upload.id} cancelled")
+    progress.publish(upload.id, {'type': 'cancelled', 'status': 'cancelled'})
+    return True
+
+
+def mark_cancelled(upload, reason: str):
+    """Record an analysis that stopped on its cancel token."""
+    if reason == 'lease_lost':
+        # Another worker owns the job now; leave the rows to it
+        return
+    upload.processing_status = 'cancelled'
+    upload.processing_completed_at = upload.processing_completed_at or datetime.utcnow()
+    db.session.commit()
+    progress.publish(upload.id, {'type': 'cancelled', 'status': 'cancelled'})
+
+
+def client_disconnected(environ) -> bool:
+    """Peek at the request's socket: True once the client has closed it.
+
+    Works on the Werkzeug dev server and gunicorn, which expose the
+    connection socket in the WSGI environ; elsewhere it reports False.
+    """
+    sock = environ.get('werkzeug.socket') or environ.get('gunicorn.socket')
+    if sock is None:
+        return False
+    try:
+        data = sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+    except (BlockingIOError, InterruptedError):
+        return False  # nothing to read, connection still open
+    except OSError:
+        return True
+    return data == b''
+
+
+class _Watcher(threading.Thread):
+    """Trips a cancel token when the upload is marked cancelled in the database."""
+
+    def __init__(self, app, upload_id: int, token: CancelToken, interval: float):
+        super().__init__(name=f'cancel-watch-{upload_id}', daemon=True)
+        self.app = app
+        self.upload_id = upload_id
+        self.token = token
+        self.interval = interval
+        self.done = threading.Event()
+
+    def run(self):
+        with self.app.app_context():
+            try:
+                while not self.done.wait(self.interval):
+                    try:
+                        status = db.session.query(Upload.processing_status).filter_by(id=self.upload_id).scalar()
+                        db.session.commit()
+                    except Exception as e:
+                        logger.error(f"Cancel check for upload {self.upload_id} failed: {e}")
+                        db.session.rollback()
+                        continue
+                    if status == 'cancelled' or status is None:
+                        self.token.cancel('cancelled')
+                        return
+            finally:
+                db.session.remove()
+
+
+@contextmanager
+def watch(upload_id: int, token: CancelToken):
+    """Watch for cancellation of an upload while the body runs (requires an app context)."""
+    watcher = _Watcher(current_app._get_current_object(), upload_id, token,
+                       current_app.config['CANCEL_POLL_SECONDS'])
+    watcher.start()
+    try:
+        yield token
+    finally:
+        watcher.done.set()
+        watcher.join()
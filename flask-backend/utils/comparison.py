@@ -0,0 +1,175 @@
+"""
+Comparison of uploads against the exercise reference videos.
+
+The reference joint-angle sequence of each exercise is extracted once
+from the video its reference_video_url points at (routes/exercises.py)
+and cached in memory and on disk, keyed by the video's size and mtime;
+the serving process precomputes them at startup. An upload's joint angles
+are stored with its analysis (AngleSequence), so a comparison only runs
+the alignment and never decodes or poses the video.
+"""
+
+import os
+import logging
+import threading
+
+import numpy as np
+from flask import current_app
+
+from ml import dtw
+from ml.reps import resample_sequence
+from models import AngleSequence, db
+from utils import evaluators
+
+logger = logging.getLogger(__name__)
+
+# Reference clips are posed with fixed settings so every user is compared
+# against the same sequence
+REFERENCE_OPTIONS = {
+    'activity_padding': 1.0,
+    'sampling_error_deg': None,
+    'keyframe_interval': 1,
+    'roi': False,
+    'duplicate_max_distance': None,
+}
+
+
+class ReferencePending(Exception):
+    """The exercise has a reference video whose sequence is not extracted yet."""
+
+
+class ReferenceLibrary:
+    """Reference joint-angle sequences per exercise id."""
+
+    def __init__(self):
+        self._sequences = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _video_path(self, exercise):
+        url = exercise.get('reference_video_url') or ''
+        path = os.path.join(current_app.config['REFERENCE_VIDEO_DIR'], os.path.basename(url))
+        return path if url and os.path.exists(path) else None
+
+    def get(self, exercise, extract=True):
+        """
+        (frames, joints) reference angles for an exercise dict, or None
+        without a reference video. With extract=False a sequence that is
+        neither in memory nor on disk raises ReferencePending instead of
+        being extracted.
+        """
+        video_path = self._video_path(exercise)
+        if video_path is None:
+            return None
+        stat = os.stat(video_path)
+        key = (exercise['id'], stat.st_size, stat.st_mtime_ns)
+
+        sequence = self._sequences.get(key)
+        if sequence is not None:
+            return sequence
+        with self._lock:
+            lock = self._locks.setdefault(exercise['id'], threading.Lock())
+
+        # One extraction per exercise at a time; other exercises stay available
+        with lock:
+            if key in self._sequences:
+                return self._sequences[key]
+
+            cache_dir = current_app.config['REFERENCE_CACHE_DIR']
+            cache_path = os.path.join(cache_dir, f"{exercise['id']}_{stat.st_size}_{stat.st_mtime_ns}.npy")
+            if os.path.exists(cache_path):
+                angles = np.load(cache_path)
+            elif not extract:
+                raise ReferencePending(exercise['id'])
+            else:
+                logger.info(f"Extracting reference sequence for {exercise['id']} from {video_path}")
+                track = evaluators.extract(video_path, True, REFERENCE_OPTIONS)
+                if not track.usable:
+                    logger.warning(f"No usable pose in reference video {video_path}")
+                    return None
+                angles = dtw.joint_angles(track.landmarks)
+                os.makedirs(cache_dir, exist_ok=True)
+                np.save(cache_path, angles)
+            self._sequences[key] = angles
+            return angles
+
+    def precompute(self, exercises):
+        """Extract (or load) every reference sequence ahead of the first comparison."""
+        for exercise in exercises:
+            try:
+                self.get(exercise)
+            except Exception as e:
+                logger.error(f"Reference sequence for {exercise.get('id')} failed: {e}")
+
+
+library = ReferenceLibrary()
+
+
+def precompute_in_background(app, exercises):
+    """Load or extract every reference sequence on a daemon thread."""
+    def run():
+        with app.app_context():
+            library.precompute(exercises)
+
+    threading.Thread(target=run, name='reference-precompute', daemon=True).start()
+
+
+def track_angles(track):
+    """(angles, frame step) of an analysed track, or None without usable pose."""
+    if track is None:
+        return None
+    if 'joint_angles' in track.metadata:
+        # Streamed analysis: the decimated clip kept while the video decoded
+        return track.metadata['joint_angles']
+    if not track.usable:
+        return None
+    return dtw.joint_angles(track.landmarks), 1
+
+
+def store_angles(upload, track):
+    """Replace the upload's stored joint angles; the caller commits."""
+    AngleSequence.query.filter_by(upload_id=upload.id).delete(synchronize_session=False)
+    stored = track_angles(track)
+    if stored is None or not len(stored[0]):
+        return
+    angles, frame_step = stored
+    db.session.add(AngleSequence(upload_id=upload.id, frames=angles.shape[0], joints=angles.shape[1],
+                                 frame_step=int(frame_step), vector=angles.astype(np.float32).tobytes()))
+
+
+def copy_angles(source, upload):
+    """Give a deduplicated upload the joint angles of the analysis it reused; the caller commits."""
+    row = AngleSequence.query.filter_by(upload_id=source.id).first()
+    if row is not None:
+        db.session.add(AngleSequence(upload_id=upload.id, frames=row.frames, joints=row.joints,
+                                     frame_step=row.frame_step, vector=row.vector))
+
+
+def compare_upload(upload, exercise):
+    """
+    Align an upload's stored movement to the exercise reference.
+
+    Returns:
+        Comparison dict from dtw.compare_sequences, or None if there is
+        no reference video or no stored pose for the upload
+
+    Raises:
+        ReferencePending: the reference sequence is still being extracted
+    """
+    row = AngleSequence.query.filter_by(upload_id=upload.id).first()
+    if row is None:
+        return None
+    reference = library.get(exercise, extract=False)
+    if reference is None:
+        return None
+
+    user = np.frombuffer(row.vector, dtype=np.float32).reshape(row.frames, row.joints).astype(float)
+    if row.frame_step > 1:
+        # Back to the pose frame rate, so repetitions span as many frames as the reference's
+        user = resample_sequence(user, row.frames * row.frame_step)
+
+    result = dtw.compare_sequences(user, reference, band_ratio=current_app.config['DTW_BAND_RATIO'])
+    result['exercise_id'] = exercise['id']
+    result['reference_frames'] = int(len(reference))
+    result['user_frames'] = int(len(user))
+    return result
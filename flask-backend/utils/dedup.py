@@ -0,0 +1,133 @@
+"""
+Content-hash deduplication of uploaded files and analysis results.
+
+Every distinct file is stored once (StoredFile) and shared by reference
+count between the Upload rows that point at it. An upload whose bytes,
+exercise type and model version match a completed analysis reuses that
+result instead of running the pipeline again.
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from models import StoredFile, Upload, db
+from utils import comparison, similarity
+
+logger = logging.getLogger(__name__)
+
+# Per-user fields that must not be copied from another upload's result
+_USER_RESULT_KEYS = ('xp_earned', 'level_up', 'new_level')
+
+
+def store_file(content_hash: str, file_path: str, file_size: int) -> str:
+    """Take a reference on the stored copy of these bytes.
+
+    If the bytes are already stored, the freshly written file_path is
+    removed. Returns the path the Upload row should point at.
+    """
+    for _ in range(2):
+        stored = StoredFile.query.get(content_hash)
+        if stored and os.path.exists(stored.file_path):
+            taken = StoredFile.query.filter_by(content_hash=content_hash)\
+                                    .update({'ref_count': StoredFile.ref_count + 1}, synchronize_session=False)
+            db.session.commit()
+            if not taken:
+                # release_file deleted the row after it was read: store afresh
+                continue
+            if os.path.abspath(stored.file_path) != os.path.abspath(file_path):
+                os.remove(file_path)
+            logger.info(f"Deduplicated upload of {content_hash[:12]} onto {stored.file_path}")
+            return stored.file_path
+
+        try:
+            if stored:
+                # Row survived but its file did not: adopt the new copy
+                stored.file_path = file_path
+                stored.file_size = file_size
+                stored.ref_count = (stored.ref_count or 0) + 1
+            else:
+                db.session.add(StoredFile(content_hash=content_hash, file_path=file_path,
+                                          file_size=file_size, ref_count=1))
+            db.session.commit()
+            return file_path
+        except IntegrityError:
+            # A concurrent upload of the same bytes inserted the row first
+            db.session.rollback()
+
+    raise RuntimeError(f"Could not register stored file {content_hash}")
+
+
+def release_file(upload) -> bool:
+    """Drop an upload's reference on its file; unlink it with the last one.
+
+    Returns True if the file was deleted from disk.
+    """
+    stored = StoredFile.query.get(upload.content_hash) if upload.content_hash else None
+    if stored is None:
+        # Uploaded before deduplication: the file belongs to this row alone
+        path = upload.file_path
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+    return release_reference(stored.content_hash, stored.file_path)
+
+
+def release_reference(content_hash: str, path: str) -> bool:
+    """Drop one reference taken by store_file; unlink the file with the last one."""
+    StoredFile.query.filter_by(content_hash=content_hash)\
+                    .update({'ref_count': StoredFile.ref_count - 1}, synchronize_session=False)
+    db.session.commit()
+
+    # Only the request whose delete removes the row unlinks the file; a
+    # concurrent store_file that took a new reference keeps the row alive
+    deleted = StoredFile.query.filter(StoredFile.content_hash == content_hash,
+                                      StoredFile.ref_count <= 0).delete(synchronize_session=False)
+    db.session.commit()
+    if not deleted:
+        return False
+    if os.path.exists(path):
+        os.remove(path)
+    return True
+
+
+def find_reusable_result(upload, version: str):
+    """Completed upload with the same bytes, exercise type and model version."""
+    if not upload.content_hash:
+        return None
+    return Upload.query.filter(
+        Upload.content_hash == upload.content_hash,
+        Upload.exercise_type == upload.exercise_type,
+        Upload.model_version == version,
+        Upload.processing_status == 'completed',
+        Upload.result_json.isnot(None),
+        Upload.id != upload.id,
+    ).order_by(Upload.processing_completed_at.desc()).first()
+
+
+def reuse_result(upload, source, version: str):
+    """Copy the stored analysis of `source` onto a new upload row."""
+    result = json.loads(source.result_json or '{}')
+    for key in _USER_RESULT_KEYS:
+        result.pop(key, None)
+    result['deduplicated'] = True
+
+    now = datetime.utcnow()
+    upload.accuracy = source.accuracy
+    upload.form_status = source.form_status
+    upload.corrections = source.corrections
+    upload.feedback = source.feedback
+    upload.result_json = json.dumps(result)
+    upload.model_version = version
+    upload.duplicate_of_id = source.duplicate_of_id or source.id
+    upload.processing_status = 'completed'
+    upload.processing_started_at = now
+    upload.processing_completed_at = now
+    similarity.copy_embeddings(source, upload)
+    comparison.copy_angles(source, upload)
+    db.session.commit()
+    return result
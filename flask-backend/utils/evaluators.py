@@ -0,0 +1,371 @@
+"""
+Exercise evaluators keyed by exercise id.
+
+Every evaluator scores a LandmarkTrack produced by one shared extraction
+stage, so adding an exercise never adds a decode or pose pass, and one
+video can be scored by several evaluators for the cost of the scoring
+alone. Push-ups need every sampled frame of the active span (a dense
+track); the MLProcessor exercises only need 12 frames of the most active
+window, which a dense track can also provide. The image poses of the pose
+library are scored against joint angle targets (ml/static_pose.py), and
+evaluate_image scores a photo from a one-frame track.
+"""
+
+import logging
+
+from ml import landmarks, static_pose
+from utils.ml_processor import MLProcessor
+
+logger = logging.getLogger(__name__)
+
+# Loaded once by warm_models() in long-lived analysis processes
+_warm = {}
+
+# Options that only affect scoring, or whether long videos are streamed
+# (stream_min_seconds); the rest select how landmarks are extracted
+SCORING_OPTIONS = ('per_rep', 'side_aware', 'stream_min_seconds')
+
+
+def warm_models():
+    """Load the models of every pipeline for reuse by every job in this process."""
+    from ml.hybrid_pushup_evaluator import get_evaluator
+    _warm['hybrid-pushup'] = get_evaluator()
+    _warm['mlprocessor'] = MLProcessor()
+
+
+def _pushup_model():
+    from ml.hybrid_pushup_evaluator import get_evaluator
+    return _warm.get('hybrid-pushup') or get_evaluator()
+
+
+def _mlprocessor_model():
+    return _warm.get('mlprocessor') or MLProcessor()
+
+
+class ExerciseEvaluator:
+    """Scores one exercise from a landmark track."""
+
+    pipeline = None  # model family, part of the stored model_version
+    dense = False  # needs every sampled frame rather than a short window
+    streaming = False  # can score a video without materialising its track (stream())
+
+    def __init__(self, exercise_id, aliases=()):
+        self.exercise_id = exercise_id
+        self.aliases = tuple(aliases)
+
+    def model(self):
+        raise NotImplementedError
+
+    def score(self, track, options, progress_callback=None, preview=None):
+        """Result dict for the track; must set 'form_score' (0-100)."""
+        raise NotImplementedError
+
+    def stream(self, video_path, extraction_options, options, progress_callback=None, cancel_token=None):
+        """(result, rep embeddings, (joint angles, frame step)) scored while the video decodes; see evaluate_video."""
+        raise NotImplementedError
+
+    def error_result(self, message):
+        raise NotImplementedError
+
+
+class PushupEvaluator(ExerciseEvaluator):
+    pipeline = 'hybrid-pushup'
+    dense = True
+    streaming = True
+
+    def model(self):
+        return _pushup_model()
+
+    def score(self, track, options, progress_callback=None, preview=None):
+        result = self.model().score_track(track, progress_callback=progress_callback, preview=preview,
+                                          per_rep=options.get('per_rep', False))
+        return self._with_form_score(result)
+
+    def stream(self, video_path, extraction_options, options, progress_callback=None, cancel_token=None):
+        result, scorer = self.model().evaluate_stream(
+            video_path, progress_callback=progress_callback, cancel_token=cancel_token,
+            activity_padding=extraction_options.get('activity_padding'),
+            sampling_error_deg=extraction_options.get('sampling_error_deg'),
+            keyframe_interval=extraction_options.get('keyframe_interval', 1),
+            roi=extraction_options.get('roi', False),
+            duplicate_max_distance=extraction_options.get('duplicate_max_distance'),
+            per_rep=options.get('per_rep', False),
+        )
+        result = self._with_form_score(result)
+        return result, scorer.rep_vectors(result), scorer.joint_angles()
+
+    @staticmethod
+    def _with_form_score(result):
+        # 🔑 CRITICAL FIX:
+        # form_score is the ONLY user-visible score
+        form_score = float(result.get('form_score', result.get('score', 0.0)))
+
+        # Enforce bounds
+        form_score = max(0.0, min(100.0, form_score))
+
+        result['form_score'] = form_score
+
+        # Legacy DB compatibility ONLY
+        result['accuracy'] = form_score
+
+        result['corrections'] = result.get('failures', [])
+        result['form_status'] = result.get('status', 'NEEDS_IMPROVEMENT')
+        return result
+
+    def error_result(self, message):
+        return {
+            'exercise': 'pushup',
+            'status': 'INVALID',
+            'score': 0.0,
+            'form_score': 0.0,
+            'accuracy': 0.0,
+            'form_status': 'INVALID',
+            'corrections': ['Processing error'],
+            'failures': ['Processing error'],
+            'feedback': message,
+        }
+
+
+class MLProcessorEvaluator(ExerciseEvaluator):
+    pipeline = 'mlprocessor'
+    dense = False
+
+    def model(self):
+        return _mlprocessor_model()
+
+    def score(self, track, options, progress_callback=None, preview=None):
+        result = self.model().score_track(track, self.exercise_id, progress_callback=progress_callback,
+                                          side_aware=options.get('side_aware', False))
+        form_score = float(result.get('accuracy', 0.0))
+        result['form_score'] = form_score
+        result['accuracy'] = form_score
+        return result
+
+    def error_result(self, message):
+        result = _mlprocessor_model().error_result(self.exercise_id, message)
+        result['form_score'] = 0.0
+        return result
+
+
+class PoseTargetEvaluator(ExerciseEvaluator):
+    """A held pose of the pose library, scored against its joint angle targets."""
+
+    pipeline = 'pose-targets'
+    dense = False
+
+    def model(self):
+        return static_pose.load_pose_targets()[self.exercise_id]
+
+    def score(self, track, options, progress_callback=None, preview=None):
+        if not track.usable:
+            return self.error_result(track.error or 'No person was detected. Make sure your whole body is in frame.')
+        target = self.model()
+        if progress_callback:
+            progress_callback('scoring', 0.0)
+        scored = static_pose.score_pose(static_pose.track_angles(track), target)
+        if scored is None:
+            return self.error_result('The joints of this pose are not visible. Make sure your whole body is in frame.')
+
+        form_score = scored['score']
+        corrections = [static_pose.joint_correction(j, scored['joints'][j]) for j in scored['off_target']]
+        return {
+            'exercise': self.exercise_id,
+            'exercise_type': self.exercise_id,
+            'pose_name': target['name'],
+            'form_score': form_score,
+            'accuracy': form_score,
+            'form_status': 'Good' if form_score > 80 else 'Average' if form_score > 60 else 'Poor',
+            'corrections': corrections,
+            'feedback': f"{target['name']}: mean deviation of {scored['deviation_deg']:.0f}° from the pose"
+                        + (f", mostly your {scored['off_target'][0].replace('_', ' ')}." if corrections else '.'),
+            'joints': scored['joints'],
+            'mirrored': scored['mirrored'],
+        }
+
+    def error_result(self, message):
+        return {
+            'exercise': self.exercise_id,
+            'exercise_type': self.exercise_id,
+            'form_score': 0.0,
+            'accuracy': 0.0,
+            'form_status': 'Error',
+            'corrections': [],
+            'feedback': message,
+        }
+
+
+# Exercise ids as in routes/exercises.py EXERCISES_DATA
+REGISTRY = {}
+
+
+def register(evaluator):
+    for key in (evaluator.exercise_id,) + evaluator.aliases:
+        REGISTRY[key.lower()] = evaluator
+    return evaluator
+
+
+register(PushupEvaluator('pushup', aliases=('push-up', 'push_up')))
+for _exercise_id in ('squat', 'pullup', 'benchpress', 'shoulderpress'):
+    register(MLProcessorEvaluator(_exercise_id))
+# Pose library ids; an exercise of the same name (squat) keeps its model
+for _pose_id in static_pose.load_pose_targets():
+    if _pose_id not in REGISTRY:
+        register(PoseTargetEvaluator(_pose_id))
+
+
+def get(exercise_type):
+    """Evaluator for an exercise; unknown exercises go to the MLProcessor, as before."""
+    return REGISTRY.get((exercise_type or '').lower()) or MLProcessorEvaluator(exercise_type)
+
+
+def extract(video_path, dense, options, progress_callback=None, cancel_token=None, on_frame=None):
+    """The shared extraction stage: a cached LandmarkTrack for the video."""
+    options_key = tuple(sorted(options.items()))
+    track = landmarks.cache.get(video_path, options_key, dense)
+    if track is not None:
+        logger.info(f"Reusing cached landmarks for {video_path}")
+        return track
+
+    if dense:
+        track = _pushup_model().extract_track(
+            video_path, progress_callback=progress_callback, cancel_token=cancel_token, on_frame=on_frame,
+            activity_padding=options.get('activity_padding'),
+            sampling_error_deg=options.get('sampling_error_deg'),
+            keyframe_interval=options.get('keyframe_interval', 1),
+            roi=options.get('roi', False),
+            duplicate_max_distance=options.get('duplicate_max_distance'),
+        )
+    else:
+        track = _mlprocessor_model().extract_track(
+            video_path, progress_callback=progress_callback, cancel_token=cancel_token,
+            roi=options.get('roi', False),
+        )
+    landmarks.cache.put(video_path, options_key, track)
+    return track
+
+
+def evaluate_video(video_path, exercise_types, options=None, progress_callback=None, cancel_token=None,
+                   preview_callback=None, with_track=False):
+    """
+    Score one video for one or more exercises with a single extraction pass.
+
+    options holds the extraction settings (activity_padding,
+    sampling_error_deg, keyframe_interval, roi, duplicate_max_distance)
+    and the scoring settings in SCORING_OPTIONS. Videos of at least
+    stream_min_seconds (None: never) are scored in constant memory while
+    they decode when every chosen evaluator supports it and no cached
+    track exists; there is no preview then, and the returned track is
+    empty apart from metadata['rep_embeddings'] and metadata['joint_angles'].
+
+    Returns:
+        Dict of exercise type -> result, or (results, track) with
+        with_track (track is None if extraction failed)
+    """
+    from ml.cancel import AnalysisCancelled
+    from ml.hybrid_pushup_evaluator import ProgressivePreview
+
+    options = dict(options or {})
+    scoring_options = {key: options.pop(key, None) for key in SCORING_OPTIONS}
+    chosen = {exercise_type: get(exercise_type) for exercise_type in exercise_types}
+    dense = any(evaluator.dense for evaluator in chosen.values())
+
+    if _should_stream(video_path, chosen, dense, options, scoring_options['stream_min_seconds']):
+        return _stream_video(video_path, chosen, options, scoring_options, progress_callback, cancel_token,
+                             with_track)
+
+    preview = None
+    if preview_callback is not None and any(isinstance(e, PushupEvaluator) for e in chosen.values()):
+        preview = ProgressivePreview(_pushup_model(), preview_callback)
+
+    try:
+        track = extract(video_path, dense, options, progress_callback=progress_callback,
+                        cancel_token=cancel_token, on_frame=preview.add_frame if preview is not None else None)
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Landmark extraction failed for {video_path}: {e}", exc_info=True)
+        results = {exercise_type: evaluator.error_result('An error occurred during analysis. Please try again.')
+                   for exercise_type, evaluator in chosen.items()}
+        return (results, None) if with_track else results
+
+    if preview is not None and len(preview.angles()) != len(track.landmarks):
+        # Served from the cache: the preview never saw these frames
+        preview = None
+
+    results = {}
+    for exercise_type, evaluator in chosen.items():
+        try:
+            results[exercise_type] = evaluator.score(track, scoring_options, progress_callback=progress_callback,
+                                                     preview=preview if isinstance(evaluator, PushupEvaluator) else None)
+        except AnalysisCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Scoring {exercise_type} failed: {e}", exc_info=True)
+            results[exercise_type] = evaluator.error_result('An error occurred during analysis. Please try again.')
+    return (results, track) if with_track else results
+
+
+def evaluate_image(image_path, exercise_type, options=None, pool_size=static_pose.STATIC_POSE_POOL_SIZE):
+    """
+    Score a photo: one static-image pose pass, no extraction stage or cache.
+
+    Returns:
+        (result, one-frame track or None)
+    """
+    evaluator = get(exercise_type)
+    if evaluator.dense:
+        return evaluator.error_result('Only video inputs are supported for this exercise.'), None
+    scoring_options = {key: (options or {}).get(key) for key in SCORING_OPTIONS}
+
+    try:
+        image = static_pose.read_image(image_path)
+        if image is None:
+            return evaluator.error_result('Could not read the photo.'), None
+        track = static_pose.image_track(image, static_pose.get_pool(pool_size))
+    except Exception as e:
+        logger.error(f"Pose extraction failed for {image_path}: {e}", exc_info=True)
+        return evaluator.error_result('An error occurred during analysis. Please try again.'), None
+    if not track.usable:
+        return evaluator.error_result(f"{track.error} Make sure your whole body is in frame."), None
+
+    try:
+        return evaluator.score(track, scoring_options), track
+    except Exception as e:
+        logger.error(f"Scoring {exercise_type} photo failed: {e}", exc_info=True)
+        return evaluator.error_result('An error occurred during analysis. Please try again.'), None
+
+
+def _should_stream(video_path, chosen, dense, options, stream_min_seconds):
+    from ml.frame_pipeline import video_duration_seconds
+
+    if stream_min_seconds is None or len(chosen) != 1 or not all(e.streaming for e in chosen.values()):
+        return False
+    if landmarks.cache.get(video_path, tuple(sorted(options.items())), dense) is not None:
+        return False
+    return video_duration_seconds(video_path) >= stream_min_seconds
+
+
+def _stream_video(video_path, chosen, options, scoring_options, progress_callback, cancel_token, with_track):
+    """evaluate_video for one streaming evaluator: nothing is cached, the track only carries embeddings and joint angles."""
+    from ml.cancel import AnalysisCancelled
+
+    (exercise_type, evaluator), = chosen.items()
+    logger.info(f"Streaming analysis of {video_path}")
+    rep_vectors, joint_angles = [], None
+    try:
+        result, rep_vectors, joint_angles = evaluator.stream(video_path, options, scoring_options,
+                                                             progress_callback=progress_callback,
+                                                             cancel_token=cancel_token)
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Streaming analysis failed for {video_path}: {e}", exc_info=True)
+        result = evaluator.error_result('An error occurred during analysis. Please try again.')
+    results = {exercise_type: result}
+    if not with_track:
+        return results
+    track = landmarks.LandmarkTrack.empty(result.get('preflight') or {}, dense=True)
+    track.metadata['rep_embeddings'] = rep_vectors
+    if joint_angles is not None:
+        track.metadata['joint_angles'] = joint_angles
+    return results, track
@@ -0,0 +1,180 @@
+"""
+Streaming upload ingestion.
+
+By default Werkzeug spools each multipart file part to a temporary file and
+`FileStorage.save` then copies it to its destination. For upload routes that
+opt in, IngestRequest instead hands the multipart parser an IngestStream that
+writes the part straight into the upload folder, hashes it with SHA-256 as
+the chunks arrive and checks the container magic bytes of the first chunk,
+so a body that is not a video/image is rejected before the rest is read.
+"""
+
+import os
+import uuid
+import hashlib
+import logging
+
+from flask import Request
+from werkzeug.exceptions import UnsupportedMediaType
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'wmv'}
+
+# Bytes needed to recognise every container below
+SNIFF_BYTES = 16
+
+_ASF_GUID = bytes.fromhex('3026b2758e66cf11a6d900aa0062ce6c')
+_ISO_BMFF_BOXES = {b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot'}
+
+
+def sniff_container(head: bytes):
+    """Identify a file from its leading bytes: 'video', 'image' or None."""
+    if len(head) >= 8 and head[4:8] in _ISO_BMFF_BOXES:
+        return 'video'  # mp4 / mov
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'video'
+    if head[:16] == _ASF_GUID:
+        return 'video'  # wmv
+    if head[:3] == b'\xff\xd8\xff':
+        return 'image'  # jpeg
+    if head[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image'
+    return None
+
+
+def expected_kind(filename):
+    ext = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    return 'video' if ext in VIDEO_EXTENSIONS else 'image'
+
+
+class RejectedUpload(UnsupportedMediaType):
+    description = 'File content does not match a supported video or image format.'
+
+
+class IngestStream:
+    """
+    Writable file used as the multipart parser's target for one file part.
+    Data goes directly to a part file in the upload folder.
+    """
+
+    def __init__(self, folder: str, filename: str = None):
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f".ingest-{uuid.uuid4().hex}.part")
+        self.expected = expected_kind(filename)
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._head = b''
+        self._checked = False
+        self.finalized = False
+        self._fh = open(self.path, 'w+b')
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def _check_head(self):
+        kind = sniff_container(self._head)
+        self._checked = True
+        if kind != self.expected:
+            logger.warning(f"Rejecting upload: expected {self.expected}, sniffed {kind or 'unknown'}")
+            self.discard()
+            raise RejectedUpload()
+
+    def write(self, data) -> int:
+        if not self._checked:
+            self._head = (self._head + bytes(data))[:SNIFF_BYTES]
+            if len(self._head) >= SNIFF_BYTES:
+                self._check_head()
+        self._hash.update(data)
+        self.size += len(data)
+        return self._fh.write(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # The parser rewinds the file once the part is complete; tiny files
+        # never reached SNIFF_BYTES, so verify them here
+        if not self._checked:
+            self._check_head()
+        return self._fh.seek(offset, whence)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._fh.read(size)
+
+    def tell(self) -> int:
+        return self._fh.tell()
+
+    def flush(self):
+        self._fh.flush()
+
+    @property
+    def closed(self) -> bool:
+        return self._fh.closed
+
+    def close(self):
+        self._fh.close()
+
+    def finalize(self, dest_path: str):
+        """Move the completed part into place (a rename, not a copy)."""
+        if not self._checked:
+            self._check_head()
+        self._fh.close()
+        os.replace(self.path, dest_path)
+        self.finalized = True
+        return self.size, self.sha256
+
+    def discard(self):
+        self._fh.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class IngestRequest(Request):
+    """Request that streams file parts to disk when `ingest_folder` is set."""
+
+    ingest_folder = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.ingest_folder is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        stream = IngestStream(self.ingest_folder, filename)
+        self.__dict__.setdefault('_ingest_streams', []).append(stream)
+        return stream
+
+    def close(self):
+        # Parts the route never moved into place (rejected, cut off mid-body
+        # or failed before store_upload) go with the request
+        for stream in self.__dict__.get('_ingest_streams', ()):
+            if not stream.finalized:
+                stream.discard()
+        super().close()
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_upload(file, dest_path: str):
+    """Put an uploaded FileStorage at dest_path.
+
+    Returns:
+        (file_size, sha256_hex)
+    """
+    if isinstance(file.stream, IngestStream):
+        return file.stream.finalize(dest_path)
+
+    # Request was not streamed (e.g. a plain Flask request class)
+    file.save(dest_path)
+    return os.path.getsize(dest_path), hash_file(dest_path)
+
+
+def discard_upload(file):
+    if isinstance(file.stream, IngestStream):
+        file.stream.discard()
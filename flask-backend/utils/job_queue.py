@@ -0,0 +1,478 @@
+"""
+Durable analysis job queue backed by the application database.
+
+Uploads are saved by the web tier and enqueued as AnalysisJob rows. Workers
+(the in-app pool or standalone `python -m worker` nodes sharing the database
+and upload volume) claim a job by taking a time-limited lease on it with a
+conditional UPDATE, so two workers can never run the same upload. A running
+worker heartbeats to extend its lease; a lease that expires because its
+worker died is reclaimed by the next worker that polls.
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from sqlalchemy import func
+from models import AnalysisJob, Upload, db
+from utils import scheduler, progress, cancellation
+from ml.cancel import AnalysisCancelled, CancelToken
+
+logger = logging.getLogger(__name__)
+
+
+def worker_identity() -> str:
+    """Identify the current process as '<hostname>:<pid>'."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+# -----------------------
+# Queue operations
+# -----------------------
+
+def enqueue(upload, lane: str = 'batch'):
+    """Create a queued job for an upload that has been saved to disk."""
+    from utils.analysis import is_pushup
+
+    probe = {}
+    if upload.file_type == 'video':
+        try:
+            probe = scheduler.probe_video(upload.file_path)
+        except Exception as e:
+            logger.warning(f"Could not probe {upload.file_path}: {e}")
+
+    job = AnalysisJob(
+        upload_id=upload.id,
+        user_id=upload.user_id,
+        status='queued',
+        lane=lane if lane in scheduler.LANES else 'batch',
+        expected_cost=scheduler.estimate_cost(is_pushup(upload.exercise_type), probe),
+        video_duration=probe.get('duration'),
+        frame_count=probe.get('frame_count'),
+    )
+    upload.processing_status = 'pending'
+    db.session.add(job)
+    db.session.commit()
+    logger.info(f"Enqueued analysis job {job.id} for upload {upload.id}")
+    return job
+
+
+def _claimable():
+    """Queued jobs, plus running jobs whose lease has expired."""
+    now = datetime.utcnow()
+    return db.or_(
+        AnalysisJob.status == 'queued',
+        db.and_(AnalysisJob.status == 'running', AnalysisJob.lease_expires_at < now),
+    )
+
+
+def _usage_by_user(fair_window_seconds: int):
+    """Running job counts and recently started CPU-seconds, per user."""
+    running = dict(
+        db.session.query(AnalysisJob.user_id, func.count(AnalysisJob.id))
+        .filter(AnalysisJob.status == 'running')
+        .group_by(AnalysisJob.user_id)
+        .all()
+    )
+    since = datetime.utcnow() - timedelta(seconds=fair_window_seconds)
+    service = dict(
+        db.session.query(AnalysisJob.user_id, func.sum(AnalysisJob.expected_cost))
+        .filter(AnalysisJob.started_at >= since)
+        .group_by(AnalysisJob.user_id)
+        .all()
+    )
+    return running, {user_id: float(cost or 0.0) for user_id, cost in service.items()}
+
+
+def claim_next(worker_id: str, lease_seconds: int, max_attempts: int, max_tries: int = 5):
+    """Atomically lease the job the scheduler picks, or return None if there is none."""
+    config = current_app.config
+    for _ in range(max_tries):
+        candidates = AnalysisJob.query.filter(_claimable())\
+                                      .order_by(AnalysisJob.enqueued_at, AnalysisJob.id)\
+                                      .limit(config['SCHED_CANDIDATES'])\
+                                      .all()
+        running_by_user, service_by_user = _usage_by_user(config['SCHED_FAIR_WINDOW_SECONDS'])
+        candidate = scheduler.pick_next(candidates, running_by_user, service_by_user, config['SCHED_AGING_SECONDS'])
+        if candidate is None:
+            db.session.commit()
+            return None
+
+        now = datetime.utcnow()
+        if candidate.status == 'running':
+            logger.warning(f"Lease on job {candidate.id} held by {candidate.worker_id} expired; reclaiming")
+            if candidate.attempts >= max_attempts:
+                _fail_exhausted(candidate)
+                continue
+
+        # Compare-and-set on the state we read: if another worker claimed or
+        # heartbeated the row in between, this matches nothing
+        claimed = AnalysisJob.query.filter(
+            AnalysisJob.id == candidate.id,
+            AnalysisJob.status == candidate.status,
+            AnalysisJob.worker_id.is_(None) if candidate.worker_id is None else AnalysisJob.worker_id == candidate.worker_id,
+            _claimable(),
+        ).update({
+            'status': 'running',
+            'worker_id': worker_id,
+            'started_at': now,
+            'heartbeat_at': now,
+            'lease_expires_at': now + timedelta(seconds=lease_seconds),
+            'attempts': AnalysisJob.attempts + 1,
+        }, synchronize_session=False)
+
+        if claimed:
+            Upload.query.filter_by(id=candidate.upload_id).update({
+                'processing_status': 'processing',
+                'processing_started_at': now,
+            }, synchronize_session=False)
+            db.session.commit()
+            return AnalysisJob.query.get(candidate.id)
+
+        # Another worker won the race for this row; try the next one
+        db.session.rollback()
+    return None
+
+
+def promote(upload_id: int) -> bool:
+    """Move a queued job to the interactive lane (its owner is waiting on it)."""
+    promoted = AnalysisJob.query.filter_by(upload_id=upload_id, status='queued', lane='batch')\
+                                .update({'lane': 'interactive'}, synchronize_session=False)
+    db.session.commit()
+    if promoted:
+        logger.info(f"Promoted analysis of upload {upload_id} to the interactive lane")
+    return bool(promoted)
+
+
+def heartbeat(job_id: int, worker_id: str, lease_seconds: int) -> bool:
+    """Extend our lease on a job. Returns False if the lease was lost."""
+    now = datetime.utcnow()
+    renewed = AnalysisJob.query.filter_by(id=job_id, worker_id=worker_id, status='running').update({
+        'heartbeat_at': now,
+        'lease_expires_at': now + timedelta(seconds=lease_seconds),
+    }, synchronize_session=False)
+    db.session.commit()
+    return bool(renewed)
+
+
+class _Heartbeat(threading.Thread):
+    """Renews a job lease from its own app context while the analysis runs.
+    Losing the lease trips the analysis' cancel token."""
+
+    def __init__(self, app, job_id: int, worker_id: str, lease_seconds: int, cancel_token=None):
+        super().__init__(name=f'lease-heartbeat-{job_id}', daemon=True)
+        self.app = app
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval = max(1.0, lease_seconds / 3.0)
+        self.cancel_token = cancel_token
+        self.done = threading.Event()
+        self.lost = False
+
+    def run(self):
+        with self.app.app_context():
+            while not self.done.wait(self.interval):
+                try:
+                    if not heartbeat(self.job_id, self.worker_id, self.lease_seconds):
+                        logger.warning(f"Lost lease on job {self.job_id}")
+                        self.lost = True
+                        if self.cancel_token is not None:
+                            self.cancel_token.cancel('lease_lost')
+                        return
+                except Exception as e:
+                    logger.error(f"Heartbeat for job {self.job_id} failed: {e}")
+                    db.session.rollback()
+            db.session.remove()
+
+
+def _fail_exhausted(job):
+    upload = Upload.query.get(job.upload_id)
+    logger.warning(f"Job {job.id} exceeded its attempts; marking failed")
+    job.status = 'failed'
+    job.error = 'Worker crashed during analysis'
+    job.finished_at = datetime.utcnow()
+    job.lease_expires_at = None
+    if upload:
+        upload.processing_status = 'failed'
+        upload.processing_completed_at = datetime.utcnow()
+    db.session.commit()
+
+
+def finish(job_id: int, worker_id: str, status: str, error: str = None, commit: bool = True) -> bool:
+    """Record the outcome of a job, provided worker_id still holds its lease.
+
+    With commit=False the update joins the caller's transaction, which
+    must then be rolled back if this returns False.
+    """
+    updated = AnalysisJob.query.filter_by(id=job_id, worker_id=worker_id, status='running').update({
+        'status': status,
+        'error': error,
+        'finished_at': datetime.utcnow(),
+        'lease_expires_at': None,
+    }, synchronize_session=False)
+    if commit:
+        db.session.commit()
+    if not updated:
+        logger.warning(f"Job {job_id} was reclaimed from {worker_id} before it finished")
+    return bool(updated)
+
+
+def process_job(job, lease_seconds: int):
+    """Run the analysis for a leased job and record the outcome."""
+    from utils.analysis import run_analysis, mark_failed
+
+    job_id, owner = job.id, job.worker_id
+    upload = Upload.query.get(job.upload_id)
+    if upload is None:
+        finish(job_id, owner, 'failed', 'Upload no longer exists')
+        return
+
+    token = CancelToken()
+    beat = _Heartbeat(current_app._get_current_object(), job_id, owner, lease_seconds, cancel_token=token)
+    beat.start()
+    try:
+        # The job row is finished in the same transaction as the result
+        with cancellation.watch(upload.id, token):
+            run_analysis(upload, cancel_token=token, lease=(job_id, owner))
+    except AnalysisCancelled as e:
+        logger.info(f"Analysis job {job_id} stopped: {e.reason}")
+        db.session.rollback()
+        cancellation.mark_cancelled(upload, e.reason)
+    except Exception as e:
+        logger.error(f"Analysis job {job_id} failed: {e}", exc_info=True)
+        db.session.rollback()
+        mark_failed(upload, lease=(job_id, owner), error=str(e))
+    finally:
+        beat.done.set()
+        beat.join()
+
+
+def requeue_orphaned(max_attempts: int, host: str = None) -> int:
+    """Requeue running jobs whose worker process on this host has died.
+
+    This only short-cuts waiting for the lease to expire when the dead
+    worker is known to be local. Jobs that already used up max_attempts are
+    failed instead, so a video that crashes the worker cannot take the pool
+    down forever.
+    """
+    host = host or socket.gethostname()
+    recovered = 0
+
+    for job in AnalysisJob.query.filter_by(status='running').all():
+        owner_host, _, owner_pid = (job.worker_id or '').rpartition(':')
+        if owner_host != host or not owner_pid.isdigit() or _pid_alive(int(owner_pid)):
+            continue
+
+        if job.attempts >= max_attempts:
+            _fail_exhausted(job)
+        else:
+            logger.warning(f"Requeueing job {job.id} orphaned by worker {job.worker_id}")
+            job.status = 'queued'
+            job.worker_id = None
+            job.started_at = None
+            job.lease_expires_at = None
+            upload = Upload.query.get(job.upload_id)
+            if upload:
+                upload.processing_status = 'pending'
+        recovered += 1
+
+    db.session.commit()
+    return recovered
+
+
+def queue_stats(window: int = 100) -> dict:
+    """Queue depth and latency figures over the most recent finished jobs."""
+    counts = dict(
+        db.session.query(AnalysisJob.status, func.count(AnalysisJob.id))
+        .group_by(AnalysisJob.status)
+        .all()
+    )
+
+    recent = AnalysisJob.query.filter(AnalysisJob.finished_at.isnot(None))\
+                              .order_by(AnalysisJob.finished_at.desc())\
+                              .limit(window)\
+                              .all()
+    waits = [(j.started_at - j.enqueued_at).total_seconds() for j in recent if j.started_at and j.enqueued_at]
+    runs = [(j.finished_at - j.started_at).total_seconds() for j in recent if j.started_at]
+
+    expired = AnalysisJob.query.filter(
+        AnalysisJob.status == 'running',
+        AnalysisJob.lease_expires_at < datetime.utcnow(),
+    ).count()
+
+    oldest = AnalysisJob.query.filter_by(status='queued').order_by(AnalysisJob.enqueued_at).first()
+    oldest_age = (datetime.utcnow() - oldest.enqueued_at).total_seconds() if oldest else 0.0
+
+    # Queueing delay per lane, over the most recently started jobs
+    lane_depth = dict(
+        db.session.query(AnalysisJob.lane, func.count(AnalysisJob.id))
+        .filter(AnalysisJob.status == 'queued')
+        .group_by(AnalysisJob.lane)
+        .all()
+    )
+    lanes = {}
+    for lane in scheduler.LANES:
+        started = AnalysisJob.query.filter(AnalysisJob.lane == lane, AnalysisJob.started_at.isnot(None))\
+                                   .order_by(AnalysisJob.started_at.desc())\
+                                   .limit(window)\
+                                   .all()
+        lane_waits = [(j.started_at - j.enqueued_at).total_seconds() for j in started if j.enqueued_at]
+        lanes[lane] = {
+            'depth': lane_depth.get(lane, 0),
+            'wait_seconds': {
+                'avg': sum(lane_waits) / len(lane_waits) if lane_waits else None,
+                'p95': _percentile(lane_waits, 95),
+            },
+        }
+
+    return {
+        'depth': counts.get('queued', 0),
+        'running': counts.get('running', 0),
+        'completed': counts.get('completed', 0),
+        'failed': counts.get('failed', 0),
+        'cancelled': counts.get('cancelled', 0),
+        'expired_leases': expired,
+        'oldest_queued_seconds': oldest_age,
+        'wait_seconds': {
+            'avg': sum(waits) / len(waits) if waits else None,
+            'p95': _percentile(waits, 95),
+        },
+        'run_seconds': {
+            'avg': sum(runs) / len(runs) if runs else None,
+            'p95': _percentile(runs, 95),
+        },
+        'lanes': lanes,
+        'sample_size': len(recent),
+    }
+
+
+# -----------------------
+# Worker processes
+# -----------------------
+
+def worker_loop(poll_interval: float, lease_seconds: int, max_attempts: int, stop_event=None, once: bool = False):
+    """Lease and process jobs until stop_event is set (requires an app context)."""
+    worker_id = worker_identity()
+    logger.info(f"Analysis worker {worker_id} started")
+
+    while stop_event is None or not stop_event.is_set():
+        try:
+            job = claim_next(worker_id, lease_seconds, max_attempts)
+        except Exception as e:
+            logger.error(f"Job claim failed: {e}", exc_info=True)
+            db.session.rollback()
+            job = None
+
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        process_job(job, lease_seconds)
+        db.session.remove()
+
+
+def _worker_main(poll_interval: float, events=None):
+    from app import app
+    from utils.analysis import warm_models
+
+    # Progress events go to the parent process, which serves the event streams
+    progress.set_sink(events)
+    with app.app_context():
+        warm_models()
+        worker_loop(poll_interval, app.config['JOB_LEASE_SECONDS'], app.config['JOB_MAX_ATTEMPTS'])
+
+
+class WorkerPool:
+    """
+    Fixed-size pool of analysis worker processes.
+    A supervisor thread restarts dead workers and requeues their jobs, and a
+    forwarder thread relays the workers' progress events to this process.
+    """
+
+    def __init__(self, app, num_workers: int, poll_interval: float, supervise_interval: float = 5.0):
+        self.app = app
+        self.num_workers = max(1, int(num_workers))
+        self.poll_interval = poll_interval
+        self.supervise_interval = supervise_interval
+        self._ctx = multiprocessing.get_context('spawn')
+        self._events = self._ctx.Queue()
+        self._forwarder = progress.EventForwarder(self._events)
+        self._procs = []
+        self._stopping = threading.Event()
+        self._supervisor = None
+
+    def start(self):
+        with self.app.app_context():
+            recovered = requeue_orphaned(self.app.config['JOB_MAX_ATTEMPTS'])
+            if recovered:
+                logger.info(f"Recovered {recovered} jobs from crashed workers")
+
+        self._forwarder.start()
+        self._procs = [self._spawn() for _ in range(self.num_workers)]
+        self._supervisor = threading.Thread(target=self._supervise, name='analysis-supervisor', daemon=True)
+        self._supervisor.start()
+        logger.info(f"Started {self.num_workers} analysis workers")
+
+    def _spawn(self):
+        proc = self._ctx.Process(target=_worker_main, args=(self.poll_interval, self._events), daemon=True)
+        proc.start()
+        return proc
+
+    def _supervise(self):
+        while not self._stopping.wait(self.supervise_interval):
+            dead = [i for i, p in enumerate(self._procs) if not p.is_alive()]
+            if not dead:
+                continue
+
+            logger.warning(f"{len(dead)} analysis worker(s) exited; restarting")
+            try:
+                with self.app.app_context():
+                    requeue_orphaned(self.app.config['JOB_MAX_ATTEMPTS'])
+            except Exception as e:
+                logger.error(f"Job recovery failed: {e}", exc_info=True)
+
+            for i in dead:
+                self._procs[i] = self._spawn()
+
+    def stop(self):
+        self._stopping.set()
+        for proc in self._procs:
+            if proc.is_alive():
+                proc.terminate()
+        for proc in self._procs:
+            proc.join(timeout=5)
+        self._forwarder.done.set()
+
+
+def start_worker_pool(app):
+    pool = WorkerPool(app, app.config['ANALYSIS_WORKERS'], app.config['JOB_POLL_INTERVAL'])
+    pool.start()
+    app.extensions['analysis_workers'] = pool
+    return pool
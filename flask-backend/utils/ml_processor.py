@@ -11,9 +11,20 @@ import google.generativeai as genai
 import json
 import numpy as np
 import re
+from types import SimpleNamespace
+from ml.cancel import AnalysisCancelled
+from ml.preflight import estimated_savings_ms, run_preflight
+from ml.frame_pipeline import PoseROI
+from ml.landmarks import LandmarkTrack, detect_side, select_motion_window
+from ml import static_pose
 
 logger = logging.getLogger(__name__)
 
+# Feature layout of the side-view models: the visible side's joints plus the midline
+SIDE_ANGLES = ['elbow_angle', 'shoulder_angle', 'hip_angle', 'knee_angle', 'ankle_angle']
+SIDE_FEATURE_COLUMNS = SIDE_ANGLES + ['back_angle', 'neck_angle']
+MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'exercise_model.pkl')
+
 class MLProcessor:
     def __init__(self):
         self.mp_pose = mp.solutions.pose
@@ -29,10 +40,9 @@ class MLProcessor:
     
     def _load_model(self):
         """Load the bundled exercise model (type + form)."""
-        model_path = os.path.join(os.path.dirname(__file__), 'models', 'exercise_model.pkl')
         try:
-            if os.path.exists(model_path):
-                return joblib.load(model_path)
+            if os.path.exists(MODEL_PATH):
+                return joblib.load(MODEL_PATH)
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}")
             # return self._create_dummy_model()
@@ -143,6 +153,11 @@ class MLProcessor:
             return np.zeros(20)
     
     
+    @staticmethod
+    def _as_landmark_list(landmarks):
+        """(33, 4) array -> objects with x/y/z/visibility, like MediaPipe's landmark list."""
+        return [SimpleNamespace(x=x, y=y, z=z, visibility=v) for x, y, z, v in landmarks.tolist()]
+
     def _get_point(self, landmarks, name):
         return [
             landmarks[self.mp_pose.PoseLandmark[name].value].x,
@@ -270,6 +285,29 @@ class MLProcessor:
         ]
         return row, angles
 
+    def _extract_side_row(self, landmarks, side):
+        """Features of one side only (SIDE_FEATURE_COLUMNS); side is 'left' or 'right'."""
+        def gp(n):
+            return self._get_point(landmarks, f"{side.upper()}_{n}")
+
+        shoulder, elbow, wrist = gp('SHOULDER'), gp('ELBOW'), gp('WRIST')
+        hip, knee, ankle, foot = gp('HIP'), gp('KNEE'), gp('ANKLE'), gp('FOOT_INDEX')
+        nose = self._get_point(landmarks, 'NOSE')
+
+        angles = [
+            self._angle_between(shoulder, elbow, wrist),
+            self._angle_between(elbow, shoulder, hip),
+            self._angle_between(shoulder, hip, knee),
+            self._angle_between(hip, knee, ankle),
+            self._angle_between(knee, ankle, foot),
+        ]
+        row = dict(zip(SIDE_ANGLES, angles))
+        # Seen from the side both shoulders and hips overlap, so the visible
+        # ones stand in for the midpoints
+        row['back_angle'] = self._angle_to_vertical(shoulder, hip)
+        row['neck_angle'] = self._angle_to_vertical(shoulder, nose)
+        return row, angles
+
     def _bad_reason(self, exc_type: str, row: dict):
         if exc_type == 'pushup':
             if row['back_angle'] > 25:
@@ -344,65 +382,136 @@ class MLProcessor:
 
         return self._evenly_spaced_indices(start_frame, end_frame, desired)
 
-    def process_video(self, video_path):
-        """Extract per-frame features (12 frames) matching training pipeline.
+    def extract_track(self, video_path, progress_callback=None, cancel_token=None, roi=False, preflight=True):
+        """Pose the 12 frames of the most active 5 s window (sparse LandmarkTrack).
 
-        Returns:
-        - X: (num_frames, num_features)
-        - angle_names: list of 10 labels
-        - angle_matrix: (num_frames, 10)
-        - phases: list of str length num_frames
+        progress_callback, if given, is called as (stage, fraction).
+        cancel_token, if given, is checked between frames (raises AnalysisCancelled).
+        roi runs pose on a crop around the previous frame's landmarks (see PoseROI).
+        With preflight, a few frames are posed first and an empty track comes
+        back if nobody is in the video.
         """
+        if progress_callback:
+            progress_callback('decoding', 0.0)
+        if preflight:
+            check = run_preflight(video_path)
+            if check['verdict'] != 'ok':
+                return LandmarkTrack.empty(check, dense=False)
+        else:
+            check = {'verdict': 'ok'}
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("Could not open video")
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        desired = 12
+        fps = float(cap.get(cv2.CAP_PROP_FPS))
+        indices = self._select_motion_window_indices(cap, total_frames, fps, window_seconds=5.0, desired=desired)
+        if progress_callback:
+            progress_callback('decoding', 1.0)
+
+        landmarks_list = []
+        frame_indices = []
+        pose_roi = PoseROI() if roi else None
         try:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise ValueError("Could not open video")
-
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            desired = 12
-            fps = float(cap.get(cv2.CAP_PROP_FPS))
-            indices = self._select_motion_window_indices(cap, total_frames, fps, window_seconds=5.0, desired=desired)
-
-            feature_rows = []
-            angle_rows = []
-            phases = []
-
             for i, idx in enumerate(indices):
+                if cancel_token is not None and cancel_token.is_cancelled():
+                    raise AnalysisCancelled(cancel_token.reason)
+                if progress_callback:
+                    progress_callback('pose', i / len(indices))
                 cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
                 ret, frame = cap.read()
                 if not ret or frame is None:
                     continue
                 frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = self.pose.process(frame_rgb)
-                if not results.pose_landmarks:
+                if pose_roi is not None:
+                    landmarks = pose_roi.process(self.pose, frame_rgb)
+                else:
+                    results = self.pose.process(frame_rgb)
+                    landmarks = np.array([
+                        [lm.x, lm.y, lm.z, lm.visibility] for lm in results.pose_landmarks.landmark
+                    ]) if results.pose_landmarks else None
+                if landmarks is None:
                     continue
-                row, angles = self._extract_row(results.pose_landmarks.landmark)
-                feature_rows.append(row)
-                angle_rows.append(angles)
-                phases.append(self._phase_from_index(i, len(indices)))
-
+                landmarks_list.append(landmarks)
+                frame_indices.append(int(idx))
+        finally:
             cap.release()
 
-            if not feature_rows:
-                return np.zeros((0, 0)), [], np.zeros((0, 10)), []
-
-            ordered_cols = [
-                'right_elbow_angle', 'left_elbow_angle',
-                'right_shoulder_angle', 'left_shoulder_angle',
-                'right_hip_angle', 'left_hip_angle',
-                'right_knee_angle', 'left_knee_angle',
-                'right_ankle_angle', 'left_ankle_angle',
-                'back_angle', 'neck_angle',
-                'symmetry_diff', 'stance_width',
-            ]
-            X = np.array([[row[c] for c in ordered_cols] for row in feature_rows], dtype=float)
-            angle_matrix = np.array(angle_rows, dtype=float)
-            angle_names = [
-                "Right Elbow", "Left Elbow", "Right Shoulder", "Left Shoulder",
-                "Right Hip", "Left Hip", "Right Knee", "Left Knee",
-                "Right Ankle", "Left Ankle",
-            ]
-            return X, angle_names, angle_matrix, phases
+        return LandmarkTrack(
+            landmarks=np.array(landmarks_list) if landmarks_list else np.zeros((0, 33, 4)),
+            frame_indices=frame_indices,
+            fps=fps or 30.0,
+            total_frames=total_frames,
+            dense=False,
+            preflight=check,
+        )
+
+    def track_features(self, track, side=None):
+        """Per-frame features (12 frames) matching training pipeline.
+
+        A dense track is first narrowed to 12 frames of its most active 5 s.
+        With side ('left' or 'right') only that side's joints and the
+        midline are computed (SIDE_FEATURE_COLUMNS, for the side models).
+
+        Returns:
+        - X: (num_frames, num_features)
+        - angle_names: list of 10 labels (5 with side)
+        - angle_matrix: (num_frames, 10) ((num_frames, 5) with side)
+        - phases: list of str length num_frames
+        """
+        if not len(track.landmarks):
+            return np.zeros((0, 0)), [], np.zeros((0, 10)), []
+        chosen = select_motion_window(track) if track.dense else np.arange(len(track.landmarks))
+
+        feature_rows = []
+        angle_rows = []
+        phases = []
+        for i, k in enumerate(chosen):
+            landmarks = self._as_landmark_list(track.landmarks[k])
+            if side:
+                row, angles = self._extract_side_row(landmarks, side)
+            else:
+                row, angles = self._extract_row(landmarks)
+            feature_rows.append(row)
+            angle_rows.append(angles)
+            phases.append(self._phase_from_index(i, len(chosen)))
+
+        if side:
+            X = np.array([[row[c] for c in SIDE_FEATURE_COLUMNS] for row in feature_rows], dtype=float)
+            angle_names = [f"{side.title()} {joint}" for joint in ("Elbow", "Shoulder", "Hip", "Knee", "Ankle")]
+            return X, angle_names, np.array(angle_rows, dtype=float), phases
+
+        ordered_cols = [
+            'right_elbow_angle', 'left_elbow_angle',
+            'right_shoulder_angle', 'left_shoulder_angle',
+            'right_hip_angle', 'left_hip_angle',
+            'right_knee_angle', 'left_knee_angle',
+            'right_ankle_angle', 'left_ankle_angle',
+            'back_angle', 'neck_angle',
+            'symmetry_diff', 'stance_width',
+        ]
+        X = np.array([[row[c] for c in ordered_cols] for row in feature_rows], dtype=float)
+        angle_matrix = np.array(angle_rows, dtype=float)
+        angle_names = [
+            "Right Elbow", "Left Elbow", "Right Shoulder", "Left Shoulder",
+            "Right Hip", "Left Hip", "Right Knee", "Left Knee",
+            "Right Ankle", "Left Ankle",
+        ]
+        return X, angle_names, angle_matrix, phases
+
+    def process_video(self, video_path, progress_callback=None, cancel_token=None, roi=False):
+        """Extract per-frame features (12 frames) matching training pipeline.
+
+        See extract_track and track_features.
+        """
+        try:
+            track = self.extract_track(video_path, progress_callback=progress_callback,
+                                       cancel_token=cancel_token, roi=roi, preflight=False)
+            return self.track_features(track)
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             logger.error(f"Video processing error: {str(e)}")
             return np.zeros((0, 0)), [], np.zeros((0, 10)), []
@@ -549,33 +658,69 @@ class MLProcessor:
             }
 
 
-    def process_file(self, file_path, file_type, exercise_type):
-        """Analyze a video with the new model bundle and return results."""
+    def process_file(self, file_path, file_type, exercise_type, progress_callback=None, cancel_token=None,
+                     roi=False):
+        """Analyze a video (or a photo, as a one-frame track) with the new model bundle and return results."""
+        logger.info(f"Processing {file_type} file: {file_path}")
         try:
-            logger.info(f"Processing {file_type} file: {file_path}")
-
             if file_type != 'video':
-                return {
-                    'accuracy': 0.0,
-                    'form_status': 'Error',
-                    'corrections': {},
-                    'feedback': 'Only video inputs are supported for analysis.',
-                    'prediction': 0,
-                    'exercise_type': exercise_type
-                }
+                image = static_pose.read_image(file_path)
+                if image is None:
+                    return self.error_result(exercise_type, 'Could not read the photo.')
+                track = static_pose.image_track(image, static_pose.get_pool())
+                if not track.usable:
+                    return self.error_result(exercise_type, f"{track.error} Make sure your whole body is in frame.")
+            else:
+                track = self.extract_track(file_path, progress_callback=progress_callback,
+                                           cancel_token=cancel_token, roi=roi)
+        except AnalysisCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"File processing error: {str(e)}")
+            return self.error_result(exercise_type, 'Unable to analyze the file. Please try again later.')
+        return self.score_track(track, exercise_type, progress_callback=progress_callback)
+
+    def error_result(self, exercise_type, feedback):
+        return {
+            'accuracy': 0.0,
+            'form_status': 'Error',
+            'corrections': {},
+            'feedback': feedback,
+            'prediction': 0,
+            'exercise_type': exercise_type
+        }
 
-            X, angle_names, angle_matrix, phases = self.process_video(file_path)
-            if X.size == 0:
-                return {
-                    'accuracy': 0.0,
-                    'form_status': 'Error',
-                    'corrections': {},
-                    'feedback': 'Could not extract pose from video.',
-                    'prediction': 0,
-                    'exercise_type': exercise_type
-                }
+    def score_track(self, track, exercise_type, progress_callback=None, side_aware=False):
+        """Score a LandmarkTrack (sparse from extract_track, or a shared dense one).
+
+        With side_aware, a video filmed from one side is scored from that
+        side's features by the side models, if the bundle has them.
+        """
+        try:
+            # Pre-flight exit: nobody (or nobody visible) in the video
+            preflight = track.preflight
+            if preflight.get('verdict', 'ok') != 'ok':
+                fps = preflight.get('fps') or 30.0
+                coarse_frames = preflight['total_frames'] / max(1, int(round(fps)))
+                saved_ms = estimated_savings_ms(preflight, 12, coarse_frames + 12)
+                logger.info(f"Pre-flight exit ({preflight['verdict']}), saved ~{saved_ms:.0f} ms of CPU")
+                result = self.error_result(
+                    exercise_type,
+                    'No person was detected in the video. Make sure your whole body is in frame.'
+                    if preflight['verdict'] == 'no_person'
+                    else 'Pose detection confidence is low. Please record in better light with your whole body in frame.'
+                )
+                result['preflight'] = {**preflight, 'cpu_saved_ms': saved_ms}
+                return result
 
             bundle = self.model
+            side = None
+            if side_aware and bundle and 'side_form_model' in bundle:
+                side = detect_side(track.landmarks)
+            X, angle_names, angle_matrix, phases = self.track_features(track, side=side)
+            if X.size == 0:
+                return self.error_result(exercise_type, 'Could not extract pose from video.')
+
             if not bundle:
                 return {
                     'accuracy': 0.0,
@@ -586,17 +731,19 @@ class MLProcessor:
                     'exercise_type': exercise_type
                 }
 
+            if progress_callback:
+                progress_callback('scoring', 0.0)
             phase_map = bundle.get('phase_mapping', {'start': 0, 'mid': 1, 'end': 2})
             phase_idx = np.array([phase_map.get(p, 1) for p in phases], dtype=int).reshape(-1, 1)
             X_full = np.hstack([X, phase_idx])
 
-            type_model = bundle['type_model']
+            type_model = bundle['side_type_model' if side else 'type_model']
             type_proba = type_model.predict_proba(X_full)
             avg_type_proba = type_proba.mean(axis=0)
             type_idx = int(np.argmax(avg_type_proba))
             predicted_ex_type = str(type_model.classes_[type_idx])
 
-            form_model = bundle['form_model']
+            form_model = bundle['side_form_model' if side else 'form_model']
             form_proba = form_model.predict_proba(X_full)
             avg_form_proba = form_proba.mean(axis=0)
             form_idx = int(np.argmax(avg_form_proba))
@@ -608,15 +755,21 @@ class MLProcessor:
             if predicted_form == 'bad':
                 reasons = []
                 for row in X:
-                    row_dict = {
-                        'right_elbow_angle': row[0], 'left_elbow_angle': row[1],
-                        'right_shoulder_angle': row[2], 'left_shoulder_angle': row[3],
-                        'right_hip_angle': row[4], 'left_hip_angle': row[5],
-                        'right_knee_angle': row[6], 'left_knee_angle': row[7],
-                        'right_ankle_angle': row[8], 'left_ankle_angle': row[9],
-                        'back_angle': row[10], 'neck_angle': row[11],
-                        'symmetry_diff': row[12], 'stance_width': row[13],
-                    }
+                    if side:
+                        # The visible side stands in for both
+                        row_dict = {f'{s}_{name}': row[i] for s in ('left', 'right')
+                                    for i, name in enumerate(SIDE_ANGLES)}
+                        row_dict.update(back_angle=row[5], neck_angle=row[6])
+                    else:
+                        row_dict = {
+                            'right_elbow_angle': row[0], 'left_elbow_angle': row[1],
+                            'right_shoulder_angle': row[2], 'left_shoulder_angle': row[3],
+                            'right_hip_angle': row[4], 'left_hip_angle': row[5],
+                            'right_knee_angle': row[6], 'left_knee_angle': row[7],
+                            'right_ankle_angle': row[8], 'left_ankle_angle': row[9],
+                            'back_angle': row[10], 'neck_angle': row[11],
+                            'symmetry_diff': row[12], 'stance_width': row[13],
+                        }
                     reasons.append(self._bad_reason(predicted_ex_type, row_dict))
                 reasons = [r for r in reasons if r and r != 'None']
                 if reasons:
@@ -627,6 +780,8 @@ class MLProcessor:
                 for i, name in enumerate(angle_names)
             }
 
+            if progress_callback:
+                progress_callback('feedback', 0.0)
             gemini_feedback = self.get_gemini_feedback(predicted_ex_type, confidence, all_angles_dict)
             corrections = gemini_feedback.get('corrections', {})
             if isinstance(corrections, list):
@@ -649,11 +804,14 @@ class MLProcessor:
                 'feedback': gemini_feedback.get('summary', 'Analysis completed.'),
                 'prediction': 1 if predicted_form == 'good' else 0,
                 'exercise_type': predicted_ex_type,
+                'camera_side': side,
             }
 
             logger.info(f"Processing complete. Type: {predicted_ex_type}, Form: {predicted_form}, Accuracy: {confidence:.2f}%")
             return result
 
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             logger.error(f"File processing error: {str(e)}")
             return {
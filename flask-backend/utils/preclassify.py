@@ -0,0 +1,163 @@
+"""
+Quick exercise pre-classification of an upload.
+
+Poses a handful of evenly spaced frames with the static-image Pose and runs
+the exercise type model on their features, so a clip recorded for another
+exercise is caught (or routed to the right evaluator) in a few hundred
+milliseconds, before the full analysis decodes the whole video. Without a
+model bundle (utils/models/exercise_model.pkl) the check falls back to
+requiring the exercise name in the filename, as uploads did before.
+"""
+
+import os
+import re
+import time
+import logging
+
+import cv2
+import numpy as np
+
+from ml.static_pose import get_pool
+
+logger = logging.getLogger(__name__)
+
+PRECLASSIFY_FRAMES = 5
+
+_processor = None
+
+
+def _get_processor():
+    """MLProcessor for its feature extraction and model bundle, created once per process."""
+    global _processor
+    if _processor is None:
+        from utils.ml_processor import MLProcessor
+        _processor = MLProcessor()
+    return _processor
+
+
+def normalize_exercise(name):
+    return re.sub(r'[\s_\-]', '', (name or '').lower())
+
+
+def warn_if_inert(mode):
+    """Log at startup when the pre-classifier has no model to run."""
+    from utils.ml_processor import MODEL_PATH
+
+    if mode in ('reject', 'correct') and not os.path.exists(MODEL_PATH):
+        logger.warning(f"No exercise model at {MODEL_PATH}: exercise checks fall back to the filename")
+
+
+def _sample_frames(file_path, file_type, num_frames):
+    """RGB frames evenly spaced over the clip, skipping its first and last frames."""
+    if file_type != 'video':
+        image = cv2.imread(file_path)
+        return [cv2.cvtColor(image, cv2.COLOR_BGR2RGB)] if image is not None else []
+
+    cap = cv2.VideoCapture(file_path)
+    try:
+        if not cap.isOpened():
+            return []
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames <= 0:
+            return []
+        frames = []
+        positions = np.linspace(0, total_frames - 1, num=num_frames + 2)[1:-1]
+        for idx in sorted({int(round(p)) for p in positions}):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            ret, frame = cap.read()
+            if ret and frame is not None:
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        return frames
+    finally:
+        cap.release()
+
+
+def classify(file_path, file_type='video', num_frames=PRECLASSIFY_FRAMES):
+    """
+    Predict the exercise performed in an uploaded file.
+
+    Returns:
+        Dict with 'exercise' (a type model class, e.g. 'pushup'),
+        'confidence' (0-1, mean class probability over the posed frames),
+        'probabilities', 'frames' and 'elapsed_ms'; None if no person was
+        found or no type model is available
+    """
+    started = time.perf_counter()
+    processor = _get_processor()
+    bundle = processor.model
+    if not bundle:
+        return None
+    type_model = bundle.get('quick_type_model') or bundle['type_model']
+
+    frames = _sample_frames(file_path, file_type, num_frames)
+    rows = []
+    pool = get_pool()
+    for frame in frames:
+        with pool.acquire() as pose:
+            results = pose.process(frame)
+        if results.pose_landmarks:
+            row, _ = processor._extract_row(results.pose_landmarks.landmark)
+            rows.append(row)
+    if not rows:
+        return None
+
+    phase_map = bundle.get('phase_mapping', {'start': 0, 'mid': 1, 'end': 2})
+    X = np.array([
+        [row[c] for c in bundle['feature_columns'][:-1]] + [phase_map.get(processor._phase_from_index(i, len(rows)), 1)]
+        for i, row in enumerate(rows)
+    ], dtype=float)
+    proba = type_model.predict_proba(X).mean(axis=0)
+    best = int(np.argmax(proba))
+
+    result = {
+        'exercise': str(type_model.classes_[best]),
+        'confidence': float(proba[best]),
+        'probabilities': {str(c): round(float(p), 3) for c, p in zip(type_model.classes_, proba)},
+        'frames': len(rows),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000.0, 1),
+    }
+    logger.info(f"Pre-classified {file_path} as {result['exercise']} ({result['confidence']:.2f}) "
+                f"from {len(rows)} frames in {result['elapsed_ms']:.0f} ms")
+    return result
+
+
+def check_exercise(exercise_type, file_path, file_type, mode, min_confidence):
+    """
+    Compare the selected exercise with the pre-classifier's prediction.
+
+    mode is 'reject' (refuse a confident mismatch), 'correct' (analyse as
+    the predicted exercise instead) or 'off'.
+
+    Returns:
+        (exercise_type to analyse, check dict for the response or None,
+        True if the upload should be rejected)
+    """
+    if mode not in ('reject', 'correct'):
+        return exercise_type, None, False
+    if not _get_processor().model:
+        # Nothing to predict with, so nothing to correct to either
+        if normalize_exercise(exercise_type) in normalize_exercise(os.path.basename(file_path)):
+            return exercise_type, None, False
+        return exercise_type, {'selected': exercise_type, 'predicted': None, 'method': 'filename'}, True
+    try:
+        prediction = classify(file_path, file_type)
+    except Exception as e:
+        logger.warning(f"Pre-classification of {file_path} failed: {e}")
+        prediction = None
+    if prediction is None:
+        # Nothing to go on: the full analysis reports missing people itself
+        return exercise_type, None, False
+
+    check = {
+        'selected': exercise_type,
+        'predicted': prediction['exercise'],
+        'confidence': round(prediction['confidence'], 3),
+        'elapsed_ms': prediction['elapsed_ms'],
+    }
+    if normalize_exercise(prediction['exercise']) == normalize_exercise(exercise_type) \
+            or prediction['confidence'] < min_confidence:
+        return exercise_type, check, False
+    if mode == 'reject':
+        return exercise_type, check, True
+    check['corrected'] = True
+    return prediction['exercise'], check, False
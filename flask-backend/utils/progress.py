@@ -0,0 +1,155 @@
+"""
+In-process pub/sub for analysis progress.
+
+Analyses report stage transitions (decoding, pose, scoring, feedback),
+frame-level percentages and provisional scores through callbacks. Events are published
+to a broker that Server-Sent Events streams subscribe to. Analyses running
+in pool worker processes cannot reach the web process' broker directly, so
+each worker forwards its events over a multiprocessing queue that a thread
+in the parent drains into the broker.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Share of overall progress (percent) covered by each analysis stage
+STAGE_SPANS = {
+    'decoding': (0.0, 5.0),
+    'pose': (5.0, 85.0),
+    'scoring': (85.0, 95.0),
+    'feedback': (95.0, 100.0),
+}
+TERMINAL_EVENTS = ('result', 'failed', 'cancelled')
+
+# Events kept per upload for late subscribers, and how long they are kept
+# after the analysis finished
+HISTORY_TTL_SECONDS = 300
+# A running analysis refreshes its entry with every event; one that has been
+# silent this long died without a terminal event (e.g. a killed worker)
+STALE_PROGRESS_TTL_SECONDS = 3600
+
+
+class ProgressBroker:
+    """Fan out progress events to the subscribers of each upload."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # upload_id -> set of queue.Queue
+        self._latest = {}       # upload_id -> (monotonic time, last event)
+
+    def subscribe(self, upload_id: int) -> queue.Queue:
+        """Register a subscriber; it first receives the latest known event."""
+        q = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(upload_id, set()).add(q)
+            latest = self._latest.get(upload_id)
+        if latest is not None:
+            q.put(latest[1])
+        return q
+
+    def unsubscribe(self, upload_id: int, q: queue.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(upload_id)
+            if subscribers is None:
+                return
+            subscribers.discard(q)
+            if not subscribers:
+                del self._subscribers[upload_id]
+
+    def publish(self, upload_id: int, event: dict):
+        now = time.monotonic()
+        with self._lock:
+            self._latest[upload_id] = (now, event)
+            subscribers = list(self._subscribers.get(upload_id, ()))
+            self._expire(now)
+        for q in subscribers:
+            q.put(event)
+
+    def _expire(self, now: float):
+        stale = [
+            upload_id for upload_id, (at, event) in self._latest.items()
+            if now - at > (HISTORY_TTL_SECONDS if event.get('type') in TERMINAL_EVENTS
+                           else STALE_PROGRESS_TTL_SECONDS)
+        ]
+        for upload_id in stale:
+            del self._latest[upload_id]
+
+
+broker = ProgressBroker()
+
+# Set in pool worker processes: events go to the parent instead of the local broker
+_sink = None
+
+
+def set_sink(sink):
+    global _sink
+    _sink = sink
+
+
+def publish(upload_id: int, event: dict):
+    if _sink is not None:
+        try:
+            _sink.put_nowait((upload_id, event))
+        except Exception as e:
+            # Progress is best effort; never fail an analysis over it
+            logger.debug(f"Dropping progress event for upload {upload_id}: {e}")
+        return
+    broker.publish(upload_id, event)
+
+
+def reporter(upload_id: int, min_step: float = 1.0):
+    """Build a progress_callback(stage, fraction=None, **extra) for one upload.
+
+    `fraction` is how far along the stage is (0-1); it is mapped onto the
+    stage's share of overall progress and only published when the overall
+    percentage advances by at least min_step, so per-frame calls stay cheap.
+    """
+    state = {'stage': None, 'percent': -min_step}
+
+    def progress_callback(stage: str, fraction: float = None, **extra):
+        current = max(0.0, state['percent'])
+        start, end = STAGE_SPANS.get(stage, (current, current))
+        percent = start + (end - start) * max(0.0, min(1.0, fraction or 0.0))
+        if stage == state['stage'] and percent - state['percent'] < min_step:
+            return
+        state['stage'] = stage
+        state['percent'] = percent
+        event = {'type': 'progress', 'stage': stage, 'percent': round(percent, 1)}
+        event.update(extra)
+        publish(upload_id, event)
+
+    return progress_callback
+
+
+def previewer(upload_id: int):
+    """Build a preview_callback(dict) that publishes provisional results."""
+
+    def preview_callback(preview: dict):
+        event = {'type': 'preview'}
+        event.update(preview)
+        publish(upload_id, event)
+
+    return preview_callback
+
+
+class EventForwarder(threading.Thread):
+    """Drains events sent by worker processes into this process' broker."""
+
+    def __init__(self, events):
+        super().__init__(name='progress-forwarder', daemon=True)
+        self.events = events
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.is_set():
+            try:
+                upload_id, event = self.events.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            broker.publish(upload_id, event)
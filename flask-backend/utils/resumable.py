@@ -0,0 +1,236 @@
+"""
+Resumable (chunked) uploads.
+
+A client creates an UploadSession, PUTs byte ranges that are written into a
+staging file at their offset, asks for the current offset after a dropped
+connection and finalizes once every byte has arrived. The finalized file is
+then registered exactly like a single-request upload.
+"""
+
+import os
+import re
+import time
+import uuid
+import logging
+from datetime import datetime, timedelta
+
+from models import UploadSession, db
+from utils.ingest import SNIFF_BYTES, RejectedUpload, expected_kind, hash_file, sniff_container
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIRNAME = '.staging'
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+_last_cleanup = 0.0
+
+
+class OffsetMismatch(Exception):
+    """Chunk does not start at the session's current offset."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Chunk must start at offset {expected}")
+        self.expected = expected
+
+
+class ChunkOutOfRange(Exception):
+    """Chunk would write past the declared upload size."""
+
+
+class SessionClosed(Exception):
+    """Session expired or was closed before this request could use it."""
+
+
+def staging_dir(upload_folder: str) -> str:
+    return os.path.join(upload_folder, STAGING_DIRNAME)
+
+
+def parse_content_range(header):
+    """Parse 'bytes <start>-<end>/<total>' into (start, end, total or None)."""
+    match = CONTENT_RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    start, end, total = match.groups()
+    return int(start), int(end), None if total == '*' else int(total)
+
+
+def create_session(user_id: int, file_name: str, exercise_type: str, total_size: int,
+                   upload_folder: str, ttl_seconds: int) -> UploadSession:
+    folder = staging_dir(upload_folder)
+    os.makedirs(folder, exist_ok=True)
+
+    session_id = uuid.uuid4().hex
+    path = os.path.join(folder, f"{session_id}.part")
+    open(path, 'wb').close()
+
+    session = UploadSession(
+        id=session_id,
+        user_id=user_id,
+        file_name=file_name,
+        exercise_type=exercise_type,
+        total_size=total_size,
+        received=0,
+        staging_path=path,
+        status='open',
+        expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds),
+    )
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def _remove_staging(path: str):
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        logger.warning(f"Failed to delete staging file {path}: {e}")
+
+
+def _discard(session, status: str):
+    _remove_staging(session.staging_path)
+    session.status = status
+    db.session.commit()
+
+
+def is_expired(session) -> bool:
+    return session.status == 'open' and session.expires_at < datetime.utcnow()
+
+
+def _hold(session, ttl_seconds: int):
+    """Push the session's expiry out before using its staging file.
+
+    Cleanup only takes sessions already past expires_at, so a request that
+    holds the session keeps its staging file until it is done.
+    """
+    now = datetime.utcnow()
+    held = UploadSession.query.filter(
+        UploadSession.id == session.id,
+        UploadSession.status == 'open',
+        UploadSession.expires_at >= now,
+    ).update({'expires_at': now + timedelta(seconds=ttl_seconds)}, synchronize_session=False)
+    db.session.commit()
+    db.session.refresh(session)
+    if not held:
+        raise SessionClosed()
+
+
+def write_chunk(session, start: int, stream, ttl_seconds: int, read_size: int = 64 * 1024) -> int:
+    """Write the request body at `start` in the staging file.
+
+    Returns:
+        The session's new offset
+    """
+    _hold(session, ttl_seconds)
+    if start != session.received:
+        raise OffsetMismatch(session.received)
+
+    remaining = session.total_size - start
+    written = 0
+    head = b''
+
+    # Writing at an explicit offset keeps a retried chunk idempotent
+    with open(session.staging_path, 'r+b') as fh:
+        fh.seek(start)
+        while True:
+            data = stream.read(read_size)
+            if not data:
+                break
+            if written + len(data) > remaining:
+                raise ChunkOutOfRange(f"Upload is limited to {session.total_size} bytes")
+
+            if start == 0 and len(head) < SNIFF_BYTES:
+                head = (head + data)[:SNIFF_BYTES]
+                if len(head) >= SNIFF_BYTES and sniff_container(head) != expected_kind(session.file_name):
+                    _discard(session, 'rejected')
+                    raise RejectedUpload()
+
+            fh.write(data)
+            written += len(data)
+
+    new_offset = start + written
+    advanced = UploadSession.query.filter_by(id=session.id, received=start, status='open').update({
+        'received': new_offset,
+        'expires_at': datetime.utcnow() + timedelta(seconds=ttl_seconds),
+    }, synchronize_session=False)
+    db.session.commit()
+
+    if not advanced:
+        # A concurrent retry of the same range got there first
+        db.session.refresh(session)
+        return session.received
+    return new_offset
+
+
+def finalize(session, dest_path: str, ttl_seconds: int):
+    """Move a fully received staging file into place.
+
+    Returns:
+        (file_size, sha256_hex)
+    """
+    _hold(session, ttl_seconds)
+    if session.received != session.total_size:
+        raise OffsetMismatch(session.received)
+
+    with open(session.staging_path, 'rb') as fh:
+        head = fh.read(SNIFF_BYTES)
+    if sniff_container(head) != expected_kind(session.file_name):
+        _discard(session, 'rejected')
+        raise RejectedUpload()
+
+    content_hash = hash_file(session.staging_path)
+    os.replace(session.staging_path, dest_path)
+    session.status = 'completed'
+    db.session.commit()
+    return session.total_size, content_hash
+
+
+def cleanup_expired(upload_folder: str, ttl_seconds: int) -> int:
+    """Delete staging files of abandoned sessions and stale ingest part files."""
+    now = datetime.utcnow()
+    expired = UploadSession.query.filter(
+        UploadSession.status == 'open',
+        UploadSession.expires_at < now,
+    ).all()
+    for session in expired:
+        # A chunk that started after the query has pushed expires_at out
+        taken = UploadSession.query.filter(
+            UploadSession.id == session.id,
+            UploadSession.status == 'open',
+            UploadSession.expires_at < now,
+        ).update({'status': 'expired'}, synchronize_session=False)
+        db.session.commit()
+        if taken:
+            logger.info(f"Expiring abandoned upload session {session.id} at {session.received}/{session.total_size} bytes")
+            _remove_staging(session.staging_path)
+
+    # Part files left behind by requests that died mid-stream
+    cutoff = time.time() - ttl_seconds
+    live = {os.path.basename(s.staging_path) for s in UploadSession.query.filter_by(status='open').all()}
+    for folder, prefix in ((upload_folder, '.ingest-'), (staging_dir(upload_folder), '')):
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            if not (name.startswith(prefix) and name.endswith('.part')) or name in live:
+                continue
+            path = os.path.join(folder, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    return len(expired)
+
+
+def maybe_cleanup(upload_folder: str, ttl_seconds: int, interval: float = 60.0):
+    """Run cleanup_expired at most once per interval in this process."""
+    global _last_cleanup
+    if time.time() - _last_cleanup < interval:
+        return
+    _last_cleanup = time.time()
+    try:
+        cleanup_expired(upload_folder, ttl_seconds)
+    except Exception as e:
+        logger.error(f"Upload session cleanup failed: {e}")
+        db.session.rollback()
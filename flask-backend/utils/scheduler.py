@@ -0,0 +1,94 @@
+"""
+Scheduling policy for analysis jobs.
+
+Jobs are picked by lane first ('interactive' jobs, whose owner is watching
+the Results page, before 'batch' ones), then by per-user fair share (the
+user with the fewest running jobs and the least recently consumed CPU time
+goes first), then shortest expected job first within that user. Jobs that
+have waited longer than the aging limit jump ahead so nothing starves.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+LANES = ('interactive', 'batch')
+
+# Rough CPU cost model, calibrated on a single core
+DECODE_SECONDS_PER_FRAME = 0.002
+POSE_SECONDS_PER_FRAME = 0.04
+PUSHUP_TARGET_FPS = 10  # HybridPushupEvaluator.extract_pose_from_video default
+MLPROCESSOR_POSE_FRAMES = 12  # MLProcessor.process_video samples this many frames
+DEFAULT_COST_SECONDS = 5.0
+
+
+def probe_video(path: str) -> dict:
+    """Read duration and frame count from the container headers without decoding."""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return {}
+        fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        return {
+            'fps': fps,
+            'frame_count': frame_count,
+            'duration': frame_count / fps if fps > 0 else 0.0,
+        }
+    finally:
+        cap.release()
+
+
+def estimate_cost(pushup: bool, probe: dict) -> float:
+    """Expected CPU-seconds to analyse a video with the given header info."""
+    frame_count = probe.get('frame_count') or 0
+    duration = probe.get('duration') or 0.0
+    if frame_count <= 0:
+        return DEFAULT_COST_SECONDS
+
+    if pushup:
+        # Decodes every frame, runs pose at ~10 fps
+        pose_frames = duration * PUSHUP_TARGET_FPS
+        return frame_count * DECODE_SECONDS_PER_FRAME + pose_frames * POSE_SECONDS_PER_FRAME
+
+    # Coarse motion scan at ~1 fps, then pose on a fixed number of frames
+    return duration * DECODE_SECONDS_PER_FRAME * 10 + MLPROCESSOR_POSE_FRAMES * POSE_SECONDS_PER_FRAME
+
+
+def pick_next(candidates, running_by_user: dict, service_by_user: dict, aging_seconds: float, now: datetime = None):
+    """Choose the next job to run from the claimable candidates.
+
+    Args:
+        candidates: claimable AnalysisJob rows
+        running_by_user: {user_id: number of jobs currently running}
+        service_by_user: {user_id: expected CPU-seconds started in the fairness window}
+        aging_seconds: wait after which a job is served before everything else
+
+    Returns:
+        The chosen job, or None if there are no candidates
+    """
+    if not candidates:
+        return None
+    now = now or datetime.utcnow()
+
+    def waited(job):
+        return (now - job.enqueued_at).total_seconds() if job.enqueued_at else 0.0
+
+    starving = [j for j in candidates if waited(j) >= aging_seconds]
+    if starving:
+        return max(starving, key=waited)
+
+    lane_rank = {lane: i for i, lane in enumerate(LANES)}
+    best_lane = min(lane_rank.get(j.lane, len(LANES)) for j in candidates)
+    in_lane = [j for j in candidates if lane_rank.get(j.lane, len(LANES)) == best_lane]
+
+    by_user = defaultdict(list)
+    for job in in_lane:
+        by_user[job.user_id].append(job)
+
+    user_id = min(by_user, key=lambda u: (running_by_user.get(u, 0), service_by_user.get(u, 0.0)))
+    return min(by_user[user_id], key=lambda j: (j.expected_cost or DEFAULT_COST_SECONDS, j.enqueued_at or now, j.id))
@@ -0,0 +1,132 @@
+"""
+Search over a user's past repetitions.
+
+Each completed analysis stores one RepEmbedding per repetition (the whole
+clip when no repetitions were segmented). Queries run against an
+in-memory RepIndex per (user, exercise), built from the database on first
+use and topped up with rows newer than the last one it saw; a full
+rebuild only happens when rows were deleted.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app
+
+from ml import dtw
+from ml.embeddings import RepIndex, rep_embedding
+from models import RepEmbedding, Upload, db
+
+logger = logging.getLogger(__name__)
+
+
+def rep_vectors(track, result):
+    """(rep_index, score, vector) for every repetition of an analysed track."""
+    if track is not None and 'rep_embeddings' in track.metadata:
+        # Streamed analysis: computed while the video decoded
+        return track.metadata['rep_embeddings']
+    if track is None or not track.usable:
+        return []
+    angles = dtw.joint_angles(track.landmarks)
+    reps = result.get('reps') or []
+    if not reps:
+        return [(0, float(result.get('form_score', 0.0)), rep_embedding(angles))]
+    return [(i, float(rep['score']), rep_embedding(angles[rep['start_frame']:rep['end_frame'] + 1]))
+            for i, rep in enumerate(reps)]
+
+
+def store_embeddings(upload, track, result):
+    """Replace the upload's stored embeddings; the caller commits."""
+    vectors = rep_vectors(track, result)
+    RepEmbedding.query.filter_by(upload_id=upload.id).delete(synchronize_session=False)
+    for rep_index, score, vector in vectors:
+        db.session.add(RepEmbedding(upload_id=upload.id, user_id=upload.user_id,
+                                    exercise_type=upload.exercise_type.lower(), rep_index=rep_index,
+                                    score=score, vector=vector.tobytes()))
+
+
+def copy_embeddings(source, upload):
+    """Give a deduplicated upload the embeddings of the analysis it reused; the caller commits."""
+    for row in RepEmbedding.query.filter_by(upload_id=source.id).all():
+        db.session.add(RepEmbedding(upload_id=upload.id, user_id=upload.user_id,
+                                    exercise_type=row.exercise_type, rep_index=row.rep_index,
+                                    score=row.score, vector=row.vector))
+
+
+def same_content(upload):
+    """Ids of the uploads sharing this upload's analysis: itself, the upload it
+    was deduplicated onto and the other copies of that one."""
+    source_id = upload.duplicate_of_id or upload.id
+    copies = db.session.query(Upload.id).filter(Upload.duplicate_of_id == source_id).all()
+    return {upload.id, source_id, *(upload_id for upload_id, in copies)}
+
+
+class SimilarityIndex:
+    """Per-(user, exercise) RepIndex objects, least recently used evicted."""
+
+    def __init__(self):
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _refresh(self, user_id, exercise_type):
+        key = (user_id, exercise_type)
+        index = self._indexes.get(key)
+        rows = RepEmbedding.query.filter_by(user_id=user_id, exercise_type=exercise_type)
+        if index is not None and rows.filter(RepEmbedding.id <= index.last_id).count() != len(index):
+            # Uploads were deleted since the index was built
+            index = None
+        if index is None:
+            index = RepIndex()
+            self._indexes[key] = index
+
+        new_rows = db.session.query(RepEmbedding.id, RepEmbedding.upload_id, RepEmbedding.rep_index,
+                                    RepEmbedding.score, RepEmbedding.vector)\
+            .filter(RepEmbedding.user_id == user_id, RepEmbedding.exercise_type == exercise_type,
+                    RepEmbedding.id > index.last_id)\
+            .order_by(RepEmbedding.id).all()
+        if new_rows:
+            ids, upload_ids, rep_indices, scores, vectors = zip(*new_rows)
+            index.add(np.frombuffer(b''.join(vectors), dtype=np.float32), upload_ids, rep_indices, scores,
+                      last_id=ids[-1])
+
+        self._indexes.move_to_end(key)
+        while len(self._indexes) > current_app.config['SIMILARITY_INDEX_USERS']:
+            self._indexes.popitem(last=False)
+        return index
+
+    def similar_reps(self, upload, rep_index, k=5):
+        """Past repetitions of the same user and exercise closest to one repetition of an upload."""
+        row = RepEmbedding.query.filter_by(upload_id=upload.id, rep_index=rep_index).first()
+        if row is None:
+            return None
+        with self._lock:
+            index = self._refresh(upload.user_id, row.exercise_type)
+            matches = index.nearest_reps(np.frombuffer(row.vector, dtype=np.float32), k=k,
+                                         exclude_uploads=same_content(upload))
+        return _with_uploads(matches)
+
+    def similar_sets(self, upload, k=5):
+        """Past uploads of the same user and exercise whose repetitions best match this upload's."""
+        rows = RepEmbedding.query.filter_by(upload_id=upload.id).order_by(RepEmbedding.rep_index).all()
+        if not rows:
+            return None
+        queries = np.stack([np.frombuffer(row.vector, dtype=np.float32) for row in rows])
+        with self._lock:
+            index = self._refresh(upload.user_id, rows[0].exercise_type)
+            matches = index.nearest_sets(queries, k=k, exclude_uploads=same_content(upload))
+        return _with_uploads(matches)
+
+
+def _with_uploads(matches):
+    """Attach the date and score of each matched upload."""
+    uploads = {u.id: u for u in Upload.query.filter(Upload.id.in_([m['upload_id'] for m in matches])).all()}
+    for match in matches:
+        upload = uploads.get(match['upload_id'])
+        match['created_at'] = upload.created_at.isoformat() if upload and upload.created_at else None
+        match['accuracy'] = float(upload.accuracy or 0.0) if upload else None
+    return matches
+
+
+index = SimilarityIndex()
@@ -17,12 +17,28 @@ FEATURE_COLUMNS = [
     # Phase will be numeric encoded below
 ]
 
+# Side-view layout (utils/ml_processor.py SIDE_FEATURE_COLUMNS): one side's
+# joints plus the midline
+SIDE_ANGLES = ['elbow_angle', 'shoulder_angle', 'hip_angle', 'knee_angle', 'ankle_angle']
+SIDE_FEATURE_COLUMNS = SIDE_ANGLES + ['back_angle', 'neck_angle']
+
 
 def _encode_phase(series):
     mapping = {'start': 0, 'mid': 1, 'end': 2}
     return series.map(mapping).fillna(1).astype(int), mapping
 
 
+def _side_rows(df):
+    """Every frame once per side, in the side-view layout."""
+    frames = []
+    for side in ('left', 'right'):
+        side_df = pd.DataFrame({name: df[f'{side}_{name}'] for name in SIDE_ANGLES})
+        for col in ('back_angle', 'neck_angle', 'phase_idx', 'exc_type', 'form'):
+            side_df[col] = df[col].values
+        frames.append(side_df)
+    return pd.concat(frames, ignore_index=True)
+
+
 def train_and_save(dataset_csv: str = None, model_out: str = None):
     here = os.path.dirname(__file__)
     if dataset_csv is None:
@@ -50,21 +66,44 @@ def train_and_save(dataset_csv: str = None, model_out: str = None):
 
     type_model = RandomForestClassifier(n_estimators=300, random_state=42)
     form_model = RandomForestClassifier(n_estimators=300, random_state=42)
+    # Small forest for the upload-time exercise check (utils/preclassify.py)
+    quick_type_model = RandomForestClassifier(n_estimators=40, max_depth=12, random_state=42)
 
     type_model.fit(X_train, y_type_train)
     form_model.fit(X_train, y_form_train)
+    quick_type_model.fit(X_train, y_type_train)
 
     type_acc = accuracy_score(y_type_test, type_model.predict(X_test))
     form_acc = accuracy_score(y_form_test, form_model.predict(X_test))
+    quick_type_acc = accuracy_score(y_type_test, quick_type_model.predict(X_test))
+
+    # Side-view variant, split on the same frames so both sides of a test
+    # frame stay out of training
+    side_train, side_test = _side_rows(df.loc[X_train.index]), _side_rows(df.loc[X_test.index])
+    X_side_train = side_train[SIDE_FEATURE_COLUMNS + ['phase_idx']].fillna(0.0)
+    X_side_test = side_test[SIDE_FEATURE_COLUMNS + ['phase_idx']].fillna(0.0)
+    side_type_model = RandomForestClassifier(n_estimators=300, random_state=42)
+    side_form_model = RandomForestClassifier(n_estimators=300, random_state=42)
+    side_type_model.fit(X_side_train, side_train['exc_type'])
+    side_form_model.fit(X_side_train, side_train['form'])
+    side_type_acc = accuracy_score(side_test['exc_type'], side_type_model.predict(X_side_test))
+    side_form_acc = accuracy_score(side_test['form'], side_form_model.predict(X_side_test))
 
     os.makedirs(os.path.dirname(model_out), exist_ok=True)
     bundle = {
         'type_model': type_model,
         'form_model': form_model,
+        'quick_type_model': quick_type_model,
+        'side_type_model': side_type_model,
+        'side_form_model': side_form_model,
         'feature_columns': FEATURE_COLUMNS + ['phase_idx'],
+        'side_feature_columns': SIDE_FEATURE_COLUMNS + ['phase_idx'],
         'phase_mapping': phase_mapping,
         'type_accuracy': float(type_acc),
         'form_accuracy': float(form_acc),
+        'quick_type_accuracy': float(quick_type_acc),
+        'side_type_accuracy': float(side_type_acc),
+        'side_form_accuracy': float(side_form_acc),
     }
     joblib.dump(bundle, model_out)
     return model_out, type_acc, form_acc
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Standalone analysis worker.
+
+Runs on any machine that can reach the application database and the shared
+upload volume, leases queued analysis jobs and writes results back:
+
+    python -m worker --concurrency 4
+
+Set ANALYSIS_WORKERS=0 on the web tier to leave all analysis to these nodes;
+one of them must then be running or uploads stay pending. Their progress
+events do not reach the web process, so event streams fall back to polling
+the upload's status every SSE_POLL_SECONDS.
+"""
+
+import argparse
+import logging
+import signal
+import threading
+
+from app import app
+from utils.job_queue import WorkerPool, requeue_orphaned, worker_loop
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SkillSync analysis worker')
+    parser.add_argument('--concurrency', type=int, default=1, help='number of worker processes on this node')
+    parser.add_argument('--poll-interval', type=float, default=None, help='seconds to sleep when the queue is empty')
+    parser.add_argument('--once', action='store_true', help='drain the queue and exit (single process only)')
+    args = parser.parse_args()
+
+    poll_interval = args.poll_interval or app.config['JOB_POLL_INTERVAL']
+    lease_seconds = app.config['JOB_LEASE_SECONDS']
+    max_attempts = app.config['JOB_MAX_ATTEMPTS']
+
+    stop_event = threading.Event()
+
+    def _shutdown(signum, frame):
+        logger.info("Shutdown requested; finishing current job")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    if args.concurrency <= 1 or args.once:
+        with app.app_context():
+            requeue_orphaned(max_attempts)
+            worker_loop(poll_interval, lease_seconds, max_attempts, stop_event=stop_event, once=args.once)
+        return
+
+    pool = WorkerPool(app, args.concurrency, poll_interval)
+    pool.start()
+    stop_event.wait()
+    pool.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,17 @@ import { Link } from "react-router-dom"
 import { useAuth } from "../contexts/AuthContext"
 
 // Upload + analysis UI used on the ExerciseDetail page.
-// Implements a minimal flow that posts to /api/uploads and polls for results.
+// Implements a minimal flow that posts to /api/uploads and follows the
+// analysis over /api/uploads/:id/events until the result arrives.
+const STAGE_LABELS = {
+  queued: "waiting for a worker",
+  processing: "processing",
+  decoding: "reading video",
+  pose: "detecting pose",
+  scoring: "scoring form",
+  feedback: "writing feedback",
+}
+
 const ExerciseUpload = ({ exerciseId }) => {
   const { refreshUser } = useAuth()
   const [file, setFile] = useState(null)
@@ -15,8 +25,11 @@ const ExerciseUpload = ({ exerciseId }) => {
   const [xpEarned, setXpEarned] = useState(null)
   const [levelUp, setLevelUp] = useState(false)
 
-  const pollTimerRef = useRef(null)
-  const pollStartRef = useRef(null)
+  const [progress, setProgress] = useState(null) // { stage, percent }
+  const [preview, setPreview] = useState(null) // provisional score while analyzing
+
+  const eventSourceRef = useRef(null)
+  const activeUploadRef = useRef(null) // upload whose analysis we are following
 
   const MAX_SIZE_BYTES = 200 * 1024 * 1024 // ~200MB
 
@@ -24,11 +37,22 @@ const ExerciseUpload = ({ exerciseId }) => {
     import.meta?.env?.VITE_API_BASE_URL || "http://localhost:5000/api"
   ).replace(/\/$/, "")
 
-  // Clear any active polling timer on unmount.
+  // Ask the server to stop an analysis nobody is waiting for any more.
+  const requestCancel = (id) => {
+    if (!id) return
+    fetch(`${API_BASE}/uploads/${id}/job`, {
+      method: "DELETE",
+      credentials: "include",
+      keepalive: true,
+    }).catch((err) => console.warn("Failed to cancel analysis:", err))
+  }
+
+  // Navigating away while analyzing cancels the analysis.
   useEffect(() => {
     return () => {
-      if (pollTimerRef.current) {
-        clearInterval(pollTimerRef.current)
+      if (eventSourceRef.current) {
+        eventSourceRef.current.close()
+        requestCancel(activeUploadRef.current)
       }
     }
   }, [])
@@ -67,61 +91,72 @@ const ExerciseUpload = ({ exerciseId }) => {
     event.stopPropagation()
   }
 
-  const startPolling = (id) => {
+  const stopEvents = () => {
+    if (eventSourceRef.current) {
+      eventSourceRef.current.close()
+      eventSourceRef.current = null
+    }
+  }
+
+  // Follow analysis progress over Server-Sent Events until the result arrives.
+  const startEvents = (id) => {
     if (!id) return
+    stopEvents()
+    activeUploadRef.current = id
     setStatus("analyzing")
     setPollError(null)
-    pollStartRef.current = Date.now()
-
-    // Poll results until ready or timeout.
-    pollTimerRef.current = setInterval(async () => {
-      const elapsedMs = Date.now() - pollStartRef.current
-      if (elapsedMs > 2 * 60 * 1000) {
-        // 2-minute timeout
-        clearInterval(pollTimerRef.current)
-        pollTimerRef.current = null
-        setPollError("Analysis timed out. Please try again.")
-        setStatus("idle")
-        return
+    setProgress(null)
+    setPreview(null)
+
+    const source = new EventSource(`${API_BASE}/uploads/${id}/events`, {
+      withCredentials: true,
+    })
+    eventSourceRef.current = source
+
+    source.addEventListener("progress", (event) => {
+      const data = JSON.parse(event.data)
+      setProgress({ stage: data.stage, percent: data.percent ?? null })
+    })
+
+    source.addEventListener("preview", (event) => {
+      setPreview(JSON.parse(event.data))
+    })
+
+    source.addEventListener("result", async (event) => {
+      stopEvents()
+      const data = JSON.parse(event.data)
+      setResults(data.results || data.result || data)
+      setStatus("done")
+
+      // Update XP info if available in results
+      if (data.xp_earned !== undefined && xpEarned === null) {
+        setXpEarned(data.xp_earned)
+        if (data.level_up) {
+          setLevelUp(true)
+        }
+        // Refresh user data to get updated XP and level
+        await refreshUser()
       }
+    })
 
-      try {
-        const res = await fetch(`${API_BASE}/uploads/${id}/results`, {
-          method: "GET",
-          credentials: "include",
-        })
-
-        if (!res.ok) {
-          // Treat non-OK as "still processing" unless it's a clear error.
-          if (res.status >= 400 && res.status < 500) {
-            const data = await res.json().catch(() => ({}))
-            console.warn("Upload results error:", data)
-          }
-          return
-        }
+    source.addEventListener("cancelled", () => {
+      stopEvents()
+      setStatus("idle")
+    })
 
-        const data = await res.json()
-        const isDone =
-          data?.status === "done" || data?.results || data?.result
-
-        if (isDone) {
-          clearInterval(pollTimerRef.current)
-          pollTimerRef.current = null
-          setResults(data.results || data.result || data)
-          setStatus("done")
-          
-          // Update XP info if available in results
-          if (data.xp_earned !== undefined && xpEarned === null) {
-            setXpEarned(data.xp_earned)
-            // Refresh user data to get updated XP and level
-            await refreshUser()
-          }
-        }
-      } catch (err) {
-        console.error("Error while polling upload results:", err)
-        setPollError("Failed to fetch analysis results. You can retry below.")
+    source.addEventListener("failed", () => {
+      stopEvents()
+      setPollError("Analysis failed. Please try again.")
+      setStatus("idle")
+    })
+
+    source.onerror = () => {
+      // EventSource reconnects by itself; only give up once it has closed
+      if (source.readyState === EventSource.CLOSED) {
+        stopEvents()
+        setPollError("Lost connection while waiting for results. You can retry below.")
       }
-    }, 1500)
+    }
   }
 
   const handleUpload = async () => {
@@ -135,6 +170,12 @@ const ExerciseUpload = ({ exerciseId }) => {
       return
     }
 
+    // Re-uploading replaces an analysis that is still running
+    if (eventSourceRef.current) {
+      stopEvents()
+      requestCancel(activeUploadRef.current)
+    }
+
     setStatus("uploading")
     setError(null)
     setPollError(null)
@@ -186,7 +227,7 @@ const ExerciseUpload = ({ exerciseId }) => {
       }
 
       setUploadId(id)
-      startPolling(id)
+      startEvents(id)
     } catch (err) {
       console.error("Upload error:", err)
       setStatus("idle")
@@ -195,10 +236,8 @@ const ExerciseUpload = ({ exerciseId }) => {
   }
 
   const cancelAnalysis = () => {
-    if (pollTimerRef.current) {
-      clearInterval(pollTimerRef.current)
-      pollTimerRef.current = null
-    }
+    stopEvents()
+    requestCancel(uploadId)
     setStatus("idle")
   }
 
@@ -206,7 +245,7 @@ const ExerciseUpload = ({ exerciseId }) => {
     setPollError(null)
     setResults(null)
     if (uploadId) {
-      startPolling(uploadId)
+      startEvents(uploadId)
     }
   }
 
@@ -288,7 +327,18 @@ const ExerciseUpload = ({ exerciseId }) => {
       {status === "analyzing" && (
         <div className="flex items-center space-x-3 text-sm text-gray-700 dark:text-gray-300">
           <div className="w-4 h-4 border-2 border-gray-300 border-t-blue-500 rounded-full animate-spin" />
-          <span>Analyzing your upload — this may take a moment.</span>
+          <span>
+            {progress?.percent != null
+              ? `Analyzing your upload — ${STAGE_LABELS[progress.stage] || progress.stage} (${Math.round(progress.percent)}%)`
+              : "Analyzing your upload — this may take a moment."}
+          </span>
+        </div>
+      )}
+
+      {status === "analyzing" && preview && (
+        <div className="text-sm text-gray-700 dark:text-gray-300">
+          Provisional score: <span className="font-semibold">{Math.round(preview.score)}%</span>
+          {" "}after {preview.reps} rep{preview.reps === 1 ? "" : "s"} — refining as the rest of the video is analyzed
         </div>
       )}
 
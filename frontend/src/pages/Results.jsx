@@ -46,17 +46,65 @@ const Results = () => {
   const [analysisData, setAnalysisData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [progress, setProgress] = useState(null); // { stage, percent } while analysis runs
+  const [preview, setPreview] = useState(null); // provisional score while analysis runs
 
   useEffect(() => {
+    let source = null;
+
+    const API_BASE = (
+      import.meta?.env?.VITE_API_BASE_URL ||
+      "http://localhost:5000/api"
+    ).replace(/\/$/, "");
+
+    const showResult = (result) => {
+      setAnalysisData(result);
+
+      // Animate score from 0 to result.overallScore
+      let target = Math.round(result.overallScore || 0);
+      let counter = 0;
+
+      const interval = setInterval(() => {
+        counter += 2;
+        if (counter >= target) {
+          setScore(target);
+          clearInterval(interval);
+        } else {
+          setScore(counter);
+        }
+      }, 50);
+    };
+
+    // Analysis still running: wait for its result over Server-Sent Events
+    const followEvents = (id) => {
+      setProgress({ stage: "queued", percent: null });
+      source = new EventSource(`${API_BASE}/uploads/${id}/events`, {
+        withCredentials: true,
+      });
+      source.addEventListener("progress", (event) => {
+        const data = JSON.parse(event.data);
+        setProgress({ stage: data.stage, percent: data.percent ?? null });
+      });
+      source.addEventListener("preview", (event) => {
+        setPreview(JSON.parse(event.data));
+      });
+      source.addEventListener("result", (event) => {
+        source.close();
+        setProgress(null);
+        showResult(JSON.parse(event.data).result);
+      });
+      source.addEventListener("failed", () => {
+        source.close();
+        setProgress(null);
+        setError("Analysis failed. Please try uploading again.");
+      });
+    };
+
     const fetchResults = async () => {
       try {
         setLoading(true);
         setError(null);
         console.log("This is =" + uploadId);
-        const API_BASE = (
-          import.meta?.env?.VITE_API_BASE_URL ||
-          "http://localhost:5000/api"
-        ).replace(/\/$/, "");
         const endpoint = uploadId
           ? `${API_BASE}/results/${uploadId}`
           : `${API_BASE}/results/latest`;
@@ -72,21 +120,9 @@ const Results = () => {
         console.log("Fetched result data:", data);
 
         if (res.ok && data.success) {
-          setAnalysisData(data.result);
-
-          // Animate score from 0 to result.overallScore
-          let target = Math.round(data.result.overallScore || 0);
-          let counter = 0;
-
-          const interval = setInterval(() => {
-            counter += 2;
-            if (counter >= target) {
-              setScore(target);
-              clearInterval(interval);
-            } else {
-              setScore(counter);
-            }
-          }, 50);
+          showResult(data.result);
+        } else if (res.status === 202 && data.upload_id) {
+          followEvents(data.upload_id);
         } else {
           // Handle specific error cases
           if (res.status === 404) {
@@ -104,6 +140,10 @@ const Results = () => {
     };
 
     fetchResults();
+
+    return () => {
+      if (source) source.close();
+    };
   }, []);
 
   const PdfReport = ({ data }) => (
@@ -173,6 +213,20 @@ const Results = () => {
     return (
       <div className="text-center py-10 text-gray-500">Loading analysis...</div>
     );
+
+  if (progress && !error)
+    return (
+      <div className="text-center py-10 text-gray-500">
+        Analyzing your video
+        {progress.percent != null ? ` (${Math.round(progress.percent)}%)` : "..."}
+        {preview && (
+          <div className="mt-2">
+            Provisional score: {Math.round(preview.score)}% after {preview.reps} rep
+            {preview.reps === 1 ? "" : "s"}
+          </div>
+        )}
+      </div>
+    );
   
   if (error) {
     const isNoDataError = error.includes("No analysis data found");